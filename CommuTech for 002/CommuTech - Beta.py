@@ -4,18 +4,36 @@ reference: used CRS codes for battersea power station and nine elms: https://tec
 '''
 
 import json
-from pathlib import Path
 import streamlit as st
-import random
 import os
-import requests
 from datetime import datetime
+from commutech.tfl_client import TflClient
+from commutech.cache import ResponseCache
+from commutech.budget import TokenBucket
+from commutech.poller import StatusPoller
+from commutech.history import LEGACY_CSV, STORE_DIR, StatusHistory
+from commutech.reliability import ReliabilityIndex, hour_of_week, load_reliability, route_rank
+from commutech.stopindex import StopPointIndex
+from commutech.arrivals import ArrivalsBuffer, arrivals_path, eta_minutes, parse_arrivals
+from commutech.refdata import load_reference
+from commutech.journey import INTERCHANGE_PRIORITY, LINE_NAME, PEAK_FARE_BY_ZONES_KEY, JourneyEngine, format_zones
+from commutech.perf import PerfRecorder
+from commutech.status import summarise_status
+from commutech.quality import load_quality
 
 #app config:
 st.set_page_config(page_title="CommuTech (Beta)",page_icon="🚇",layout="wide",)
 st.title("🚇 CommuTech (Beta)")
 st.markdown("_Smarter planning for London commutes_")
 
+#perf instrumentation (one recorder per process; each rerun is split into timed sections):
+@st.cache_resource(show_spinner=False)
+def get_perf() -> PerfRecorder:
+    return PerfRecorder()
+
+perf = get_perf()
+rerun_timer = perf.rerun()
+
 #API STUFF:
 try:
     from dotenv import load_dotenv
@@ -23,123 +41,57 @@ try:
 except Exception:
     pass
 
-#helpers:
-LINE_NAME = {
-    "B": "Bakerloo",
-    "Ce": "Central",
-    "Ci": "Circle",
-    "D": "District",
-    "H": "Hammersmith & City",
-    "J": "Jubilee",
-    "M": "Metropolitan",
-    "N": "Northern",
-    "P": "Piccadilly",
-    "V": "Victoria",
-    "W": "Waterloo & City",}
-
-#commute-smart recommender logic:
-INTERCHANGE_PRIORITY = [
-    "Jubilee",
-    "Central",
-    "Northern",
-    "Victoria",
-    "Piccadilly",
-    "District",
-    "Circle",
-    "Hammersmith & City",
-    "Metropolitan",
-    "Bakerloo",
-    "Waterloo & City",]
-
-#reference: https://www.google.com/url?sa=t&source=web&rct=j&opi=89978449&url=https://www.london.gov.uk/media/107475/download&ved=2ahUKEwiht77b39ORAxXWTkEAHfKQCDAQFnoECBgQAQ&usg=AOvVaw3RtmOGoB1-GSkm7g0RqnGI
-PEAK_FARE_BY_ZONES_KEY = {#zone 1 ranges
-    "1": 2.90,
-    "12": 3.50,
-    "123": 3.80,
-    "1234": 4.60,
-    "12345": 5.20,
-    "123456": 5.80,
-    "1234567": 6.70,
-    "12345678": 8.20,
-    "123456789": 8.30,
-
-    #outer-zone equivalents (non-zone-1)
-    "2": 2.10, "3": 2.10, "4": 2.10, "5": 2.10, "6": 2.10,
-    "23": 2.30, "34": 2.30, "45": 2.30, "56": 2.30,
-    "234": 3.00, "345": 3.00, "456": 3.00,
-    "2345": 3.20, "3456": 3.20,
-    "23456": 3.60,
-    "234567": 4.90,
-    "2345678": 5.60,
-    "23456789": 5.60,
-    "34567": 4.00,
-    "345678": 4.80,
-    "3456789": 5.00,
-    "4567": 3.20,
-    "45678": 4.00,
-    "456789": 4.10,
-    "567": 2.90,
-    "5678": 3.20,
-    "56789": 3.50,
-    "67": 2.20,
-    "678": 2.90,
-    "6789": 3.00,
-    "7": 2.00,
-    "78": 2.20,
-    "789": 2.30,
-    "89": 2.20,}
-
 #API HELPERS:
-TFL_BASE = "https://api.tfl.gov.uk"
 def get_tfl_key() -> str | None:
     return os.getenv("TFL_API_KEY")
+
+@st.cache_resource(show_spinner=False)
+def get_tfl_client() -> TflClient:
+    """One pooled/retrying client per process (keep-alive shared by all sessions)."""
+    return TflClient(key_fn=get_tfl_key, recorder=get_perf())
+
+def tfl_source() -> str:
+    """Where live data comes from: TfL, a mock server (TFL_BASE) or recorded fixtures (TFL_FIXTURES)."""
+    client = get_tfl_client()
+    if client.fixtures is not None:
+        return f"{client.fixtures.mode} fixtures in {client.fixtures.root}"
+    return client.base_url
+
+@st.cache_resource(show_spinner=False)
+def get_tfl_cache() -> ResponseCache:
+    """Process-wide TTL cache shared by every session (status/arrivals fetched once per TTL window)."""
+    #TfL default quota is 500 req/min per key; TFL_RATE_PER_MIN overrides it
+    budget = TokenBucket(per_minute=float(os.getenv("TFL_RATE_PER_MIN", "500")))
+    return ResponseCache(get_tfl_client(), budget=budget)
+
 def tfl_get(path: str, params: dict | None = None):
-    """Simple GET wrapper with app_key added automatically."""
-    key = get_tfl_key()
-    if not key:
-        return None, "Missing API key"
-    params = params or {}
-    params["app_key"] = key
-    url = f"{TFL_BASE}{path}"
-    try:
-        r = requests.get(url, params=params, timeout=15)
-        if r.status_code != 200:
-            return None, f"HTTP {r.status_code}: {r.text[:200]}"
-        return r.json(), None
-    except Exception as e:
-        return None, str(e)
-
-def severity_weight(desc: str) -> int:
-    """Lower is better. Rough weighting (Phase 2 heuristic)."""
-    if not desc:
-        return 1
-    d = desc.lower()
-    if "good" in d:
-        return 0
-    if "minor" in d:
-        return 2
-    if "part" in d or "reduced" in d:
-        return 4
-    if "severe" in d:
-        return 6
-    if "suspended" in d or "closed" in d:
-        return 8
-    return 3#fallback
-
-def line_score(line_obj: dict) -> int:
-    """
-    Combined score = severity weight + number of disruption messages.
-    Higher score => worse line.
-    """
-    statuses = line_obj.get("lineStatuses") or []
-    if not statuses:
-        return 1
-    #using the worst status entry if multiple
-    worst = max(statuses, key=lambda s: severity_weight(s.get("statusSeverityDescription", "")))
-    sev = severity_weight(worst.get("statusSeverityDescription", ""))
-    #counting messages (reason texts)
-    msg_count = sum(1 for s in statuses if (s.get("reason") or "").strip())
-    return sev + msg_count
+    """Simple GET wrapper with app_key added automatically (served from the shared cache)."""
+    return get_tfl_cache().get(path, params)
+
+def tfl_get_many(calls: list[tuple[str, dict | None]]):
+    """Concurrent tfl_get for [(path, params), ...]; results come back in the same order."""
+    return get_tfl_cache().get_many(calls)
+
+def tfl_fetched_ts(path: str, params: dict | None = None) -> str:
+    """HH:MM:SS the cached payload was actually fetched (may be earlier than this rerun)."""
+    ts = get_tfl_cache().fetched_at(path, params)
+    return datetime.fromtimestamp(ts).strftime("%H:%M:%S") if ts else datetime.now().strftime("%H:%M:%S")
+
+@st.cache_resource(show_spinner=False)
+def get_status_history() -> StatusHistory:
+    """Columnar status history (data/logs/status_store); the old status_log.csv is imported once on first open."""
+    return StatusHistory(STORE_DIR, migrate_from=LEGACY_CSV)
+
+@st.cache_resource(show_spinner=False)
+def get_reliability_index() -> ReliabilityIndex:
+    """Line x hour-of-week reliability from the status history (cached on disk, kept current by the poller)."""
+    return load_reliability(get_status_history())
+
+@st.cache_resource(show_spinner=False)
+def get_status_poller() -> StatusPoller:
+    """One background poller per process; every session reads its latest snapshot (and it keeps the status history going)."""
+    return StatusPoller(get_tfl_cache().refresh, interval=float(os.getenv("STATUS_POLL_SECONDS", "60")),
+                        on_snapshot=[get_status_history().append_snapshot, get_reliability_index().update_snapshot]).start()
 
 def fetch_tube_status():
     """Returns list of line objects."""
@@ -147,136 +99,36 @@ def fetch_tube_status():
     return data, err
 
 def stoppoint_search(station_name: str):
-    """Returns StopPoint search results for a station name."""
-    data, err = tfl_get(f"/StopPoint/Search/{station_name}")
+    """Returns StopPoint search results for a station name (tube stops only)."""
+    data, err = tfl_get(f"/StopPoint/Search/{station_name}", {"modes": "tube"})
     return data, err
 
-def stoppoint_arrivals(stop_id: str):
-    """Returns arrivals list for a StopPoint id."""
-    data, err = tfl_get(f"/StopPoint/{stop_id}/Arrivals")
+@st.cache_resource(show_spinner=False)
+def get_stop_index() -> StopPointIndex:
+    """Station code -> StopPoint id, persisted under data/cache/stoppoints/; only a miss costs a search."""
+    return StopPointIndex()
+
+def stoppoint_arrivals(stop_ids: list[str]):
+    """Returns arrivals list for one or more StopPoint ids (single batched request)."""
+    data, err = tfl_get(arrivals_path(stop_ids))
     return data, err
 
-#data quality badge!:
-def compute_data_quality(stations: dict, lines_raw: dict):
-    """
-    Returns: (status, details)\n
-      status: "OK" or "WARN"\n
-      details: list[str] of issues\n
-    """
-    issues = []
-    #stations missing from lines.json
-    missing_lines = [sid for sid in stations.keys() if sid not in lines_raw]
-    if missing_lines:
-        issues.append(f"{len(missing_lines)} station codes missing from lines.json (e.g., {', '.join(missing_lines[:5])}{'...' if len(missing_lines) > 5 else ''})")
-    #line codes not recognised
-    known_codes = set(LINE_NAME.keys())
-    unknown_codes = set()
-    for sid, codes in lines_raw.items():
-        for c in codes:
-            if c not in known_codes:
-                unknown_codes.add(c)
-    if unknown_codes:
-        issues.append(f"Unknown line codes detected: {', '.join(sorted(unknown_codes))}")
-    #zone values out of expected range
-    out_of_range = []
-    for sid, meta in stations.items():
-        for z in meta.get("zones", []):
-            if z < 1 or z > 9:
-                out_of_range.append((sid, z))
-    if out_of_range:
-        sample = ", ".join([f"{sid}:{z}" for sid, z in out_of_range[:5]])
-        issues.append(f"Zone values out of expected range (1–9): {sample}{'...' if len(out_of_range) > 5 else ''}")
-    status = "OK" if not issues else "WARN"
-    return status, issues
-
-def parse_station_value(v: str):
-    parts = [p.strip() for p in v.split("|") if p.strip()]
-    name = parts[0]
-    zones = [int(z) for z in parts[1:]]#1 or 2 ints
-    return name, sorted(set(zones))
-
-def format_station_label(code: str, name: str) -> str:
-    return f"{name} ({code})"
-
-def format_zones(zones: list[int]) -> str:
-    if not zones:
-        return "Unknown"
-    if len(zones) == 1:
-        return f"Zone {zones[0]}"
-    return f"Zones {zones[0]}/{zones[1]}"
-
-def expand_line_codes(codes: list[str]) -> list[str]:
-    return [LINE_NAME.get(c, c) for c in codes]
-
-def estimate_peak_fare_zone_based(origin_zones: list[int], dest_zones: list[int]) -> tuple[int, int]:
-    candidates = []
-    for oz in origin_zones:
-        for dz in dest_zones:
-            mn = min(oz, dz)
-            mx = max(oz, dz)
-            candidates.append((mx - mn, mn, mx))
-    if not candidates:
-        return (0, 0)
-    _, mn, mx = min(candidates, key=lambda t: t[0])
-    return mn, mx
-
-#commute-smart recommender logic:
-def suggest_interchange_line(union_lines: list[str]) -> str | None:
-    """
-    Pick the highest priority line that exists in the union.\n
-    Returns the line name (e.g., 'Jubilee') or None. \n
-    """
-    union_set = set(union_lines)
-    for line in INTERCHANGE_PRIORITY:
-        if line in union_set:
-            return line
-    return None #BOSCH IM THE GOAT
-
-#fare logic defs:
-def zones_key(min_zone: int, max_zone: int) -> str:
-    """Return the contiguous zones key like '2345' for min=2 max=5."""
-    return "".join(str(z) for z in range(min_zone, max_zone + 1))
-
-def fare_range_for_station_pair(origin_zones: list[int], dest_zones: list[int]):
-    """
-    For boundary stations (e.g. 2|3), try all zone combinations and return:
-    - min fare + its zones key
-    - max fare + its zones key
-    This is Phase 1: zone-based estimate only (no route graph).
-    """
-    fares = []
-    for oz in origin_zones:
-        for dz in dest_zones:
-            mn, mx = min(oz, dz), max(oz, dz)
-            key = zones_key(mn, mx)
-            fare = PEAK_FARE_BY_ZONES_KEY.get(key)
-            if fare is not None:
-                fares.append((fare, key))
-
-    if not fares:
-        return None, None, None, None
-
-    fares.sort(key=lambda t: t[0])
-    min_fare, min_key = fares[0]
-    max_fare, max_key = fares[-1]
-    return min_fare, max_fare, min_key, max_key
-
-def price_band(fare: float) -> str:
-    """Simple Phase 1 buckets."""
-    if fare <= 2.30:
-        return "Cheaper"
-    if fare <= 4.00:
-        return "Mid"
-    return "Expensive"
-
-#data loading:
-@st.cache_data(show_spinner=False)
-def load_json(path: str):
-    return json.loads(Path(path).read_text(encoding="utf-8"))
+@st.cache_resource(show_spinner=False)
+def get_arrivals_buffer() -> ArrivalsBuffer:
+    """Last few arrivals polls per stop (bounded rings, shared by every session) - ETA drift + next-train stability."""
+    return ArrivalsBuffer(polls=int(os.getenv("ARRIVALS_BUFFER_POLLS", "30")))
+
+ARRIVALS_REFRESH_SECONDS = float(os.getenv("ARRIVALS_REFRESH_SECONDS", "20"))
+
+#data loading (stations, lines, route graph, fare matrix - once per process, snapshot on disk):
+@st.cache_resource(show_spinner=False, max_entries=1)
+def load_reference_data(folder: str, mtimes: tuple):
+    #mtimes is part of the cache key, so editing the JSON files reloads them (cheap stat per rerun);
+    #max_entries=1 drops the superseded data
+    return load_reference(folder, LINE_NAME, PEAK_FARE_BY_ZONES_KEY)
 
 try:
-    stations_raw = load_json("stations.json")
-    lines_raw = load_json("lines.json")
+    ref = load_reference_data(".", tuple(os.stat(f).st_mtime_ns for f in ("stations.json", "lines.json")))
 except FileNotFoundError:
     st.error("Couldn't find stations.json and/or lines.json in this folder. Put them next to this .py file.")
     st.stop()
@@ -284,16 +136,21 @@ except json.JSONDecodeError as e:
     st.error(f"One of your JSON files isn't valid JSON: {e}")
     st.stop()
 
-#building parsed station dict:
-stations = {}
-for code, v in stations_raw.items():
-    name, zones = parse_station_value(v)
-    stations[code] = {"name": name, "zones": zones}
+#data-quality verdict (one pass, cached on disk by fingerprint; only changed entries re-checked):
+@st.cache_resource(show_spinner=False)
+def load_data_quality(fingerprint: str, _ref):
+    return load_quality(_ref, LINE_NAME)
+
+quality = load_data_quality(ref.fingerprint, ref)
+stations = ref.stations
+lines_raw = ref.lines_raw
+engine = JourneyEngine(ref)#zones, fares, lines and route for an OD pair - no Streamlit inside
+rerun_timer.lap("reference data load")
 
 #UI controls:
-#sort dropdown by station name:
-sorted_codes = sorted(stations.keys(), key=lambda c: stations[c]["name"].lower())
-labels = {c: format_station_label(c, stations[c]["name"]) for c in sorted_codes}
+#dropdown order (by station name) + labels are precomputed in the station store
+sorted_codes = stations.sorted_codes
+labels = stations.labels
 st.sidebar.header("Journey inputs")
 #fancy UI for downdrops (dont spend too long on this):
 PLACEHOLDER = "Select station"
@@ -311,22 +168,103 @@ to_code = st.sidebar.selectbox(
     index=0,)
 journey_ready = not (from_code == PLACEHOLDER or to_code == PLACEHOLDER)
 
+#replaying recorded fixtures needs no key
+replaying = getattr(get_tfl_client().fixtures, "mode", None) == "replay"
+api_key_present = get_tfl_key() is not None or replaying
+#background poller feeds status to every session - no network I/O on this rerun
+status_snap = get_status_poller().latest() if api_key_present else None
+
 from_name = to_name = None
 from_lines = to_lines = []
+journey = route = None
+trip_codes = []
 if journey_ready:
-    from_name = stations[from_code]["name"]
-    to_name = stations[to_code]["name"]
-    from_lines = expand_line_codes(lines_raw.get(from_code, []))
-    to_lines = expand_line_codes(lines_raw.get(to_code, []))
+    #candidate lines ranked by live line_score + reliability at this hour of week, INTERCHANGE_PRIORITY breaks ties
+    live_status = status_snap.payload if status_snap is not None else st.session_state.get("live", {}).get("status")
+    reliability = get_reliability_index() if api_key_present else None
+    rank = route_rank(reliability, summarise_status(live_status) if live_status is not None else None, INTERCHANGE_PRIORITY)
+    journey = engine.journey(from_code, to_code, rank)
+    from_name, to_name = journey.from_name, journey.to_name
+    from_lines, to_lines = journey.from_lines, journey.to_lines
+    route = journey.route#fewest changes first, then the rank above
+    #stops whose arrivals we show: origin, interchange(s), destination
+    trip_codes = list(dict.fromkeys([from_code, *(route.via if route else ()), to_code]))
 if not journey_ready:
     st.info("Select your **From** and **To** stations to personalise your CommuTech Cockpit and Journey Summary.")
 
+rerun_timer.lap("inputs + route")
+
+#live arrivals panel: only this function re-runs on the timer, and it only fetches arrivals
+#(one batched request for the trip, served from the shared cache - sessions on the same stops share it)
+@st.fragment(run_every=ARRIVALS_REFRESH_SECONDS)
+def live_arrivals(trip_codes: list[str], trip_ids: dict, from_code: str, to_code: str, to_name: str | None):
+    live = st.session_state["live"]
+    stop_ids = [sid for sid in trip_ids.values() if sid]
+    if stop_ids and len(stop_ids) == len(trip_ids):#unresolved stops need a search - that's the Refresh button's job
+        with perf.section("arrivals fragment"):
+            path = arrivals_path(stop_ids)
+            arr, err = tfl_get(path)
+            if err:
+                if live.get("trip_arrivals"):
+                    st.caption(f"Arrivals update failed ({err}) — showing data as of {live['arrivals_ts']}.")
+            else:
+                by_stop = parse_arrivals(arr, k=20)
+                get_arrivals_buffer().record(by_stop, get_tfl_cache().fetched_at(path) or datetime.now().timestamp())
+                trip = {c: by_stop.get(sid) for c, sid in trip_ids.items() if sid and by_stop.get(sid)}
+                live["trip_arrivals"] = trip
+                live["arrivals"] = trip.get(to_code)
+                live["arrivals_ts"] = tfl_fetched_ts(path)
+                live["dest_stop"] = trip_ids.get(to_code)
+
+    trip_arrivals = live.get("trip_arrivals") or {}
+    at = live["arrivals_ts"]
+    buffer = get_arrivals_buffer()
+
+    if trip_arrivals:
+        for code in trip_codes:
+            stop_arr = trip_arrivals.get(code)
+            if not stop_arr:
+                continue
+            role = "origin" if code == from_code else ("destination" if code == to_code else "interchange")
+            st.write(f"**Next trains at {stations.name(code)} ({role})** · refreshed {at}")
+            for a in stop_arr.rows[:3]:
+                line = a.get("lineName", "—")
+                dest = a.get("destinationName", "—")
+                mins = eta_minutes(a)
+                st.write(f"🚆 **{line}** to **{dest}** — {f'{mins} min' if mins is not None else '—'}")
+            d = buffer.drift(stop_arr.stop_id)
+            if d is not None and d.polls > 1:
+                parts = [f"{d.polls} polls over {d.span_s / 60:.0f} min"]
+                if d.next_drift_s is not None:
+                    parts.append(f"next train drift {d.next_drift_s:+.0f}s")
+                if d.mean_abs_drift_s is not None:
+                    parts.append(f"avg |drift| {d.mean_abs_drift_s:.0f}s")
+                if d.next_stability is not None:
+                    parts.append(f"next-train stability {d.next_stability:.0%}")
+                st.caption(" · ".join(parts))
+    else:
+        st.caption("Arrivals preview appears after you click **Refresh live data**.")
+
+    arrivals = live["arrivals"]
+    st.subheader(f"Arrivals at {to_name}")
+    if not arrivals:
+        st.info("Click **Refresh live data** to load arrivals.")
+    else:
+        rows = []
+        for a in arrivals.rows[:20]:
+            mins = eta_minutes(a)
+            rows.append({
+                "Line": a.get("lineName", ""),
+                "Destination": a.get("destinationName", ""),
+                "ETA (min)": "" if mins is None else str(mins),
+                "Platform": a.get("platformName", ""),})
+        st.caption(f"Last refreshed: {at} · updates every {ARRIVALS_REFRESH_SECONDS:.0f}s")
+        st.dataframe(rows, use_container_width=True)
+
 #CommuTech Cockpit Code (triple alliteration, how fun):
 st.markdown("### 🧭 CommuTech Cockpit")
 st.caption("Your personalised service radar.")
 
-api_key_present = get_tfl_key() is not None
-
 #manual refresh button
 colA, colB = st.columns([1, 3])
 with colA:
@@ -337,49 +275,85 @@ with colB:
 
 #session cache for live data
 if "live" not in st.session_state:
-    st.session_state["live"] = {"status": None, "status_ts": None, "arrivals": None, "arrivals_ts": None, "dest_stop": None}
+    st.session_state["live"] = {"status": None, "status_ts": None, "arrivals": None, "arrivals_ts": None, "dest_stop": None, "trip_arrivals": {}}
+
+if status_snap is not None:
+    st.session_state["live"]["status"] = status_snap.payload
+    st.session_state["live"]["status_ts"] = status_snap.ts_utc.astimezone().strftime("%H:%M:%S")
 
-#fetching on demand
+#fetching on demand (status only until the poller's first snapshot lands)
+#trip arrivals: one batched request for every stop; index misses cost one search each, in parallel
+stop_index = get_stop_index()
+trip_ids = {c: stop_index.get(c) for c in trip_codes}
+missing_ids = [c for c, sid in trip_ids.items() if not sid]
 if refresh and api_key_present:
-    tube_status, err = fetch_tube_status()
-    if err:
-        st.session_state["live"]["status"] = None
-        st.session_state["live"]["status_ts"] = None
-        st.error(f"Couldn’t load Tube status: {err}")
-    else:
-        st.session_state["live"]["status"] = tube_status
-        st.session_state["live"]["status_ts"] = datetime.now().strftime("%H:%M:%S")
+    calls = []
+    if status_snap is None:
+        calls.append(("/Line/Mode/tube/Status", None))
+    if journey_ready and not missing_ids:
+        calls.append((arrivals_path(list(trip_ids.values())), None))
+    calls += [(f"/StopPoint/Search/{stations.name(c)}", {"modes": "tube"}) for c in missing_ids]
+    results = tfl_get_many(calls)
+    if status_snap is None:
+        tube_status, err = results.pop(0)
+        if err and st.session_state["live"]["status"] is not None:
+            #keep serving the last good payload rather than blanking the Cockpit
+            st.warning(f"Live status unavailable ({err}) — showing last good data as of {st.session_state['live']['status_ts']}.")
+        elif err:
+            st.session_state["live"]["status"] = None
+            st.session_state["live"]["status_ts"] = None
+            st.error(f"Couldn’t load Tube status: {err}")
+        else:
+            st.session_state["live"]["status"] = tube_status
+            st.session_state["live"]["status_ts"] = tfl_fetched_ts("/Line/Mode/tube/Status")
+            #budget state, not freshness: a stale or error-masked payload isn't a budget problem
+            if get_tfl_cache().budget_low() and not get_tfl_cache().is_fresh("/Line/Mode/tube/Status"):
+                st.caption(f"TfL request budget is low — showing last good status as of {st.session_state['live']['status_ts']}.")
+
+    if journey_ready:
+        arr_result = None if missing_ids else results.pop(0)
+        for c, search in zip(missing_ids, results):
+            #index miss: use the search fetched above, remember the id for next time
+            trip_ids[c], err = stop_index.resolve(c, stations.name(c), lambda n, search=search: search)
+            if err:
+                st.error(f"StopPoint search failed for {stations.name(c)}: {err}")
+        stop_ids = [sid for sid in trip_ids.values() if sid]
+        st.session_state["live"]["dest_stop"] = trip_ids.get(to_code)
+        if stop_ids:
+            arr, err2 = arr_result or stoppoint_arrivals(stop_ids)
+            if err2:
+                st.error(f"Arrivals fetch failed: {err2}")
+                st.session_state["live"]["arrivals"] = None
+                st.session_state["live"]["arrivals_ts"] = None
+                st.session_state["live"]["trip_arrivals"] = {}
+            else:
+                by_stop = parse_arrivals(arr, k=20)
+                trip = {c: by_stop.get(sid) for c, sid in trip_ids.items() if sid and by_stop.get(sid)}
+                st.session_state["live"]["trip_arrivals"] = trip
+                st.session_state["live"]["arrivals"] = trip.get(to_code)
+                st.session_state["live"]["arrivals_ts"] = tfl_fetched_ts(arrivals_path(stop_ids))
+
+rerun_timer.lap("live data fetch")
 
 #network pulse for API 
 tube_status = st.session_state["live"]["status"]
 ts = st.session_state["live"]["status_ts"]
+#scored once per rerun: Network Pulse, relevant lines and the data checks all read this
+status_summary = summarise_status(tube_status) if tube_status is not None else None
 
 if not api_key_present:
     st.info("Set `TFL_API_KEY` to enable live status + arrivals.")
 elif tube_status is None:
     st.info("Click **Refresh live data** to load the Network Pulse.")
 else:
-    #computing headline metrics
-    scored = []
-    good = 0
-    disrupted = 0
-    for ln in tube_status:
-        statuses = ln.get("lineStatuses") or []
-        desc = (statuses[0].get("statusSeverityDescription") if statuses else "") or ""
-        if "Good Service" in desc:
-            good += 1
-        else:
-            disrupted += 1
-        scored.append((line_score(ln), ln.get("name", "Unknown"), desc))
-
-    scored_sorted = sorted(scored, key=lambda x: x[0])
-    best3 = scored_sorted[:3]
-    worst3 = list(reversed(scored_sorted[-3:]))
+    #headline metrics
+    best3 = status_summary.best(3)
+    worst3 = status_summary.worst(3)
 
     m1, m2, m3, m4 = st.columns(4)
     m1.metric("Lines monitored", str(len(tube_status)))
-    m2.metric("Good service", str(good))
-    m3.metric("Disrupted", str(disrupted))
+    m2.metric("Good service", str(status_summary.good))
+    m3.metric("Disrupted", str(status_summary.disrupted))
     m4.metric("Last refreshed", ts)
 
     c1, c2 = st.columns(2)
@@ -399,8 +373,8 @@ else:
         st.subheader("Your commute zoom-in")
     
         # relevant lines (union + highlight intersection)
-        rel_union = sorted(set(from_lines).union(set(to_lines)))
-        rel_intersection = sorted(set(from_lines).intersection(set(to_lines)))
+        rel_union = journey.relevant_lines
+        rel_intersection = journey.direct_lines
     
         if rel_union:
             st.write("**Relevant lines:**", ", ".join(rel_union))
@@ -408,81 +382,31 @@ else:
             st.success("Direct line(s): " + ", ".join(rel_intersection))
     
         # status filtered to relevant lines
-        name_to_obj = {ln.get("name"): ln for ln in tube_status}
+        scored_by_name = status_summary.by_name()
         rel_status = []
         for ln_name in rel_union:
-            obj = name_to_obj.get(ln_name)
-            if not obj:
+            if ln_name not in scored_by_name:
                 continue
-            statuses = obj.get("lineStatuses") or []
-            desc = (statuses[0].get("statusSeverityDescription") if statuses else "") or "Unknown"
-            rel_status.append((line_score(obj), ln_name, desc))
+            score, desc = scored_by_name[ln_name]
+            rel_status.append((score, ln_name, desc or "Unknown"))
     
         if rel_status:
             rel_status.sort(key=lambda x: x[0])  # best -> worst
+            reliability = get_reliability_index()
+            how = hour_of_week()
             for score, ln_name, desc in rel_status:
                 tag = "DIRECT" if ln_name in rel_intersection else "RELEVANT"
-                st.write(f"**{ln_name}** — {desc}  ·  _{tag}_  ·  score {score}")
+                usual = f"  ·  usually {reliability.expected_weight(ln_name, how):.1f} at this hour" if len(reliability) else ""
+                st.write(f"**{ln_name}** — {desc}  ·  _{tag}_  ·  score {score}{usual}")
     
-        # Arrivals preview (destination only): fetch on refresh
-        if refresh:
-            search, err = stoppoint_search(to_name)
-            if err:
-                st.error(f"StopPoint search failed: {err}")
-            else:
-                matches = (search.get("matches") if isinstance(search, dict) else []) or []
-                stop_id = matches[0].get("id") if matches else None
-                st.session_state["live"]["dest_stop"] = stop_id
-    
-                if stop_id:
-                    arr, err2 = stoppoint_arrivals(stop_id)
-                    if err2:
-                        st.error(f"Arrivals fetch failed: {err2}")
-                        st.session_state["live"]["arrivals"] = None
-                        st.session_state["live"]["arrivals_ts"] = None
-                    else:
-                        st.session_state["live"]["arrivals"] = arr
-                        st.session_state["live"]["arrivals_ts"] = datetime.now().strftime("%H:%M:%S")
-    
-        arrivals = st.session_state["live"]["arrivals"]
-        at = st.session_state["live"]["arrivals_ts"]
-    
-        if arrivals:
-            arrivals_sorted = sorted(arrivals, key=lambda a: a.get("timeToStation", 10**9))
-            st.write(f"**Next trains at {to_name} (preview)** · refreshed {at}")
-            for a in arrivals_sorted[:3]:
-                line = a.get("lineName", "—")
-                dest = a.get("destinationName", "—")
-                tts = a.get("timeToStation", None)
-                mins = f"{max(0, int(tts)//60)} min" if isinstance(tts, int) else "—"
-                st.write(f"🚆 **{line}** to **{dest}** — {mins}")
-        else:
-            st.caption("Arrivals preview appears after you click **Refresh live data**.")
-        
-        if api_key_present and journey_ready:
-            arrivals = st.session_state["live"]["arrivals"]
-            at = st.session_state["live"]["arrivals_ts"]
-
-            st.subheader(f"Arrivals at {to_name}")
-            if not arrivals:
-                st.info("Click **Refresh live data** to load arrivals.")
-            else:
-                arrivals_sorted = sorted(arrivals, key=lambda a: a.get("timeToStation", 10**9))[:20]
-                rows = []
-                for a in arrivals_sorted:
-                    tts = a.get("timeToStation", None)
-                    mins = f"{max(0, int(tts)//60)}" if isinstance(tts, int) else ""
-                    rows.append({
-                        "Line": a.get("lineName", ""),
-                        "Destination": a.get("destinationName", ""),
-                        "ETA (min)": mins,
-                        "Platform": a.get("platformName", ""),})
-                st.caption(f"Last refreshed: {at}")
-                st.dataframe(rows, use_container_width=True)
+        # Arrivals for every stop on the trip - re-runs on its own every ARRIVALS_REFRESH_SECONDS
+        live_arrivals(trip_codes, trip_ids, from_code, to_code, to_name)
+
+rerun_timer.lap("cockpit render")
 
 #basic integrity check for phase 1:
-missing_lines = sorted([c for c in stations.keys() if c not in lines_raw])
-missing_stations = sorted([c for c in lines_raw.keys() if c not in stations])
+missing_lines = quality.missing_lines
+missing_stations = quality.missing_stations
 
 with st.expander("Basic data checks", expanded=False):
     st.write(f"Stations loaded: **{len(stations)}**")
@@ -493,11 +417,28 @@ with st.expander("Basic data checks", expanded=False):
         st.warning(f"{len(missing_stations)} line entries have no matching station in stations.json (first 15): {missing_stations[:15]}")
     if not missing_lines and not missing_stations:
         st.success("Station codes match between stations.json and lines.json ✅")
+rerun_timer.lap("basic data checks")
 with st.expander("Complex data checks", expanded=False):
     if not api_key_present:
         st.info("Data unavailable until a TfL API key is set (TFL_API_KEY).")
     else:
         st.write("TfL API key detected ✅")
+        st.caption(f"TfL source: {tfl_source()}")
+        cache_info = get_tfl_cache().info()
+        st.caption(
+            f"Shared TfL cache: {cache_info['size']} entries · hits {cache_info['hits']} · "
+            f"stale hits {cache_info['stale_hits']} · misses {cache_info['misses']} · hit rate {cache_info['hit_rate']:.0%} · "
+            f"coalesced {cache_info['coalesced']} · budget left {cache_info.get('budget_remaining', '—')}/min")
+        poller = get_status_poller()
+        st.caption(f"Background status poller: {poller.polls} polls every {poller.interval:.0f}s"
+                   + (f" · last error: {poller.last_error}" if poller.last_error else ""))
+        history = get_status_history()
+        st.caption(f"Status history: {len(history)} rows in {len(history.index)} daily partitions")
+        reliability = get_reliability_index()
+        st.caption(f"Reliability index: {len(reliability.lines)} lines x 168 hours of week · {len(reliability)} samples · "
+                   f"{reliability.updates} updates this process")
+        stop_index = get_stop_index()
+        st.caption(f"StopPoint index: {len(stop_index)} stations cached · {stop_index.misses} lookups needed a search")
         live = st.session_state.get("live", {})
         tube_status_live = live.get("status")
         tube_status_ts = live.get("status_ts")
@@ -507,18 +448,10 @@ with st.expander("Complex data checks", expanded=False):
         if tube_status_live is None:
             st.info("Tube status unavailable until you click **Refresh live data**.")
         else:
-            good = 0
-            disrupted = 0
-            for ln in tube_status_live:
-                statuses = ln.get("lineStatuses") or []
-                desc = (statuses[0].get("statusSeverityDescription") if statuses else "") or ""
-                if "Good Service" in desc:
-                    good += 1
-                else:
-                    disrupted += 1
+            summary = status_summary if tube_status_live is tube_status else summarise_status(tube_status_live)
             st.write(f"Lines returned: **{len(tube_status_live)}**")
-            st.write(f"Good service: **{good}**")
-            st.write(f"Disrupted: **{disrupted}**")
+            st.write(f"Good service: **{summary.good}**")
+            st.write(f"Disrupted: **{summary.disrupted}**")
             st.caption(f"Last refreshed (status): {tube_status_ts}")
         st.divider()
         #2rrivals summary
@@ -529,19 +462,15 @@ with st.expander("Complex data checks", expanded=False):
             if not arrivals_live:
                 st.info("Arrivals unavailable until you click **Refresh live data**.")
             else:
-                st.write(f"Arrivals rows returned: **{len(arrivals_live)}**")
-                #3 quick “next train” summary
-                next_tts = min(
-                    (a.get("timeToStation") for a in arrivals_live if isinstance(a.get("timeToStation"), int)),
-                    default=None)
-                if next_tts is not None:
-                    st.write(f"Next train ETA: **{max(0, int(next_tts)//60)} min**")
-                lines_present = {a.get("lineName") for a in arrivals_live if a.get("lineName")}
-                st.write(f"Lines represented: **{len(lines_present)}**")
+                st.write(f"Arrivals rows returned: **{arrivals_live.count}**")
+                #3 quick “next train” summary (already computed when the payload was parsed)
+                if arrivals_live.next_tts is not None:
+                    st.write(f"Next train ETA: **{max(0, arrivals_live.next_tts//60)} min**")
+                st.write(f"Lines represented: **{len(arrivals_live.lines)}**")
                 st.caption(f"Last refreshed (arrivals): {arrivals_ts}")
 
     ####NEW DATA QUALITY BADGE
-    status, issues = compute_data_quality(stations, lines_raw)
+    status, issues = quality.status, quality.issues
     if status == "OK":
         badge_text = "✅ Data Quality: OK"
         tooltip = "All checks passed: station codes match, line codes recognised, zones within 1–9."
@@ -568,35 +497,40 @@ with st.expander("Complex data checks", expanded=False):
 </div>
         """,
         unsafe_allow_html=True)
-
+rerun_timer.lap("complex data checks")
+
+with st.expander("Performance", expanded=False):
+    st.caption("Rolling timings across all sessions on this server (last 1000 samples per row). "
+               "'section' rows are parts of a rerun; 'tfl' rows are outbound TfL calls.")
+    perf_rows = perf.summary()
+    if not perf_rows:
+        st.info("No timings recorded yet.")
+    else:
+        st.dataframe(perf_rows, use_container_width=True)
+        st.download_button("Export timings (CSV)", data=perf.to_csv(), file_name="commutech_perf.csv", mime="text/csv")
+    if perf.calls:
+        st.caption("Most recent TfL calls")
+        st.dataframe(list(perf.calls)[-10:][::-1], use_container_width=True)
+rerun_timer.lap("performance panel")
 
 if journey_ready:
     #compute outputs:
-    from_zones = stations[from_code]["zones"]
-    to_zones = stations[to_code]["zones"]
-    
-    intersection = sorted(set(from_lines).intersection(set(to_lines)))
-    union = sorted(set(from_lines).union(set(to_lines)))
+    from_zones = journey.from_zones
+    to_zones = journey.to_zones
+
+    #recommended "target" line is the destination line when changing - post 002 submission
+    recommended = journey.recommended
     journey_hint = None
-    if intersection:
-        #if there are shared lines, randomly picking ONE
-        recommended_line = random.choice(intersection)
-        recommended = [recommended_line]
-    else:
-        origin_pick = random.choice(from_lines) if from_lines else None
-        dest_pick = random.choice(to_lines) if to_lines else None
-        #recommended "target" line is the destination line - post 002 submission
-        recommended_line = dest_pick
-        recommended = [recommended_line] if recommended_line else []
-        if origin_pick and dest_pick:
-            journey_hint = f"Start on **{origin_pick}**, then interchange onto **{dest_pick}** to reach **{to_name}**."
-        elif dest_pick:
-            journey_hint = f"Interchange onto **{dest_pick}** to reach **{to_name}**."
-        else:
-            journey_hint = "No line suggestion available for this journey."
+    if route is None:
+        journey_hint = "No line suggestion available for this journey."
+    elif route.changes > 0:
+        steps = [f"Start on **{route.lines[0]}**"]
+        for ln, via in zip(route.lines[1:], route.via):
+            steps.append(f"change at **{stations.name(via, via)}** onto **{ln}**")
+        journey_hint = ", then ".join(steps) + f" to reach **{to_name}**."
 
     #zone summary:
-    min_fare, max_fare, min_key, max_key = fare_range_for_station_pair(from_zones, to_zones)
+    min_fare, max_fare, min_key, max_key = journey.min_fare, journey.max_fare, journey.min_key, journey.max_key
 
     if min_fare is None:
         zone_summary = "Fare estimate unavailable (zone key not found)"
@@ -604,7 +538,7 @@ if journey_ready:
         band_text = "—"
     else:
         #avg fare for boundary ambiguity
-        avg_fare = (min_fare + max_fare) / 2
+        avg_fare = journey.avg_fare
 
         if min_fare == max_fare:
             zone_summary = f"Zones key: **{min_key}**"
@@ -613,7 +547,7 @@ if journey_ready:
             zone_summary = f"Best-case key: **{min_key}** • Worst-case key: **{max_key}**"
             fare_text = f"£{min_fare:.2f} – £{max_fare:.2f} (avg £{avg_fare:.2f})"
 
-        band_text = price_band(avg_fare) #using mean or average instead of best or worst case
+        band_text = journey.band #using mean or average instead of best or worst case
 
     #layout:
     c1, c2, c3 = st.columns(3)
@@ -653,5 +587,5 @@ if journey_ready:
         "- Operational resilience: richer disruption semantics (line part-closures, station closures) + fallback modes when APIs degrade\n"
         "- Governance & evaluation: reproducible “snapshot runs”, logging of refresh timestamps, and benchmark scenarios for validation\n")
 
-
-
+rerun_timer.lap("journey summary")
+rerun_timer.done()
@@ -0,0 +1,4 @@
+'''
+CommuTech helpers used by "CommuTech - Beta.py" (and the notebook).
+Kept out of the Streamlit script so they can be imported without rendering a page.
+'''
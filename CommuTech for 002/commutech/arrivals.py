@@ -0,0 +1,134 @@
+'''
+Batched arrivals: one /StopPoint/{id1,id2,...}/Arrivals request for every stop on the trip
+(origin, interchange, destination), parsed once into a compact per-stop structure.
+Only the k soonest trains per stop are kept (heap selection, no full sort of the payload).
+
+ArrivalsBuffer remembers the last few polls per stop in fixed-size rings (deque maxlen, LRU
+over stops), so ETA drift and "next train" stability come from memory that never grows.
+'''
+
+import heapq
+import threading
+from collections import OrderedDict, deque
+from typing import NamedTuple
+
+NO_ETA = 10**9#sort key for rows without timeToStation
+
+
+class StopArrivals(NamedTuple):
+    stop_id: str
+    rows: list[dict]#k soonest, ascending timeToStation
+    count: int#rows returned by TfL for this stop
+    next_tts: int | None#seconds to the next train
+    lines: frozenset#line names seen at this stop
+
+
+def _tts(a: dict) -> int:
+    tts = a.get("timeToStation")
+    return tts if isinstance(tts, int) else NO_ETA
+
+
+def arrivals_path(stop_ids: list[str]) -> str:
+    """TfL accepts comma separated ids - one request for the whole trip."""
+    return f"/StopPoint/{','.join(dict.fromkeys(stop_ids))}/Arrivals"
+
+
+def parse_arrivals(payload: list | None, k: int = 20) -> dict[str, StopArrivals]:
+    """Group a (possibly multi-stop) arrivals payload by naptanId and keep the top-k per stop."""
+    by_stop: dict[str, list] = {}
+    for a in payload or []:
+        by_stop.setdefault(a.get("naptanId") or "", []).append(a)
+    out = {}
+    for stop_id, rows in by_stop.items():
+        top = heapq.nsmallest(k, rows, key=_tts)
+        nxt = _tts(top[0]) if top else NO_ETA
+        out[stop_id] = StopArrivals(
+            stop_id,
+            top,
+            len(rows),
+            None if nxt == NO_ETA else nxt,
+            frozenset(a.get("lineName") for a in rows if a.get("lineName")),)
+    return out
+
+
+def eta_minutes(a: dict) -> int | None:
+    tts = a.get("timeToStation")
+    return max(0, int(tts) // 60) if isinstance(tts, int) else None
+
+
+def train_key(a: dict) -> str:
+    """Same train across polls: vehicleId when TfL has one, else the prediction id, else line + destination."""
+    return f"{a.get('lineName', '')}|{a.get('vehicleId') or a.get('id') or a.get('destinationName', '')}"
+
+
+class ArrivalsPoll(NamedTuple):
+    ts: float#when the payload was fetched (epoch s)
+    trains: tuple[tuple[str, int], ...]#(train_key, timeToStation), soonest first
+
+
+class StopDrift(NamedTuple):
+    polls: int
+    span_s: float#first -> latest poll in the ring
+    next_key: str | None
+    next_eta_s: int | None
+    next_drift_s: float | None#next train's predicted arrival now vs when first seen (+ = later)
+    mean_abs_drift_s: float | None#same, averaged over the trains in the latest poll
+    next_stability: float | None#share of consecutive polls with the same next train
+
+
+class ArrivalsBuffer:
+    """
+    Per-stop ring of the last `polls` arrivals polls, for at most `max_stops` stops (least recently
+    recorded evicted). Shared by every session; a payload already recorded (same fetch time) is skipped.
+    """
+
+    def __init__(self, polls: int = 30, max_stops: int = 256, k: int = 10):
+        self.polls = polls
+        self.max_stops = max_stops
+        self.k = k
+        self._stops: OrderedDict[str, deque] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._stops)
+
+    def record(self, by_stop: dict[str, StopArrivals], ts: float) -> int:
+        """Add one poll per stop from parse_arrivals() output. Returns stops recorded."""
+        n = 0
+        with self._lock:
+            for stop_id, sa in by_stop.items():
+                ring = self._stops.get(stop_id)
+                if ring is None:
+                    ring = self._stops[stop_id] = deque(maxlen=self.polls)
+                    while len(self._stops) > self.max_stops:
+                        self._stops.popitem(last=False)
+                elif ring and ring[-1].ts >= ts:
+                    continue#cache served the same payload again
+                self._stops.move_to_end(stop_id)
+                ring.append(ArrivalsPoll(ts, tuple((train_key(a), _tts(a)) for a in sa.rows[:self.k] if _tts(a) != NO_ETA)))
+                n += 1
+        return n
+
+    def history(self, stop_id: str) -> list[ArrivalsPoll]:
+        with self._lock:
+            return list(self._stops.get(stop_id, ()))
+
+    def drift(self, stop_id: str) -> StopDrift | None:
+        polls = self.history(stop_id)
+        if not polls:
+            return None
+        first_seen: dict[str, float] = {}#train -> predicted arrival (epoch s) at first sighting
+        for p in polls:
+            for key, tts in p.trains:
+                first_seen.setdefault(key, p.ts + tts)
+        last = polls[-1]
+        drifts = [last.ts + tts - first_seen[key] for key, tts in last.trains]
+        next_keys = [p.trains[0][0] for p in polls if p.trains]
+        same = sum(a == b for a, b in zip(next_keys, next_keys[1:]))
+        return StopDrift(
+            len(polls), last.ts - polls[0].ts,
+            last.trains[0][0] if last.trains else None,
+            last.trains[0][1] if last.trains else None,
+            drifts[0] if drifts else None,
+            sum(abs(d) for d in drifts) / len(drifts) if drifts else None,
+            same / (len(next_keys) - 1) if len(next_keys) > 1 else None,)
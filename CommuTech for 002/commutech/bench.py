@@ -0,0 +1,261 @@
+'''
+Micro-benchmarks for the reference-data hot paths.
+
+Each case runs against the real stations.json/lines.json ("x1") and against generated networks
+10x and 100x larger (more stations and lines, ~30% zone-boundary stations, a sprinkling of
+out-of-range zones and unmapped stations so the quality checks have work to do):
+
+    parse_station_value     every station value
+    fare_range_pair         fare_range_for_station_pair over sampled OD pairs
+    fare_matrix_pair        FareMatrix.pair over the same pairs
+    severity_weight         every status description in a synthetic status payload
+    line_score              every line object in that payload
+    summarise_status        the whole payload in one pass
+    compute_data_quality    one full check of the network
+    quality_incremental     re-check after ~1% of lines.json entries changed (QualityIndex previous=)
+    journey                 JourneyEngine.journey over sampled OD pairs (warm route table)
+    journey_batch           JourneyEngine.batch over the sampled pairs
+
+Reports ops/sec (best of --repeat timed passes) and traced allocation peak per op. Results can
+be saved as a baseline (data/bench/baseline.json) and later runs flag any case whose ops/sec
+dropped by more than --tolerance:
+
+    python -m commutech.bench --scales 1 10 100 --save
+    python -m commutech.bench --scales 1 10 --compare      # exit 1 on regression
+'''
+
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, NamedTuple
+
+from .fares import FareMatrix, MAX_ZONE, fare_range_for_station_pair
+from .journey import APP_DIR, LINE_NAME, PEAK_FARE_BY_ZONES_KEY, JourneyEngine
+from .quality import QualityIndex, compute_data_quality
+from .refdata import ReferenceData, StationStore, parse_station_value
+from .routing import RouteGraph
+from .status import SEVERITY_DESCRIPTIONS, line_score, severity_weight, summarise_status
+
+BENCH_DIR = Path(__file__).resolve().parents[2] / "data" / "bench"
+BASELINE = BENCH_DIR / "baseline.json"
+SCALES = (1, 10, 100)
+STATUS_DESCS = ["Good Service", "Minor Delays", "Severe Delays", "Part Suspended", "Part Closure",
+                "Reduced Service", "Suspended", "Planned Closure", "Service Closed", "Special Service", ""]
+
+
+class Network(NamedTuple):
+    label: str
+    stations_raw: dict[str, str]
+    lines_raw: dict[str, list[str]]
+    line_names: dict[str, str]
+
+
+class Case(NamedTuple):
+    name: str
+    ops: int
+    fn: Callable[[], object]
+
+
+def real_network() -> Network:
+    stations = json.loads((APP_DIR / "stations.json").read_text(encoding="utf-8"))
+    lines = json.loads((APP_DIR / "lines.json").read_text(encoding="utf-8"))
+    return Network("x1", stations, lines, LINE_NAME)
+
+
+def synthetic_network(scale: int, seed: int = 0) -> Network:
+    """
+    ~271 x scale stations on 11 x ceil(sqrt(scale)) lines. Every line runs through a contiguous
+    zone range; stations pick 1 line (most), 2-5 lines (hubs, ~12%); ~30% sit on a zone boundary.
+    """
+    rng = random.Random(seed)
+    n_stations = 271 * scale
+    n_lines = 11 * int(-(-scale ** 0.5 // 1))
+    line_codes = [f"L{i}" for i in range(n_lines)]
+    line_names = {c: f"Line {i}" for i, c in enumerate(line_codes)}
+    spans = {c: sorted(rng.sample(range(1, MAX_ZONE + 1), 2)) for c in line_codes}
+
+    stations, lines = {}, {}
+    for i in range(n_stations):
+        code = f"S{i:06d}"
+        own = rng.sample(line_codes, rng.choice([2, 2, 3, 3, 4, 5]) if rng.random() < 0.12 else 1)
+        lo, hi = spans[own[0]]
+        z = rng.randint(lo, hi)
+        zones = [z, z + 1] if rng.random() < 0.3 and z < MAX_ZONE else [z]
+        if rng.random() < 0.002:
+            zones = [rng.choice([0, MAX_ZONE + 1])]#out-of-range for the quality check
+        stations[code] = f"Station {i}|" + "|".join(map(str, zones))
+        if rng.random() > 0.003:#a few stations missing from lines.json
+            lines[code] = own
+    return Network(f"x{scale}", stations, lines, line_names)
+
+
+def _reference(net: Network) -> ReferenceData:
+    """build_reference without the all-pairs route precompute (cost grows with line-set count squared)."""
+    store = StationStore(net.stations_raw, net.lines_raw)
+    graph = RouteGraph(net.lines_raw, net.line_names)
+    return ReferenceData("", store, net.lines_raw, graph, FareMatrix(PEAK_FARE_BY_ZONES_KEY, store.zone_map()))
+
+
+def _status_payload(net: Network, rng: random.Random) -> list[dict]:
+    severity = {d: c for c, d in SEVERITY_DESCRIPTIONS.items()}
+    payload = []
+    for code, name in net.line_names.items():
+        descs = [rng.choice(STATUS_DESCS) for _ in range(rng.choice([1, 1, 1, 2, 3]))]
+        statuses = [{"statusSeverity": severity.get(d), "statusSeverityDescription": d,
+                     "reason": rng.choice(["", "", "Signal failure at a station."])} for d in descs]
+        payload.append({"id": code, "name": name, "lineStatuses": statuses})
+    return payload
+
+
+def build_cases(net: Network, pairs: int = 2000, seed: int = 0) -> list[Case]:
+    rng = random.Random(seed)
+    ref = _reference(net)
+    engine = JourneyEngine(ref)
+    codes = list(ref.stations.keys())
+    od = [(rng.choice(codes), rng.choice(codes)) for _ in range(pairs)]
+    origins, dests = [o for o, _ in od], [d for _, d in od]
+    zones = [(ref.stations.zones(o), ref.stations.zones(d)) for o, d in od]
+    values = list(net.stations_raw.values())
+    payload = _status_payload(net, rng)
+    descs = [s["statusSeverityDescription"] for ln in payload for s in ln["lineStatuses"]]
+    quality = QualityIndex(ref.stations, net.lines_raw, net.line_names)
+    edited = dict(net.lines_raw)
+    for code in rng.sample(list(edited), max(1, len(edited) // 100)):
+        edited[code] = list(edited[code])[::-1] + ["X"]#reordered + one unknown code
+    for o, d in od:#warm the route table, as in the app after the first few lookups
+        engine.best_route(o, d)
+
+    fm = ref.fare_matrix
+    return [
+        Case("parse_station_value", len(values), lambda: [parse_station_value(v) for v in values]),
+        Case("fare_range_pair", len(zones),
+             lambda: [fare_range_for_station_pair(a, b, PEAK_FARE_BY_ZONES_KEY) for a, b in zones]),
+        Case("fare_matrix_pair", len(od), lambda: [fm.pair(o, d) for o, d in od]),
+        Case("severity_weight", len(descs), lambda: [severity_weight(d) for d in descs]),
+        Case("line_score", len(payload), lambda: [line_score(ln) for ln in payload]),
+        Case("summarise_status", len(payload), lambda: summarise_status(payload)),
+        Case("compute_data_quality", 1, lambda: compute_data_quality(ref.stations, net.lines_raw, net.line_names)),
+        Case("quality_incremental", 1,
+             lambda: QualityIndex(ref.stations, edited, net.line_names, previous=quality)),
+        Case("journey", len(od), lambda: [engine.journey(o, d) for o, d in od]),
+        Case("journey_batch", len(od), lambda: engine.batch(origins, dests)),]
+
+
+def measure(case: Case, repeat: int = 5, min_time: float = 0.2) -> dict:
+    """Best-of-repeat ops/sec (each pass loops the case until min_time), then one traced pass for allocations."""
+    case.fn()#warm-up
+    loops, t = 1, 0.0
+    while True:
+        t0 = time.perf_counter()
+        for _ in range(loops):
+            case.fn()
+        t = time.perf_counter() - t0
+        if t >= min_time or loops >= 1 << 20:
+            break
+        loops *= 2
+    best = t / loops
+    for _ in range(repeat - 1):
+        t0 = time.perf_counter()
+        for _ in range(loops):
+            case.fn()
+        best = min(best, (time.perf_counter() - t0) / loops)
+
+    tracemalloc.start()
+    try:
+        case.fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"ops": case.ops, "ops_per_s": round(case.ops / best, 1) if best else None,
+            "us_per_op": round(best / case.ops * 1e6, 4), "alloc_peak_kb": round(peak / 1024, 1),
+            "alloc_bytes_per_op": round(peak / case.ops, 1)}
+
+
+def run(scales=SCALES, repeat: int = 5, min_time: float = 0.2, pairs: int = 2000, seed: int = 0,
+        only: list[str] | None = None) -> dict:
+    results = {}
+    for scale in scales:
+        net = real_network() if scale == 1 else synthetic_network(scale, seed)
+        t0 = time.perf_counter()
+        cases = build_cases(net, pairs, seed)
+        setup = time.perf_counter() - t0
+        results[net.label] = {"stations": len(net.stations_raw), "lines": len(net.line_names),
+                              "setup_s": round(setup, 3), "cases": {}}
+        for case in cases:
+            if only and case.name not in only:
+                continue
+            results[net.label]["cases"][case.name] = measure(case, repeat, min_time)
+    return {"generated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "machine": {"python": platform.python_version(), "platform": platform.platform(), "cpu_count": os.cpu_count()},
+            "results": results}
+
+
+def compare(report: dict, baseline: dict, tolerance: float = 0.2) -> list[dict]:
+    """Cases whose ops/sec fell more than `tolerance` (fraction) below the baseline."""
+    out = []
+    for label, res in report["results"].items():
+        base = baseline.get("results", {}).get(label, {}).get("cases", {})
+        for name, m in res["cases"].items():
+            b = base.get(name)
+            if not b or not b.get("ops_per_s") or not m.get("ops_per_s"):
+                continue
+            change = m["ops_per_s"] / b["ops_per_s"] - 1
+            m["vs_baseline"] = round(change, 3)
+            if change < -tolerance:
+                out.append({"network": label, "case": name, "baseline_ops_per_s": b["ops_per_s"],
+                            "ops_per_s": m["ops_per_s"], "change": round(change, 3)})
+    return out
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m commutech.bench", description="Reference-data hot-path benchmarks.")
+    ap.add_argument("--scales", type=int, nargs="+", default=list(SCALES), help="1 = real network, N = synthetic N x")
+    ap.add_argument("--only", nargs="+", help="case names to run")
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--min-time", type=float, default=0.2, help="seconds per timed pass")
+    ap.add_argument("--pairs", type=int, default=2000, help="OD pairs for the fare/journey cases")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--baseline", default=str(BASELINE))
+    ap.add_argument("--save", action="store_true", help="write this run as the baseline")
+    ap.add_argument("--compare", action="store_true", help="exit 1 if a case regressed past --tolerance")
+    ap.add_argument("--tolerance", type=float, default=0.2)
+    ap.add_argument("-o", "--output", help="also write the JSON report here")
+    args = ap.parse_args(argv)
+
+    report = run(args.scales, args.repeat, args.min_time, args.pairs, args.seed, args.only)
+    baseline_path = Path(args.baseline)
+    regressions = []
+    if baseline_path.exists() and not args.save:
+        regressions = compare(report, json.loads(baseline_path.read_text(encoding="utf-8")), args.tolerance)
+        report["regressions"] = regressions
+
+    for label, res in report["results"].items():
+        print(f"{label}: {res['stations']} stations, {res['lines']} lines (setup {res['setup_s']} s)")
+        for name, m in res["cases"].items():
+            vs = f"  {m['vs_baseline']:+.1%}" if "vs_baseline" in m else ""
+            print(f"  {name:<22} {m['ops_per_s']:>14,.0f} ops/s  {m['us_per_op']:>10.3f} us/op  "
+                  f"{m['alloc_bytes_per_op']:>10,.0f} B/op{vs}")
+    for r in regressions:
+        print(f"REGRESSION {r['network']}/{r['case']}: {r['baseline_ops_per_s']:,.0f} -> {r['ops_per_s']:,.0f} ops/s ({r['change']:+.1%})")
+
+    text = json.dumps(report, indent=1)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+    if args.save:
+        baseline_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = baseline_path.with_suffix(".tmp")
+        tmp.write_text(text + "\n", encoding="utf-8")
+        os.replace(tmp, baseline_path)
+        print(f"Baseline saved -> {baseline_path}")
+    return 1 if args.compare and regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
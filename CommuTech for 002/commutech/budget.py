@@ -0,0 +1,44 @@
+'''
+Token-bucket tracker for our TfL quota.
+TfL's default registered-key limit is 500 requests/minute; we keep a slice in reserve
+so a burst of refreshes degrades to "last good data" instead of HTTP 429s.
+'''
+
+import threading
+import time
+
+
+class TokenBucket:
+    def __init__(self, per_minute: float = 500, burst: float | None = None, reserve: float = 0.1):
+        self.rate = per_minute / 60.0#tokens per second
+        self.capacity = float(burst if burst is not None else per_minute)
+        self.reserve = self.capacity * reserve#below this we call the budget "low"
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+        self.granted = 0
+        self.denied = 0
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def try_acquire(self, n: float = 1) -> bool:
+        with self._lock:
+            self._refill()
+            if self._tokens >= n:
+                self._tokens -= n
+                self.granted += 1
+                return True
+            self.denied += 1
+            return False
+
+    def remaining(self) -> float:
+        with self._lock:
+            self._refill()
+            return self._tokens
+
+    def low(self) -> bool:
+        """True once we're into the reserve - callers with a cached fallback should use it."""
+        return self.remaining() <= self.reserve
@@ -0,0 +1,182 @@
+'''
+Process-wide response cache in front of the TfL client.
+
+Shared by every Streamlit session (held via st.cache_resource), so 200 open dashboards
+cost one /Line/Mode/tube/Status call per TTL window instead of 200.
+- per-endpoint TTLs (path regex -> fresh seconds, extra stale seconds)
+- stale-while-revalidate: a stale entry is served immediately and refreshed in the background
+- stale-if-error: if a refetch fails, the last good payload is served instead of the error
+- bounded size with LRU eviction, plus hit/miss counters
+- misses are single-flighted (identical concurrent requests share one GET) and charged to an
+  optional TokenBucket; when the budget runs low the last good payload is served instead
+'''
+
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from .budget import TokenBucket
+from .singleflight import SingleFlight
+
+#(path regex, fresh ttl seconds, stale window seconds) - first match wins
+DEFAULT_TTLS = [
+    (r"^/Line/Mode/[^/]+/Status", 30, 120),
+    (r"^/Line/[^/]+/Status", 30, 120),
+    (r"^/StopPoint/[^/]+/Arrivals", 15, 30),
+    (r"^/StopPoint/Search/", 24 * 3600, 7 * 24 * 3600),]
+
+
+def cache_key(path: str, params: dict | None = None) -> tuple:
+    """Stable key for (path, params) - params order doesn't matter, app_key is never part of it."""
+    items = tuple(sorted((k, str(v)) for k, v in (params or {}).items() if k != "app_key"))
+    return (path, items)
+
+
+class ResponseCache:
+    """
+    Thread-safe TTL + LRU cache wrapping a TflClient (anything with .get(path, params)).\n
+    .get() keeps the (data, err) convention so it can sit behind tfl_get unchanged.
+    """
+
+    def __init__(self, client, ttls: list[tuple[str, float, float]] | None = None,
+                 default_ttl: float = 30, default_stale: float = 60, max_entries: int = 512,
+                 budget: TokenBucket | None = None):
+        self.client = client
+        self.rules = [(re.compile(p), fresh, stale) for p, fresh, stale in (ttls or DEFAULT_TTLS)]
+        self.default_ttl = default_ttl
+        self.default_stale = default_stale
+        self.max_entries = max_entries
+        self._data: OrderedDict = OrderedDict()#key -> (payload, fetched_monotonic, fetched_epoch, fresh, stale)
+        self._lock = threading.Lock()
+        self._revalidating: set = set()
+        self._bg = ThreadPoolExecutor(max_workers=2, thread_name_prefix="tfl-swr")
+        self._pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="tfl-fanout")
+        self.flight = SingleFlight()
+        self.budget = budget
+        self.stats = {"hits": 0, "stale_hits": 0, "misses": 0, "errors_masked": 0, "budget_saves": 0, "evictions": 0}
+
+    def _count(self, name: str):
+        with self._lock:
+            self.stats[name] += 1
+
+    def budget_low(self) -> bool:
+        """True while the request budget is nearly spent (misses then serve the last good payload)."""
+        return self.budget is not None and self.budget.low()
+
+    def ttl_for(self, path: str) -> tuple[float, float]:
+        for rx, fresh, stale in self.rules:
+            if rx.search(path):
+                return fresh, stale
+        return self.default_ttl, self.default_stale
+
+    def _store(self, key: tuple, path: str, payload):
+        fresh, stale = self.ttl_for(path)
+        with self._lock:
+            self._data[key] = (payload, time.monotonic(), time.time(), fresh, stale)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.stats["evictions"] += 1
+
+    def _lookup(self, key: tuple):
+        """Returns (entry, state) with state in {"fresh", "stale", "expired", None}."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None, None
+            self._data.move_to_end(key)
+        age = time.monotonic() - entry[1]
+        if age <= entry[3]:
+            return entry, "fresh"
+        if age <= entry[3] + entry[4]:
+            return entry, "stale"
+        return entry, "expired"
+
+    def _fetch(self, key: tuple, path: str, params: dict | None, fallback=None):
+        #budget nearly spent and we have something to show -> last good payload, no request
+        if fallback is not None and self.budget_low():
+            self._count("budget_saves")
+            return fallback[0], None
+
+        def call():
+            if self.budget is not None and not self.budget.try_acquire():
+                return None, "TfL request budget exhausted - try again shortly"
+            data, err = self.client.get(path, params)
+            if err is None:
+                self._store(key, path, data)
+            return data, err
+
+        data, err = self.flight.do(key, call)
+        if err is not None and fallback is not None:
+            self._count("errors_masked")
+            return fallback[0], None
+        return data, err
+
+    def _revalidate(self, key: tuple, path: str, params: dict | None):
+        if self.budget_low():
+            return
+        with self._lock:
+            if key in self._revalidating:
+                return
+            self._revalidating.add(key)
+
+        def run():
+            try:
+                self._fetch(key, path, params)
+            finally:
+                with self._lock:
+                    self._revalidating.discard(key)
+        self._bg.submit(run)
+
+    def get(self, path: str, params: dict | None = None):
+        key = cache_key(path, params)
+        entry, state = self._lookup(key)
+        if state == "fresh":
+            self._count("hits")
+            return entry[0], None
+        if state == "stale":
+            self._count("stale_hits")
+            self._revalidate(key, path, params)
+            return entry[0], None
+        self._count("misses")
+        return self._fetch(key, path, params, fallback=entry)
+
+    def refresh(self, path: str, params: dict | None = None):
+        """
+        Forced network fetch (single-flighted, charged to the budget) that writes through to the cache.\n
+        For the background poller: never serves a stale or last-good payload - errors come back as errors.
+        """
+        return self._fetch(cache_key(path, params), path, params)
+
+    def get_many(self, calls: list[tuple[str, dict | None]]) -> list[tuple]:
+        """Cache-aware fan-out: each call goes through get() (cache, single-flight, budget) concurrently."""
+        if len(calls) <= 1:
+            return [self.get(p, q) for p, q in calls]
+        futures = [self._pool.submit(self.get, p, q) for p, q in calls]
+        return [f.result() for f in futures]
+
+    def is_fresh(self, path: str, params: dict | None = None) -> bool:
+        """False when get() would be serving a stale/last-good payload for (path, params)."""
+        return self._lookup(cache_key(path, params))[1] == "fresh"
+
+    def fetched_at(self, path: str, params: dict | None = None) -> float | None:
+        """Epoch seconds of the cached payload for (path, params), or None."""
+        with self._lock:
+            entry = self._data.get(cache_key(path, params))
+        return entry[2] if entry else None
+
+    def info(self) -> dict:
+        with self._lock:
+            stats, size = dict(self.stats), len(self._data)
+        lookups = stats["hits"] + stats["stale_hits"] + stats["misses"]
+        hit_rate = (stats["hits"] + stats["stale_hits"]) / lookups if lookups else 0.0
+        out = {**stats, "size": size, "hit_rate": round(hit_rate, 3), "coalesced": self.flight.coalesced}
+        if self.budget is not None:
+            out["budget_remaining"] = int(self.budget.remaining())
+        return out
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
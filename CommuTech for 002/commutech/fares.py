@@ -0,0 +1,149 @@
+'''
+Zone-based fare logic (Phase 1) plus a precomputed NumPy fare matrix.
+
+Every station is either a single zone or a boundary station (e.g. 2|3), so there are only a
+handful of distinct zone-sets. FareMatrix prices every zone-set pair once; a journey (or a
+50k-row commuter roster) is then an index lookup instead of a Python loop per pair.
+'''
+
+import warnings
+
+import numpy as np
+
+MAX_ZONE = 9
+#(upper bound inclusive, label) - anything above the last bound is "Expensive"
+PRICE_BANDS = ((2.30, "Cheaper"), (4.00, "Mid"))
+TOP_BAND = "Expensive"
+
+
+def zones_key(min_zone: int, max_zone: int) -> str:
+    """Return the contiguous zones key like '2345' for min=2 max=5."""
+    return "".join(str(z) for z in range(min_zone, max_zone + 1))
+
+
+def fare_range_for_station_pair(origin_zones: list[int], dest_zones: list[int], fare_table: dict[str, float]):
+    """
+    For boundary stations (e.g. 2|3), try all zone combinations and return:
+    - min fare + its zones key
+    - max fare + its zones key
+    This is Phase 1: zone-based estimate only (no route graph).
+    """
+    fares = []
+    for oz in origin_zones:
+        for dz in dest_zones:
+            mn, mx = min(oz, dz), max(oz, dz)
+            key = zones_key(mn, mx)
+            fare = fare_table.get(key)
+            if fare is not None:
+                fares.append((fare, key))
+
+    if not fares:
+        return None, None, None, None
+
+    fares.sort(key=lambda t: t[0])
+    min_fare, min_key = fares[0]
+    max_fare, max_key = fares[-1]
+    return min_fare, max_fare, min_key, max_key
+
+
+def price_band(fare: float) -> str:
+    """Simple Phase 1 buckets."""
+    for bound, label in PRICE_BANDS:
+        if fare <= bound:
+            return label
+    return TOP_BAND
+
+
+def price_bands(fares: np.ndarray) -> np.ndarray:
+    """Vectorised price_band; NaN fares -> None."""
+    fares = np.asarray(fares, dtype=float)
+    conds = [fares <= bound for bound, _ in PRICE_BANDS] + [fares > PRICE_BANDS[-1][0]]
+    labels = [label for _, label in PRICE_BANDS] + [TOP_BAND]
+    return np.select(conds, labels, default=None).astype(object)
+
+
+class FareMatrix:
+    """
+    zone x zone fare table -> zone-set x zone-set min/max fare matrices, built once.\n
+    fare_table: PEAK_FARE_BY_ZONES_KEY; station_zones: {code: [zones]}.
+    """
+
+    def __init__(self, fare_table: dict[str, float], station_zones: dict[str, list[int]]):
+        #zone x zone: fare for travelling between zones a and b (NaN when the key isn't in the table)
+        zf = np.full((MAX_ZONE + 1, MAX_ZONE + 1), np.nan)
+        for a in range(1, MAX_ZONE + 1):
+            for b in range(1, MAX_ZONE + 1):
+                fare = fare_table.get(zones_key(min(a, b), max(a, b)))
+                if fare is not None:
+                    zf[a, b] = fare
+        self.zone_fare = zf
+
+        #distinct zone-sets, padded to equal width by repeating the last zone
+        sets = sorted({tuple(z) for z in station_zones.values() if z})
+        width = max((len(s) for s in sets), default=1)
+        zs = np.array([list(s) + [s[-1]] * (width - len(s)) for s in sets] or [[0]], dtype=np.int64)
+        zs = np.where((zs < 1) | (zs > MAX_ZONE), 0, zs)#out-of-range zones price as "unknown" (row/col 0 is NaN)
+        self.zone_sets = zs
+        self.set_index = {s: i for i, s in enumerate(sets)}
+
+        #candidates[i, j, k] = fare of the k-th (origin zone, dest zone) combination for sets i, j
+        n = len(zs)
+        cand = zf[zs[:, None, :, None], zs[None, :, None, :]].reshape(n, n, width * width)
+        has = ~np.isnan(cand).all(axis=2)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)#all-NaN slices -> NaN is what we want
+            self.min_fare = np.nanmin(cand, axis=2)
+            self.max_fare = np.nanmax(cand, axis=2)
+        #same tie-break as fare_range_for_station_pair: first min, last max in zone loop order
+        filled_lo = np.where(np.isnan(cand), np.inf, cand)
+        filled_hi = np.where(np.isnan(cand), -np.inf, cand)
+        min_k = np.where(has, filled_lo.argmin(axis=2), -1)
+        max_k = np.where(has, width * width - 1 - filled_hi[:, :, ::-1].argmax(axis=2), -1)
+
+        #station code -> zone-set index (sorted codes so batches can use searchsorted)
+        codes = sorted(c for c, z in station_zones.items() if z)
+        self.codes = np.array(codes)
+        self.station_set = np.array([self.set_index[tuple(station_zones[c])] for c in codes], dtype=np.int64)
+
+        #pair() is called per render: answer it from plain Python lists/dicts, no NumPy scalars
+        sets_py = zs.tolist()
+
+        def key(i, j, k):
+            oz, dz = sets_py[i][k // width], sets_py[j][k % width]
+            return zones_key(min(oz, dz), max(oz, dz))
+
+        unknown = (None, None, None, None)
+        self._pairs = [[(lo, hi, key(i, j, kl), key(i, j, kh)) if kl >= 0 else unknown
+                        for j, (lo, hi, kl, kh) in enumerate(zip(*row))]
+                       for i, row in enumerate(zip(self.min_fare.tolist(), self.max_fare.tolist(),
+                                                   min_k.tolist(), max_k.tolist()))]
+        self._code_set = dict(zip(codes, self.station_set.tolist()))
+
+    def pair(self, origin: str, dest: str):
+        """Same contract as fare_range_for_station_pair: (min_fare, max_fare, min_key, max_key)."""
+        i, j = self._code_set.get(origin), self._code_set.get(dest)
+        if i is None or j is None:
+            return None, None, None, None
+        return self._pairs[i][j]
+
+    def station_sets(self, codes) -> np.ndarray:
+        """Station codes -> zone-set indices (-1 for unknown codes), fully vectorised."""
+        codes = np.asarray(codes, dtype=self.codes.dtype if len(self.codes) else str)
+        pos = np.searchsorted(self.codes, codes)
+        pos = np.clip(pos, 0, max(len(self.codes) - 1, 0))
+        known = (self.codes[pos] == codes) if len(self.codes) else np.zeros(codes.shape, bool)
+        return np.where(known, self.station_set[pos] if len(self.codes) else -1, -1)
+
+    def batch(self, origins, dests) -> dict[str, np.ndarray]:
+        """
+        Price many OD pairs at once.\n
+        Returns {"min", "max", "avg"} float arrays (NaN = unknown) and "band" (object array, None = unknown).
+        """
+        oi = self.station_sets(origins)
+        di = self.station_sets(dests)
+        ok = (oi >= 0) & (di >= 0)
+        oi_s, di_s = np.where(ok, oi, 0), np.where(ok, di, 0)
+        mn = np.where(ok, self.min_fare[oi_s, di_s], np.nan)
+        mx = np.where(ok, self.max_fare[oi_s, di_s], np.nan)
+        avg = (mn + mx) / 2
+        return {"min": mn, "max": mx, "avg": avg, "band": price_bands(avg)}
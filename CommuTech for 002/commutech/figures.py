@@ -0,0 +1,565 @@
+'''
+Incremental, parallel export of the notebook's slide-deck figures.
+
+Each figure is a FigureSpec: output filename, a render function (module level, below - the
+plotting bodies of the notebook's figure cells, moved here so worker processes can import them),
+the frames it draws and the parameters it depends on (LOOKAHEAD_DAYS, COMMUTE_WINDOWS, tz...).
+The spec hash covers the inputs' contents, the parameters, dpi/savefig options and this module's
+source; figures/.figures.json records the hash each PNG was rendered from, so export_figures()
+renders only figures whose hash changed (or whose PNG is missing), in a process pool on Agg.
+
+Render-time text (the "Generated: ..." bullet / stamp) is not an input: a skipped figure keeps
+the stamp of the run that last rendered it.
+'''
+
+import hashlib
+import inspect
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, NamedTuple
+
+import matplotlib
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+
+from .intervals import COMMUTE_WINDOWS, LOCAL_TZ, bin_hours
+
+FIGURES_DIR = Path(__file__).resolve().parents[2] / "figures"
+MANIFEST = ".figures.json"
+DAYS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+PASTELS = list(plt.cm.Pastel1.colors) + list(plt.cm.Pastel2.colors)
+
+
+class FigureSpec(NamedTuple):
+    filename: str
+    render: Callable#module-level render(**inputs, **params) -> matplotlib Figure
+    inputs: dict#frames / series / arrays, hashed by content
+    params: dict#scalars and small structures, hashed by repr
+    dpi: int = 220
+    savefig: dict = {}#extra savefig kwargs, e.g. {"bbox_inches": "tight"}
+
+
+#hashing
+def _digest_value(h, value):
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        h.update(repr((type(value).__name__, getattr(value, "name", None),
+                       list(value.columns) if isinstance(value, pd.DataFrame) else None,
+                       [str(d) for d in (value.dtypes if isinstance(value, pd.DataFrame) else [value.dtype])])).encode())
+        h.update(pd.util.hash_pandas_object(value, index=True).to_numpy().tobytes())
+    elif isinstance(value, np.ndarray):
+        h.update(repr((value.dtype.str, value.shape)).encode())
+        h.update(np.ascontiguousarray(value).tobytes() if value.dtype != object else repr(value.tolist()).encode())
+    elif isinstance(value, dict):
+        for k in sorted(value):
+            h.update(repr(k).encode())
+            _digest_value(h, value[k])
+    else:
+        h.update(repr(value).encode())
+
+
+def spec_hash(spec: FigureSpec) -> str:
+    """sha1 over renderer (+ its module's source), inputs, params and output options."""
+    h = hashlib.sha1(f"{spec.render.__module__}.{spec.render.__qualname__}".encode())
+    h.update(_module_source(spec.render.__module__).encode())
+    _digest_value(h, dict(spec.inputs))
+    _digest_value(h, dict(spec.params))
+    h.update(repr((spec.filename, spec.dpi, sorted(spec.savefig.items()))).encode())
+    return h.hexdigest()
+
+
+_SOURCES: dict[str, str] = {}
+
+
+def _module_source(name: str) -> str:
+    if name not in _SOURCES:
+        try:
+            _SOURCES[name] = inspect.getsource(sys.modules[name])
+        except (KeyError, OSError, TypeError):
+            _SOURCES[name] = ""#e.g. defined in a notebook: inputs/params still count
+    return _SOURCES[name]
+
+
+def load_manifest(out_dir: str | Path = FIGURES_DIR) -> dict:
+    path = Path(out_dir) / MANIFEST
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_manifest(out_dir: Path, manifest: dict):
+    tmp = out_dir / (MANIFEST + ".tmp")
+    tmp.write_text(json.dumps(manifest, indent=1, sort_keys=True), encoding="utf-8")
+    os.replace(tmp, out_dir / MANIFEST)
+
+
+#rendering
+def _init_worker():
+    matplotlib.use("Agg", force=True)
+
+
+def _render_job(args) -> tuple[str, str | None, float]:
+    """Worker: render one spec to <out_dir>/<filename> (atomic) -> (filename, error, seconds)."""
+    spec, out_dir = args
+    t0 = time.perf_counter()
+    out = Path(out_dir) / spec.filename
+    fig = None
+    try:
+        fig = spec.render(**spec.inputs, **spec.params)
+        tmp = out.with_name(out.name + ".tmp")
+        fig.savefig(tmp, dpi=spec.dpi, format=out.suffix.lstrip(".") or "png", **spec.savefig)
+        os.replace(tmp, out)
+        err = None
+    except Exception as e:
+        err = f"{type(e).__name__}: {e}"
+    finally:
+        if fig is not None:
+            plt.close(fig)
+    return spec.filename, err, time.perf_counter() - t0
+
+
+def export_figures(specs, out_dir: str | Path = FIGURES_DIR, max_workers: int | None = None,
+                   force: bool = False) -> pd.DataFrame:
+    """
+    Render the specs whose hash differs from the manifest (all of them with force=True).\n
+    Returns one row per spec: filename, status (rendered / skipped / error), seconds, error, hash.
+    Failed figures keep their old PNG and manifest entry, so they are retried next run.
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    manifest = load_manifest(out_dir)
+    specs = list(specs)
+    hashes = {s.filename: spec_hash(s) for s in specs}
+    todo = [s for s in specs if force or manifest.get(s.filename, {}).get("hash") != hashes[s.filename]
+            or not (out_dir / s.filename).exists()]
+
+    results = {}
+    if todo:
+        jobs = [(s, str(out_dir)) for s in todo]
+        workers = max(1, min(len(jobs), max_workers or os.cpu_count() or 1))
+        if workers == 1:
+            done = [_render_job(j) for j in jobs]
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+                done = list(pool.map(_render_job, jobs))
+        stamp = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        for filename, err, secs in done:
+            results[filename] = (err, secs)
+            if err is None:
+                manifest[filename] = {"hash": hashes[filename], "rendered_at": stamp, "seconds": round(secs, 3)}
+        _save_manifest(out_dir, manifest)
+
+    rows = []
+    for s in specs:
+        err, secs = results.get(s.filename, (None, 0.0))
+        status = "skipped" if s.filename not in results else ("error" if err else "rendered")
+        rows.append({"filename": s.filename, "status": status, "seconds": round(secs, 3),
+                     "error": err, "hash": hashes[s.filename][:12]})
+    return pd.DataFrame(rows)
+
+
+#renderers
+def _now_stamp(tz: str) -> str:
+    return pd.Timestamp.now(tz=tz).strftime("%d %b %Y %H:%M %Z")
+
+
+def _bullet_box(fig, bullets: list[str], alpha: float = 0.95):
+    fig.text(0.02, 0.02, "- " + "\n- ".join(bullets), ha="left", va="bottom", fontsize=10, linespacing=1.35,
+             bbox=dict(boxstyle="round,pad=0.35", facecolor="white", edgecolor="0.85", alpha=alpha))
+
+
+def _slide(fig, title: str | None, lookahead: int | None, tz: str):
+    """What the notebook's slide_figure context manager adds around a figure (title, stamp, layout)."""
+    plt.figure(fig.number)
+    if title:
+        plt.title(title)
+    plt.suptitle(f"Generated {pd.Timestamp.now(tz=tz):%d %b %Y %H:%M %Z} | Lookahead: {lookahead} days", fontsize=8, y=0.99)
+    plt.tight_layout()
+
+
+def status_bucket(s: str) -> str:
+    s = s.lower()
+    if "good" in s: return "Good Service"
+    if "minor" in s: return "Minor Delays"
+    if "severe" in s: return "Severe Delays"
+    if "suspend" in s or "closed" in s: return "Suspended/Closed"
+    if "part" in s and "closure" in s: return "Part Closure"
+    if "planned" in s and "closure" in s: return "Planned Closure"
+    if "reduced" in s or "special" in s: return "Reduced/Special"
+    return "Other"
+
+
+def status_now(now_df: pd.DataFrame, plan_df: pd.DataFrame | None = None, tz: str = LOCAL_TZ):
+    """A: status mix donut + lines ranked by current severity."""
+    df = now_df.copy()
+    df["status"] = df["status"].fillna("Good Service")
+    df["category"] = df["status"].apply(status_bucket)
+
+    P1, P2 = plt.cm.Pastel1.colors, plt.cm.Pastel2.colors
+    CAT_ORDER = [
+        "Good Service", "Minor Delays", "Severe Delays",
+        "Part Closure", "Planned Closure", "Suspended/Closed",
+        "Reduced/Special", "Other"]
+    PALETTE = {"Good Service":P1[2],"Minor Delays":P1[1],"Severe Delays":P1[0],"Part Closure":P1[3],"Planned Closure":P2[1],"Suspended/Closed":P2[3],"Reduced/Special":P2[2],"Other":P2[5],}
+
+    #donut
+    counts = (df["category"].value_counts().rename("count").reindex(CAT_ORDER, fill_value=0).reset_index().rename(columns={"index":"category"}))
+
+    #ranking data
+    rank = df.sort_values(["severity","line"]).reset_index(drop=True)
+    y = np.arange(len(rank))
+    x = rank["severity"].to_numpy()
+    lines = rank["line"].tolist()
+    colors = [PALETTE.get(c, P1[5]) for c in rank["category"]]
+
+    fig = plt.figure(figsize=(13, 5), constrained_layout=True)
+    gs = fig.add_gridspec(1, 2, width_ratios=[1.05, 1.95])
+
+    #left - donut
+    ax0 = fig.add_subplot(gs[0,0])
+    ax0.pie(counts["count"], startangle=90, counterclock=False,
+            colors=[PALETTE[c] for c in counts["category"]], wedgeprops=dict(width=0.40))
+
+    good_share = (df["category"]=="Good Service").mean()*100
+    ax0.text(0,  0.08, f"{good_share:.0f}%", ha="center", va="center", fontsize=16, weight="bold")
+    ax0.text(0, -0.08, "Good Service",ha="center", va="center", fontsize=9)
+    ax0.text(0, -0.23, f"as of {pd.Timestamp.now(tz=tz):%d %b %Y %H:%M}",ha="center", va="center", fontsize=8, alpha=0.75)
+
+    present = counts[counts["count"]>0]["category"].tolist()
+    if present:
+        handles = [plt.Line2D([0],[0], marker="o", lw=0,markerfacecolor=PALETTE[c], markeredgecolor="k",markersize=8) for c in present]
+        ax0.legend(handles, present, loc="upper center", bbox_to_anchor=(0.5, -0.18),ncol=2, frameon=False, fontsize=9)
+    ax0.set_title("Status mix right now", pad=6)
+
+    #right - ranked lollipop
+    ax1 = fig.add_subplot(gs[0,1])
+    for i in range(len(y)):
+        ax1.plot([0, 10], [y[i], y[i]], lw=1, color="#cfcfcf", alpha=0.35, zorder=0)
+
+    #stems + markers
+    for i, val in enumerate(x):
+        ax1.plot([0, val], [y[i], y[i]], lw=3, color=colors[i], alpha=0.95, solid_capstyle="round")
+    ax1.scatter(x, y, s=120, color=colors, edgecolors="k", linewidths=0.5, zorder=3)
+
+    #annotating only non-good lines
+    for i, r in rank.iterrows():
+        if r["category"] != "Good Service":
+            xi = x[i]; yi = y[i]
+            ha = "right" if xi > 9.2 else "left"
+            xo = -0.22 if ha=="right" else 0.22
+            ax1.text(xi+xo, yi, r["status"], ha=ha, va="center", fontsize=9)
+
+    #highlighting worst line (lowest severity)
+    worst = rank.iloc[0]
+    ax1.text(0.02, 0.02, f"Worst now: {worst['line']} — {worst['status']}",
+             transform=ax1.transAxes, fontsize=10, weight="bold",
+             bbox=dict(boxstyle="round,pad=0.3", facecolor="#f9e2e2", edgecolor="#e0e0e0"))
+
+    ax1.set_yticks(y); ax1.set_yticklabels(lines)
+    ax1.set_xlim(0, 10.6)
+    ax1.set_xlabel("Status severity (10 = Good Service)")
+    ax1.set_title("Lines ranked by current severity (lower = worse)")
+    ax1.grid(axis="x", linestyle=":", alpha=0.35)
+
+    fig.suptitle("CommuTech — Tube status NOW",x=0.52,y=1.04, fontsize=16)
+
+    bullets = [f"Generated: {_now_stamp(tz)}",
+               f"Right now: {good_share:.0f}% of lines report Good Service.",
+               f"Worst now: {worst['line']} — {worst['status']}"]
+    if plan_df is not None and not plan_df.empty:
+        ph = (plan_df["to"] - plan_df["from"]).dt.total_seconds() / 3600.0
+        by_line = (plan_df.assign(hours=ph).groupby("line", as_index=False)["hours"].sum().sort_values("hours", ascending=False))
+        if not by_line.empty:
+            bullets.append(f"Planned disruption hours in window: ~{float(ph.sum()):.1f}.")
+            bullets.append(f"Most impacted line (planned): {by_line.iloc[0]['line']} (~{by_line.iloc[0]['hours']:.1f} h)")
+
+    plt.subplots_adjust(bottom=0.22)
+    _bullet_box(fig, bullets, alpha=0.9)
+    return fig
+
+
+def disruption_heatmap(pf: pd.DataFrame, tz: str = LOCAL_TZ, lookahead_days: int = 28, commute_windows=COMMUTE_WINDOWS):
+    """B: day-of-week x hour planned disruption event-hours. pf: from_local/to_local/line, valid windows only."""
+    if not pf.empty:
+        start = pf["from_local"].min().floor("D")
+        end = pf["to_local"].max().ceil("D")
+    else:
+        start = pd.Timestamp.now(tz=tz).floor("D")
+        end = start + pd.Timedelta(days=lookahead_days)
+    horizon = max(1, int((end - start).days))
+
+    #hour x day grid of event-hours (true overlap within each hour) - all windows binned in one pass
+    bins = bin_hours(pf["from_local"], pf["to_local"], pf["line"], tz=tz)
+    Z = bins.week_grid()
+
+    bullets = [f"Generated: {_now_stamp(tz)}",
+               f"Window: next {horizon} days ({tz}).",
+               f"Planned windows counted: {len(pf)} across {pf['line'].nunique()} line(s)."]
+    if Z.max() > 0:
+        bullets.append(f"Busiest day overall: {DAYS[int(np.argmax(Z.sum(axis=1)))]}.")
+        bullets.append(f"Busiest hour overall: {int(np.argmax(Z.sum(axis=0))):02d}:00.")
+        commute_total = float(bins.window_hours(commute_windows, weekdays_only=True).sum())
+        bullets.append(f"Weekday commute event-hours (07–10 & 16–19): {commute_total:.1f}h.")
+    else:
+        bullets.append("No planned disruption found in the selected window.")
+
+    fig, ax = plt.subplots(figsize=(12, 6.6))
+    ax.set_facecolor("white")
+
+    if Z.max() <= 0:
+        ax.axis("off")
+        ax.text(0.5, 0.58, "No planned disruption in this window", ha="center", va="center", fontsize=14)
+        ax.text(0.5, 0.46, "Tip: increase LOOKAHEAD_DAYS to 28–45 for a fuller picture.",
+                ha="center", va="center", fontsize=10, alpha=0.7)
+    else:
+        Zm = np.ma.masked_where(Z <= 0, Z)#mask zeros -> white
+        vmax = float(np.percentile(Z[Z > 0], 90)) if (Z > 0).any() else 1.0
+        im = ax.imshow(Zm, cmap=plt.cm.Pastel1, origin="upper",aspect="auto", vmin=1e-6, vmax=vmax)
+
+        ax.set_xticks(range(24)); ax.set_xlabel("Hour of day")
+        ax.set_yticks(range(7));  ax.set_yticklabels(DAYS)
+
+        #commuting windows for the weekdays
+        for d in range(5):
+            for a, b in commute_windows:
+                ax.add_patch(plt.Rectangle((a-0.5, d-0.5), b-a, 1,fill=False, ec="#666", lw=0.9, alpha=0.7))
+
+        #annotating 5 hottest cells
+        flat = Z.ravel()
+        for idx in np.argsort(flat)[::-1][:5]:
+            if flat[idx] <= 0: continue
+            d, h = np.unravel_index(idx, Z.shape)
+            ax.text(h, d, f"{Z[d,h]:.1f}h", ha="center", va="center", fontsize=8)
+
+        cbar = plt.colorbar(im, ax=ax, fraction=0.046, pad=0.04)
+        cbar.set_label("Event-hours (sum of planned duration within each hour)")
+
+    fig.suptitle(f"CommuTech — Planned disruption event-hours (next ~{horizon} days)",x=0.52, y=1.04, fontsize=16)
+    plt.subplots_adjust(bottom=0.22)
+    _bullet_box(fig, bullets, alpha=0.9)
+    return fig
+
+
+def commute_risk(risk: pd.DataFrame, horizon_days: int, avail_am: float, avail_pm: float, obs_am: float = 0.0, tz: str = LOCAL_TZ):
+    """C: AM/PM commute-hour disruption by line (risk: line/am/pm/total_h, worst first)."""
+    if risk.empty:
+        fig, ax = plt.subplots(figsize=(11.2, 4.8))
+        fig.suptitle(f"CommuTech — Commute risk by line (next ~{horizon_days} days)", y=0.98, fontsize=16)
+        ax.axis("off")
+        bullets = [f"Generated: {_now_stamp(tz)}",
+                   f"Window: next {horizon_days} days ({tz}).",
+                   "No commute-hour disruptions found in this window."]
+        plt.subplots_adjust(bottom=0.24)
+        _bullet_box(fig, bullets)
+        return fig
+
+    top_k = min(8, len(risk))
+    risk_top = risk.head(top_k).reset_index(drop=True)
+
+    P1 = plt.cm.Pastel1.colors
+    c_am, c_pm = P1[1], P1[4]
+
+    fig, ax = plt.subplots(figsize=(12.0, 6.8))
+    fig.suptitle(f"CommuTech — Commute risk by line (next ~{horizon_days} days)", y=0.98, fontsize=16)
+
+    y = np.arange(len(risk_top))
+    ax.barh(y, risk_top["am"], color=c_am, edgecolor="none", label="AM (07–10)")
+    ax.barh(y, risk_top["pm"], left=risk_top["am"], color=c_pm, edgecolor="none", label="PM (16–19)")
+
+    ax.set_yticks(y); ax.set_yticklabels(risk_top["line"])
+    ax.invert_yaxis()
+    ax.set_xlabel("Commute-hour disruption (hours) over the look-ahead window")
+    ax.grid(axis="x", linestyle=":", alpha=0.4)
+    ax.legend(loc="lower right", frameon=False)
+
+    top_label = "Top line" if top_k == 1 else f"Top {top_k}"
+    ax.set_title(f"Commute risk by line (stacked AM+PM) — {top_label}")
+
+    cap_h = float(avail_am + avail_pm)#total commute hours weekdays
+    right_pad = risk_top["total_h"].max() * 0.02 + 0.05
+    for i, (a, p) in enumerate(zip(risk_top["am"], risk_top["pm"])):
+        tot = float(a + p)
+        pct = (tot / cap_h) * 100.0 if cap_h > 0 else 0.0
+        ax.text(tot + right_pad, i, f"{tot:.1f}h ({pct:.0f}%)", va="center", fontsize=9)
+
+    highest = risk_top.iloc[0]
+    lines_impacted = int(((risk["am"] + risk["pm"]) > 0).sum())
+    total_exposure = float(risk["total_h"].sum())
+    share = (total_exposure / cap_h * 100.0) if cap_h > 0 else 0.0
+    bullets = [
+        f"Generated: {_now_stamp(tz)}",
+        f"Window: next {horizon_days} days ({tz}).",
+        f"Weekday commute hours in window: AM={avail_am}h, PM={avail_pm}h (Mon–Fri only).",
+        f"Highest line risk: {highest['line']} — total ≈ {highest['total_h']:.1f}h (AM {highest['am']:.1f}h, PM {highest['pm']:.1f}h).",
+        f"Median line risk across network ≈ {risk['total_h'].median():.1f}h.",
+        f"Lines with any commute impact: {lines_impacted}/{risk['line'].nunique()}.",
+        f"Network exposure in commute hours: {total_exposure:.1f}h of {cap_h:.1f}h ({share:.0f}%).",
+        f"Today AM planned overlap: {obs_am:.1f}h."]
+
+    plt.subplots_adjust(bottom=0.24)
+    _bullet_box(fig, bullets)
+    return fig
+
+
+def hours_by_line(by_line: pd.DataFrame, horizon_days: int, tz: str = LOCAL_TZ):
+    """D: planned disruption hours by line, lollipop (by_line: line/hours, largest first)."""
+    fig, ax = plt.subplots(figsize=(12.0, 6.6))
+    fig.suptitle(f"CommuTech — Planned disruption hours by line (next ~{horizon_days} days)",y=0.98, fontsize=16)
+
+    if by_line.empty:
+        ax.axis("off")
+        ax.text(0.5, 0.55, "No planned windows in this horizon", ha="center", va="center", fontsize=13)
+        bullets = [
+            f"Generated: {_now_stamp(tz)}",
+            f"Window: next {horizon_days} days ({tz}).",
+            "No planned disruption returned by the API."]
+    else:
+        y = np.arange(len(by_line))
+        x = by_line["hours"].to_numpy()
+        labels = by_line["line"].tolist()
+
+        #lollipop stems + markers
+        for i, val in enumerate(x):
+            c = PASTELS[i % len(PASTELS)]
+            ax.plot([0, val], [y[i], y[i]], lw=3, color=c, solid_capstyle="round")
+            ax.plot([val], [y[i]], "o", ms=8, color=c, mec="k", mew=0.5)
+
+        max_x = float(x.max()) if len(x) else 1.0
+        headroom = max(0.4, max_x * 0.08)
+        for i, val in enumerate(x):
+            ax.text(val + headroom*0.08, y[i], f"{val:.1f} h", va="center", fontsize=9)
+
+        total_h = float(x.sum())
+        xmax = float(np.ceil(max_x / 5.0) * 5.0) if len(x) else 1.0
+        ax.set_xlim(0, xmax + headroom)
+        for i, val in enumerate(x):
+            share = (val / total_h * 100.0) if total_h > 0 else 0.0
+            ax.text(xmax + headroom * 0.6, y[i], f"{share:.0f}%", va="center", fontsize=8, alpha=0.9)
+
+        ax.set_yticks(y)
+        ax.set_yticklabels(labels)
+        ax.set_xlabel("Planned disruption hours in look-ahead window")
+        ax.grid(axis="x", linestyle=":", alpha=0.35)
+
+        top = by_line.iloc[0]
+        lines_impacted = int((by_line["hours"] > 0).sum())
+        bullets = [
+            f"Generated: {_now_stamp(tz)}",
+            f"Window: next {horizon_days} days ({tz}).",
+            f"Lines with planned work: {lines_impacted}/{by_line['line'].nunique()}.",
+            f"Total planned disruption hours: ~{total_h:.1f}h.",
+            f"Top line: {top['line']} — ~{top['hours']:.1f}h "
+            f"({(top['hours']/total_h*100.0 if total_h>0 else 0):.0f}%)."]
+
+    plt.subplots_adjust(bottom=0.24)
+    _bullet_box(fig, bullets)
+    return fig
+
+
+def upcoming_table(disp: pd.DataFrame, start_hours: np.ndarray, lookahead: int | None = None, tz: str = LOCAL_TZ):
+    """E part 1: top-30 upcoming windows table with a start-hour tick strip (start_hours: local hour per row)."""
+    fig = plt.figure(figsize=(12.5, 9.5))
+    ax = plt.gca(); ax.axis("off")
+    ax.text(0.02, 0.975, "Upcoming disruption windows (Top 30)", fontsize=14, weight="bold", va="top")
+    ax.text(0.02, 0.945, "Right strip: tick shows local start hour (0–23).", fontsize=10, alpha=0.75)
+
+    bbox = [0.02, 0.05, 0.82, 0.88]#L, B, W, H
+    tbl = ax.table(cellText=disp.values, colLabels=disp.columns,loc="upper left", cellLoc="left", colLoc="left", bbox=bbox)
+    tbl.auto_set_font_size(False); tbl.set_fontsize(9)
+
+    row_cols = [PASTELS[i % len(PASTELS)] for i in range(len(disp))]
+    for (r, c), cell in tbl.get_celld().items():
+        if r == 0:
+            cell.set_facecolor("#eeeeee"); cell.set_fontsize(10); cell.set_height(0.035)
+        else:
+            cell.set_facecolor(row_cols[(r-1) % len(row_cols)]); cell.set_alpha(0.45)
+
+    #simple column width tuning
+    for i in range(len(disp.columns)):
+        try: tbl.auto_set_column_width(col=i)
+        except Exception: pass
+
+    y0, h, n = bbox[1] + bbox[3], bbox[3], len(disp)
+    for i in range(n):
+        x = 0.86 + (0.12 * (int(start_hours[i]) / 23.0))#map 0..23 -> 0.86..0.98
+        ry = y0 - (h * ((i + 0.5) / n))
+        ax.plot([x-0.004, x+0.004], [ry, ry], color="black", lw=1)
+
+    #small hour scale
+    for hh, xx in zip([0,6,12,18,23], [0.86, 0.89, 0.92, 0.95, 0.98]):
+        ax.text(xx, 0.03, f"{hh}", transform=ax.transAxes, ha="center", va="bottom", fontsize=8)
+
+    _slide(fig, "Upcoming disruption windows (Top 30)", lookahead, tz)
+    return fig
+
+
+def plan_gantt(pf: pd.DataFrame, order: list[str], win_start: pd.Timestamp, win_end: pd.Timestamp,
+               lookahead: int | None = None, tz: str = LOCAL_TZ, commute_windows=COMMUTE_WINDOWS):
+    """E part 2: per-line broken bars over the window (pf: line/x/w in hours from win_start)."""
+    fig = plt.figure(figsize=(12.5, 7.5))
+    ax = plt.gca()
+    ax.set_facecolor("white")
+    color = {ln: PASTELS[i % len(PASTELS)] for i, ln in enumerate(order)}
+    total_hours = (win_end - win_start).total_seconds()/3600.0
+
+    #drawing per-line broken bars
+    for ln, g in pf.groupby("line"):
+        y = float(order.index(ln))#lane row
+        segs = [(float(x), float(w)) for x, w in zip(g["x"], g["w"]) if w > 0]
+        if segs:
+            ax.broken_barh(segs, (y-0.4, 0.8),facecolors=color[ln], edgecolors="k", linewidth=0.4)
+
+    #formatting x as days
+    ax.set_xlim(0, total_hours)
+    xticks, xtlbl = [], []
+    cur = win_start
+    while cur <= win_end:
+        xticks.append((cur - win_start).total_seconds()/3600.0)
+        xtlbl.append(cur.strftime("%a %d"))
+        cur += pd.Timedelta(days=1)
+    ax.set_xticks(xticks); ax.set_xticklabels(xtlbl, rotation=0)
+    ax.grid(axis="x", linestyle=":", alpha=0.3)
+
+    #commute shading for weekday peak hours
+    d = win_start
+    while d < win_end:
+        if d.weekday() < 5:
+            for a, b in commute_windows:
+                x0 = ((d + pd.Timedelta(hours=a)) - win_start).total_seconds()/3600.0
+                ax.axvspan(x0, x0 + (b - a), color="#000000", alpha=0.05)
+        d += pd.Timedelta(days=1)
+
+    ax.set_yticks(np.arange(len(order))); ax.set_yticklabels(order)
+    ax.set_xlabel(f"Date (local). Window: {win_start:%d %b} → {win_end:%d %b}")
+    ax.set_title("When planned disruption actually happens (blocks = duration)")
+    _slide(fig, "Planned disruption timeline (look-ahead window)", lookahead, tz)
+    return fig
+
+
+def capacity_forecast(y: pd.Series, y_fc: pd.Series):
+    """Network operated km, actual + SARIMA forecast, in millions."""
+    fig = plt.figure(figsize=(10,4.8))
+    (y/1_000_000).plot(label="actual")
+    (y_fc/1_000_000).plot(label="forecast to 2027")
+    plt.ylabel("Operated km (millions / month)")
+    plt.title("Network — SARIMA forecast of operated kilometres (capacity proxy)")
+    plt.legend()
+    plt.tight_layout()
+    return fig
+
+
+def calendar_intensity(pivot: pd.DataFrame):
+    """Year x month intensity (pivot: years x months 1-12)."""
+    fig = plt.figure(figsize=(10,4.6))
+    plt.imshow(pivot.values, aspect="auto", cmap=plt.cm.Pastel1)
+    plt.yticks(range(len(pivot.index)), pivot.index)
+    plt.xticks(range(12), ["Jan","Feb","Mar","Apr","May","Jun","Jul","Aug","Sep","Oct","Nov","Dec"])
+    plt.title("CommuTech — Year x month intensity (pastel)")
+    plt.xlabel("month"); plt.ylabel("year"); plt.tight_layout()
+    return fig
@@ -0,0 +1,306 @@
+'''
+Record/replay fixtures for the TfL Unified API, plus a local mock TfL server that serves them.
+
+- record: the client saves every 200 response under data/fixtures/tfl/<key>.json, where key is a
+  hash of path + params (app_key excluded, same rule as the response cache)
+- replay: the client answers from those files and never touches the network (a miss is an error)
+- serve: MockTflServer serves the same files over HTTP with injected latency and errors, so the
+  app, the notebook and load tests all exercise the real client/cache/retry stack offline.
+  Unrecorded stops/searches fall back to a recorded response of the same endpoint, re-targeted
+  at the requested ids/name, so any From/To pair gets a board:
+
+    python -m commutech.fixtures serve --port 8765 --latency-ms 80 --jitter-ms 40 --error-rate 0.02
+    TFL_BASE=http://127.0.0.1:8765 TFL_API_KEY=x streamlit run "CommuTech - Beta.py"
+
+Client config via env: TFL_FIXTURES=record|replay, TFL_FIXTURE_DIR (default data/fixtures/tfl).
+The server's latency/error settings can be changed while it runs: GET /__mock/config?latency_ms=200
+and its counters read from GET /__mock/stats.
+'''
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qsl, unquote, urlsplit
+
+from .cache import cache_key
+from .perf import endpoint_template
+
+FIXTURE_DIR = Path(os.getenv("TFL_FIXTURE_DIR") or Path(__file__).resolve().parents[2] / "data" / "fixtures" / "tfl")
+MODES = ("record", "replay")
+
+
+def fixture_key(path: str, params: dict | None = None) -> str:
+    p, items = cache_key(path, params)
+    return hashlib.sha1(json.dumps([p, items]).encode()).hexdigest()
+
+
+class FixtureStore:
+    """
+    One JSON file per (path, params): {"path", "params", "status", "recorded_at", "body"}.\n
+    mode: "record" (client writes through) or "replay" (client reads only).
+    """
+
+    def __init__(self, root: str | Path = FIXTURE_DIR, mode: str = "replay"):
+        if mode not in MODES:
+            raise ValueError(f"fixture mode must be one of {MODES}, got {mode!r}")
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.mode = mode
+        self.stats = {"recorded": 0, "replayed": 0, "misses": 0}
+
+    @classmethod
+    def from_env(cls) -> "FixtureStore | None":
+        """TFL_FIXTURES=record|replay -> a store on TFL_FIXTURE_DIR; unset -> None (live API)."""
+        mode = (os.getenv("TFL_FIXTURES") or "").strip().lower()
+        return cls(FIXTURE_DIR, mode) if mode else None
+
+    def _file(self, path: str, params: dict | None) -> Path:
+        return self.root / f"{fixture_key(path, params)}.json"
+
+    def lookup(self, path: str, params: dict | None = None) -> dict | None:
+        f = self._file(path, params)
+        return json.loads(f.read_text(encoding="utf-8")) if f.exists() else None
+
+    def get(self, path: str, params: dict | None = None):
+        """Replay: (body, None), or (None, error) for a miss / recorded non-200."""
+        entry = self.lookup(path, params)
+        if entry is None:
+            self.stats["misses"] += 1
+            return None, f"No fixture for {path} {dict(cache_key(path, params)[1])}"
+        self.stats["replayed"] += 1
+        if entry.get("status", 200) != 200:
+            return None, f"HTTP {entry['status']}: {json.dumps(entry['body'])[:200]}"
+        return entry["body"], None
+
+    def put(self, path: str, params: dict | None, body, status: int = 200):
+        entry = {"path": path, "params": dict(cache_key(path, params)[1]), "status": status,
+                 "recorded_at": datetime.now(timezone.utc).isoformat(timespec="seconds"), "body": body}
+        f = self._file(path, params)
+        tmp = f.with_suffix(".tmp")
+        tmp.write_text(json.dumps(entry), encoding="utf-8")
+        os.replace(tmp, f)
+        self.stats["recorded"] += 1
+
+    def entries(self):
+        for f in sorted(self.root.glob("*.json")):
+            yield json.loads(f.read_text(encoding="utf-8"))
+
+
+def _retarget_arrivals(body, path: str):
+    """Spread a recorded arrivals board over the stop ids in the request path."""
+    ids = path.split("/")[2].split(",")
+    return [dict(a, naptanId=ids[i % len(ids)]) for i, a in enumerate(body or [])]
+
+
+def _retarget_search(body, path: str):
+    """Rename the recorded best match to the searched name, with a stable id derived from it."""
+    name = unquote(path.rsplit("/", 1)[1])
+    if not isinstance(body, dict) or not body.get("matches"):
+        return body
+    stop_id = "940GZZLU" + hashlib.sha1(name.lower().encode()).hexdigest()[:6].upper()
+    return dict(body, matches=[dict(body["matches"][0], id=stop_id, name=name)])
+
+
+_RETARGET = {"/StopPoint/{ids}/Arrivals": _retarget_arrivals, "/StopPoint/Search/{name}": _retarget_search}
+
+
+class MockTflServer:
+    """
+    Serves a FixtureStore over HTTP on a background thread (ThreadingHTTPServer, keep-alive).\n
+    Exact (path, params) matches win, then the most recent fixture for the same path, then one for the
+    same endpoint template (re-targeted for arrivals/search).
+    latency_ms/jitter_ms delay every response; error_rate is the share answered with error_status
+    (429 responses carry Retry-After). seed makes the error/jitter sequence reproducible.
+    """
+
+    def __init__(self, store: FixtureStore, host: str = "127.0.0.1", port: int = 8765, latency_ms: float = 0,
+                 jitter_ms: float = 0, error_rate: float = 0.0, error_status: int = 503, seed: int | None = None):
+        self.config = {"latency_ms": float(latency_ms), "jitter_ms": float(jitter_ms),
+                       "error_rate": float(error_rate), "error_status": int(error_status)}
+        self.stats = {"requests": 0, "served": 0, "fallbacks": 0, "misses": 0, "injected_errors": 0}
+        self.endpoints: dict[str, int] = {}#endpoint template -> requests
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.reload(store)
+        self._httpd = ThreadingHTTPServer((host, port), self._handler())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    def reload(self, store: FixtureStore):
+        """(Re)index the fixtures; bodies are serialised once here, not per request."""
+        exact, by_path, by_template = {}, {}, {}
+        for e in sorted(store.entries(), key=lambda e: e.get("recorded_at", "")):
+            status = int(e.get("status", 200))
+            payload = (status, json.dumps(e["body"]).encode())
+            exact[fixture_key(e["path"], e["params"])] = payload
+            by_path[e["path"]] = payload
+            if status == 200:
+                by_template[endpoint_template(e["path"])] = e["body"]
+        self._exact, self._by_path, self._by_template = exact, by_path, by_template
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _plan(self) -> tuple[float, bool]:
+        """Delay (seconds) and whether to inject an error for one request."""
+        with self._lock:
+            cfg = self.config
+            delay = max(0.0, cfg["latency_ms"] + self._rng.uniform(-cfg["jitter_ms"], cfg["jitter_ms"])) / 1000
+            fail = self._rng.random() < cfg["error_rate"]
+        return delay, fail
+
+    def _count(self, name: str, endpoint: str | None = None):
+        with self._lock:
+            self.stats[name] += 1
+            if endpoint is not None:
+                self.endpoints[endpoint] = self.endpoints.get(endpoint, 0) + 1
+
+    def _control(self, path: str, query: dict) -> dict:
+        if path == "/__mock/config":
+            with self._lock:
+                for k, v in query.items():
+                    if k in self.config:
+                        self.config[k] = type(self.config[k])(float(v))
+                return dict(self.config)
+        if "reset" in query:
+            self.reset()
+        return dict(self.counters(), **self.config)
+
+    def reset(self):
+        with self._lock:
+            self.stats = dict.fromkeys(self.stats, 0)
+            self.endpoints = {}
+
+    def counters(self) -> dict:
+        """Request counters plus per-endpoint-template request counts."""
+        with self._lock:
+            return dict(self.stats, endpoints=dict(self.endpoints))
+
+    def respond(self, target: str) -> tuple[int, bytes, dict]:
+        """(status, body, extra headers) for a request target like /Line/Mode/tube/Status?app_key=..."""
+        u = urlsplit(target)
+        query = dict(parse_qsl(u.query))
+        if u.path.startswith("/__mock/"):
+            return 200, json.dumps(self._control(u.path, query)).encode(), {}
+        template = endpoint_template(u.path)
+        self._count("requests", template)
+        delay, fail = self._plan()
+        if delay:
+            time.sleep(delay)
+        if fail:
+            self._count("injected_errors")
+            status = self.config["error_status"]
+            headers = {"Retry-After": "1"} if status == 429 else {}
+            return status, json.dumps({"message": "injected error"}).encode(), headers
+        hit = self._exact.get(fixture_key(u.path, query)) or self._by_path.get(u.path)
+        if hit is None:
+            if template not in self._by_template:
+                self._count("misses")
+                return 404, json.dumps({"message": f"No fixture for {u.path}"}).encode(), {}
+            body = self._by_template[template]
+            retarget = _RETARGET.get(template)
+            hit = (200, json.dumps(retarget(body, u.path) if retarget else body).encode())
+            self._count("fallbacks")
+        self._count("served")
+        return hit[0], hit[1], {}
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                status, body, headers = server.respond(self.path)
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                for k, v in headers.items():
+                    self.send_header(k, v)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> "MockTflServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="mock-tfl", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+#CLI:
+def _record(store: FixtureStore, targets: list[str]) -> int:
+    """Fetch each /path?query target from the live API (TFL_BASE / TFL_API_KEY) into the store."""
+    from .tfl_client import TflClient
+    client = TflClient(fixtures=store, require_key=False)
+    failed = 0
+    for t in targets:
+        u = urlsplit(t)
+        _, err = client.get(u.path, dict(parse_qsl(u.query)) or None)
+        print(f"{'FAIL' if err else 'ok  '} {t}" + (f"  ({err})" if err else ""))
+        failed += bool(err)
+    client.close()
+    return 1 if failed else 0
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m commutech.fixtures", description="TfL fixtures: record, list, serve.")
+    ap.add_argument("--dir", default=str(FIXTURE_DIR), help="fixture folder (default TFL_FIXTURE_DIR or data/fixtures/tfl)")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    rec = sub.add_parser("record", help="capture live responses, e.g. '/Line/Mode/tube/Status?detail=true'")
+    rec.add_argument("targets", nargs="+")
+    sub.add_parser("list", help="show recorded fixtures")
+    srv = sub.add_parser("serve", help="run the mock TfL server")
+    srv.add_argument("--host", default="127.0.0.1")
+    srv.add_argument("--port", type=int, default=8765)
+    srv.add_argument("--latency-ms", type=float, default=0)
+    srv.add_argument("--jitter-ms", type=float, default=0)
+    srv.add_argument("--error-rate", type=float, default=0.0)
+    srv.add_argument("--error-status", type=int, default=503)
+    srv.add_argument("--seed", type=int)
+    args = ap.parse_args(argv)
+
+    if args.cmd == "record":
+        return _record(FixtureStore(args.dir, "record"), args.targets)
+    store = FixtureStore(args.dir, "replay")
+    if args.cmd == "list":
+        for e in store.entries():
+            print(f"{e['recorded_at']}  {e['status']}  {e['path']}  {e['params'] or ''}")
+        return 0
+    server = MockTflServer(store, args.host, args.port, args.latency_ms, args.jitter_ms,
+                           args.error_rate, args.error_status, args.seed)
+    print(f"Mock TfL serving {len(server._exact)} fixtures from {store.root} on {server.base_url}")
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._httpd.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
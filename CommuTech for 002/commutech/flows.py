@@ -0,0 +1,224 @@
+'''
+Year x station x line rollup of the cleaned station entry/exit figures for the notebook.
+
+Built once from data/processed/station_flow_clean_basic.csv + TfL_stations_clean.csv (names
+normalised, primary line parsed vectorised, duplicate station-years summed) and stored as .npy
+arrays under data/cache/flows/ next to a cube.json keyed on both CSVs' bytes. Arrays are opened
+with mmap_mode="r", so a warm load reads only the metadata and the queries slice precomputed
+arrays instead of re-merging:
+
+    values       [measure, year, station]   NaN where the station has no figure for that year
+    station_line [station]                  index into lines, -1 = unmapped
+    line_totals  [measure, year, line]      NaN-skipping sums, last column = unmapped stations
+    rank         [measure, year, station]   station indices, busiest first (NaN last)
+
+Each station carries one (primary) line, so the line axis is the station_line index rather than
+a mostly-empty dense dimension.
+'''
+
+import hashlib
+import json
+import os
+import re
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+PROCESSED_DIR = Path(__file__).resolve().parents[2] / "data" / "processed"
+FLOW_CUBE_DIR = Path(os.getenv("COMMUTECH_FLOW_CUBE", Path(__file__).resolve().parents[2] / "data" / "cache" / "flows"))
+CUBE_VERSION = 2#bump when build() semantics change (cached cubes are rebuilt)
+MEASURES = ("annual_entries_exits", "daily_avg_passengers")
+UNMAPPED = "Unmapped"
+LINE_SPLIT = re.compile(r"\s*(?:/|;|,|&|\+|\band\b)\s*", flags=re.I)#same separators as the notebook's primary_line
+_ARRAYS = ("values", "station_line", "line_totals", "rank")
+
+
+def normalise_station(s: pd.Series) -> pd.Series:
+    return s.astype(str).str.strip().str.title()
+
+
+def primary_lines(s: pd.Series) -> pd.Series:
+    """Vectorised primary_line: first token of a multi-line value, title-cased (NaN if missing/empty)."""
+    first = s.astype("string").str.split(LINE_SPLIT, n=1, regex=True).str[0].str.strip().str.title().fillna("")
+    return first.astype(object).where(first != "", np.nan)
+
+
+def station_line_map(stations_ref: pd.DataFrame) -> pd.Series:
+    """station -> primary line from the cleaned stations CSV (first row wins for repeated stations)."""
+    ref = stations_ref
+    if "station" not in ref.columns:#fallback to first col, as in the notebook
+        ref = ref.rename(columns={ref.columns[0]: "station"})
+    line_col = next((c for c in ref.columns if re.search(r"\blines?\b", str(c), flags=re.I)), None)
+    if line_col is None:
+        return pd.Series(dtype=object)
+    m = pd.DataFrame({"station": normalise_station(ref["station"]), "line": primary_lines(ref[line_col])}).dropna()
+    return m.drop_duplicates("station").set_index("station")["line"]
+
+
+def source_fingerprint(paths: list[Path]) -> str:
+    h = hashlib.sha1(f"flows-v{CUBE_VERSION}".encode())
+    for p in paths:
+        h.update(Path(p).read_bytes())
+    return h.hexdigest()
+
+
+class FlowCube:
+    def __init__(self, years, stations: list[str], lines: list[str], arrays: dict, meta: dict | None = None):
+        self.years = np.asarray(years)
+        self.stations = list(stations)
+        self.lines = list(lines)#mapped lines; line_totals has one extra column for UNMAPPED
+        self.values = arrays["values"]
+        self.station_line = arrays["station_line"]
+        self.line_totals = arrays["line_totals"]
+        self.rank = arrays["rank"]
+        self.meta = meta or {}
+        self._year_pos = {int(y): i for i, y in enumerate(self.years)}
+        self._station_pos = {s: i for i, s in enumerate(self.stations)}
+        self._line_labels = np.asarray(self.lines + [UNMAPPED], dtype=object)
+        self._station_labels = np.asarray(self.stations, dtype=object)
+
+    @classmethod
+    def build(cls, station_flow: pd.DataFrame, stations_ref: pd.DataFrame, fingerprint: str = "") -> "FlowCube":
+        sf = station_flow
+        if "station" not in sf.columns:
+            sf = sf.rename(columns={sf.columns[0]: "station"})
+        stn_map = station_line_map(stations_ref)
+        measures = [m for m in MEASURES if m in sf.columns]
+        sf = sf.assign(station=normalise_station(sf["station"]), year=pd.to_numeric(sf["year"], errors="coerce"))
+        sf = sf.dropna(subset=["year"])
+        rows = len(sf)
+        mapped_rows = int(sf["station"].isin(stn_map.index).sum())
+
+        year_codes, years = pd.factorize(sf["year"].astype(int), sort=True)
+        station_codes, stations = pd.factorize(sf["station"], sort=True)
+        lines = sorted(set(stn_map.reindex(stations).dropna()))
+        line_pos = {ln: i for i, ln in enumerate(lines)}
+        station_line = np.fromiter((line_pos.get(stn_map.get(s), -1) for s in stations), dtype=np.int32, count=len(stations))
+
+        n_m, n_y, n_s, n_l = len(measures), len(years), len(stations), len(lines)
+        values = np.full((n_m, n_y, n_s), np.nan)
+        for k, m in enumerate(measures):
+            v = pd.to_numeric(sf[m], errors="coerce").to_numpy(dtype=float)
+            ok = ~np.isnan(v)
+            acc, n = np.zeros((n_y, n_s)), np.zeros((n_y, n_s), dtype=np.int64)
+            np.add.at(acc, (year_codes[ok], station_codes[ok]), v[ok])#duplicate station-years are summed
+            np.add.at(n, (year_codes[ok], station_codes[ok]), 1)
+            values[k] = np.where(n > 0, acc, np.nan)#a missing figure stays missing, not 0
+
+        line_totals = np.zeros((n_m, n_y, n_l + 1))
+        col = np.where(station_line >= 0, station_line, n_l)
+        for k in range(n_m):
+            for y in range(n_y):
+                line_totals[k, y] = np.bincount(col, weights=np.nan_to_num(values[k, y]), minlength=n_l + 1)
+        rank = np.argsort(np.where(np.isnan(values), np.inf, -values), axis=2, kind="stable").astype(np.int32)
+
+        meta = {"version": CUBE_VERSION, "fingerprint": fingerprint, "measures": measures,
+                "years": [int(y) for y in years], "stations": list(stations), "lines": lines,
+                "rows": rows, "mapped_rows": mapped_rows}
+        arrays = {"values": values, "station_line": station_line, "line_totals": line_totals, "rank": rank}
+        return cls(years, stations, lines, arrays, meta)
+
+    def save(self, cache_dir: str | Path = FLOW_CUBE_DIR):
+        """Arrays first, cube.json last - a half-written cube has a stale/missing meta and gets rebuilt."""
+        cache_dir = Path(cache_dir)
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        for name in _ARRAYS:
+            tmp = cache_dir / f"{name}.tmp.npy"
+            np.save(tmp, np.ascontiguousarray(getattr(self, name)))
+            os.replace(tmp, cache_dir / f"{name}.npy")
+        tmp = cache_dir / "cube.json.tmp"
+        tmp.write_text(json.dumps(self.meta, indent=1), encoding="utf-8")
+        os.replace(tmp, cache_dir / "cube.json")
+
+    @classmethod
+    def open(cls, cache_dir: str | Path = FLOW_CUBE_DIR, fingerprint: str | None = None) -> "FlowCube | None":
+        """Memory-mapped cube from cache_dir, or None if missing/stale (fingerprint given and different)."""
+        cache_dir = Path(cache_dir)
+        try:
+            meta = json.loads((cache_dir / "cube.json").read_text(encoding="utf-8"))
+            if meta.get("version") != CUBE_VERSION or (fingerprint is not None and meta.get("fingerprint") != fingerprint):
+                return None
+            arrays = {name: np.load(cache_dir / f"{name}.npy", mmap_mode="r") for name in _ARRAYS}
+        except (OSError, ValueError):
+            return None
+        return cls(meta["years"], meta["stations"], meta["lines"], arrays, meta)
+
+    #queries
+    def _m(self, measure: str) -> int:
+        return self.meta["measures"].index(measure)
+
+    def _y(self, year: int) -> int:
+        try:
+            return self._year_pos[int(year)]
+        except KeyError:
+            raise KeyError(f"no flow data for {year} (have {int(self.years[0])}-{int(self.years[-1])})") from None
+
+    @property
+    def coverage(self) -> float:
+        """Share of flow rows whose station has a primary line (the notebook's mapping coverage)."""
+        return self.meta["mapped_rows"] / self.meta["rows"] if self.meta.get("rows") else 0.0
+
+    def line_of(self, station: str) -> str | None:
+        i = self._station_pos.get(station)
+        return None if i is None or self.station_line[i] < 0 else self.lines[self.station_line[i]]
+
+    def top_stations(self, year: int, n: int = 20, measure: str = "annual_entries_exits") -> pd.DataFrame:
+        k, y = self._m(measure), self._y(year)
+        idx = np.asarray(self.rank[k, y, :n])
+        vals = np.asarray(self.values[k, y])[idx]
+        idx, vals = idx[~np.isnan(vals)], vals[~np.isnan(vals)]
+        return pd.DataFrame({"station": self._station_labels[idx],
+                             "line": self._line_labels[np.asarray(self.station_line)[idx]],
+                             measure: vals})
+
+    def line_totals_frame(self, measure: str = "annual_entries_exits", unmapped: bool = False) -> pd.DataFrame:
+        """years x lines totals (optionally with the Unmapped column)."""
+        t = np.asarray(self.line_totals[self._m(measure)])
+        cols = self.lines + [UNMAPPED]
+        if not unmapped:
+            t, cols = t[:, :-1], cols[:-1]
+        return pd.DataFrame(t, index=pd.Index(self.years, name="year"), columns=cols)
+
+    def yoy(self, year: int, by: str = "station", measure: str = "annual_entries_exits") -> pd.DataFrame:
+        """Change vs the previous year, per station or per line, largest absolute change first."""
+        k, y = self._m(measure), self._y(year)
+        if y == 0:
+            raise KeyError(f"no year before {year}")
+        if by == "line":
+            cur, prev, labels = self.line_totals[k, y], self.line_totals[k, y - 1], self._line_labels
+        else:
+            cur, prev, labels = self.values[k, y], self.values[k, y - 1], self._station_labels
+        cur, prev = np.asarray(cur), np.asarray(prev)
+        change = cur - prev
+        with np.errstate(divide="ignore", invalid="ignore"):
+            pct = np.where(prev > 0, change / prev, np.nan)
+        order = np.argsort(np.where(np.isnan(change), np.inf, -np.abs(change)), kind="stable")
+        return pd.DataFrame({by: labels[order], "previous": prev[order], "current": cur[order],
+                             "change": change[order], "pct_change": pct[order]})
+
+    def to_frame(self) -> pd.DataFrame:
+        """Long form (year, station, measures..., line) - what the old merge produced, one row per station-year."""
+        yi, si = np.nonzero(~np.isnan(np.asarray(self.values)).all(axis=0))
+        out = pd.DataFrame({"year": self.years[yi], "station": self._station_labels[si]})
+        for k, m in enumerate(self.meta["measures"]):
+            out[m] = np.asarray(self.values[k])[yi, si]
+        sl = np.asarray(self.station_line)[si]
+        out["line"] = np.where(sl >= 0, self._line_labels[sl], np.nan)
+        return out
+
+
+def load_flow_cube(flow_csv: str | Path = PROCESSED_DIR / "station_flow_clean_basic.csv",
+                   stations_csv: str | Path = PROCESSED_DIR / "TfL_stations_clean.csv",
+                   cache_dir: str | Path = FLOW_CUBE_DIR) -> FlowCube:
+    """The cube for these CSVs: memory-mapped from cache_dir when current, else built and saved."""
+    fp = source_fingerprint([flow_csv, stations_csv])
+    cube = FlowCube.open(cache_dir, fp)
+    if cube is not None:
+        return cube
+    cube = FlowCube.build(pd.read_csv(flow_csv), pd.read_csv(stations_csv), fp)
+    try:
+        cube.save(cache_dir)
+    except OSError:
+        return cube#read-only checkout: use the in-memory cube
+    return FlowCube.open(cache_dir, fp) or cube
@@ -0,0 +1,177 @@
+'''
+Per-series SARIMA forecasting (per line / per station cluster) for the notebook.
+
+- fits fan out across a process pool, one job per (series, order) that isn't cached
+- fitted parameters are cached in data/cache/forecasts/params.json keyed on series hash + order,
+  so an unchanged series is never refitted (forecasts are re-derived with a cheap filter pass)
+- when a series gains new months its previous parameters for that order are the start_params
+  of the new fit (warm start), which converges in a fraction of the iterations
+- MAE/MAPE on the notebook's hold-out split are reported per series
+'''
+
+import hashlib
+import json
+import os
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+FORECAST_CACHE_DIR = Path(__file__).resolve().parents[2] / "data" / "cache" / "forecasts"
+ORDER = (1, 1, 1)
+SEASONAL_ORDER = (1, 1, 1, 12)
+MIN_POINTS = 8#same floor as the notebook's "Not enough monthly points" check
+
+
+def series_hash(y: pd.Series) -> str:
+    h = hashlib.sha1(str(getattr(y.index, "freqstr", "")).encode())
+    h.update(np.asarray(y.index.asi8 if isinstance(y.index, pd.DatetimeIndex) else y.index, dtype=np.int64).tobytes())
+    h.update(np.asarray(y.to_numpy(), dtype=np.float64).tobytes())
+    return h.hexdigest()
+
+
+def split_point(n: int) -> int:
+    """Train/test split used in the notebook: 80% (70% for short series)."""
+    return int(n * 0.8) if n > 10 else max(1, int(n * 0.7))
+
+
+def _model(y: pd.Series, order, seasonal_order):
+    from statsmodels.tsa.statespace.sarimax import SARIMAX
+    return SARIMAX(y, order=tuple(order), seasonal_order=tuple(seasonal_order),
+                   enforce_stationarity=False, enforce_invertibility=False)
+
+
+def _fit(y: pd.Series, order, seasonal_order, start_params=None):
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")#convergence/frequency chatter from statsmodels
+        return _model(y, order, seasonal_order).fit(disp=False, start_params=start_params)
+
+
+def hold_out_errors(actual: np.ndarray, predicted: np.ndarray) -> tuple[float, float]:
+    """MAE and MAPE (fraction, sklearn's definition)."""
+    actual, predicted = np.asarray(actual, float), np.asarray(predicted, float)
+    err = np.abs(actual - predicted)
+    return float(err.mean()), float((err / np.maximum(np.abs(actual), np.finfo(float).eps)).mean())
+
+
+def fit_series(name: str, y: pd.Series, order=ORDER, seasonal_order=SEASONAL_ORDER, warm: dict | None = None) -> dict:
+    """
+    Fit one series (runs in a worker process).\n
+    warm: a previous cache entry for the same series + order; its params seed both fits.
+    """
+    y = y.astype("float64")
+    split = split_point(len(y))
+    y_tr, y_te = y.iloc[:split], y.iloc[split:]
+    res_tr = _fit(y_tr, order, seasonal_order, warm and warm.get("train_params"))
+    mae, mape = (float("nan"), float("nan"))
+    if len(y_te):
+        pred = res_tr.get_prediction(start=y_te.index[0], end=y_te.index[-1]).predicted_mean
+        mae, mape = hold_out_errors(y_te.to_numpy(), pred.to_numpy())
+    res_full = _fit(y, order, seasonal_order, (warm and warm.get("full_params")) or res_tr.params.to_numpy())
+    return {
+        "series": name,
+        "hash": series_hash(y),
+        "order": list(order),
+        "seasonal_order": list(seasonal_order),
+        "train_params": res_tr.params.tolist(),
+        "full_params": res_full.params.tolist(),
+        "aic": float(res_full.aic),
+        "mae": mae,
+        "mape": mape,
+        "n_obs": len(y),
+        "warm_start": warm is not None,
+        "fitted_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),}
+
+
+def _fit_job(args):
+    return fit_series(*args)
+
+
+class ForecastCache:
+    """params.json: {series: {"<hash>|<order>|<seasonal>": entry}} - small, rewritten atomically."""
+
+    def __init__(self, cache_dir: str | Path = FORECAST_CACHE_DIR, keep: int = 3):
+        self.path = Path(cache_dir) / "params.json"
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.keep = keep#entries kept per series and order (older hashes are only useful as warm starts)
+        self.data: dict[str, dict] = json.loads(self.path.read_text(encoding="utf-8")) if self.path.exists() else {}
+
+    @staticmethod
+    def key(h: str, order, seasonal_order) -> str:
+        return f"{h}|{tuple(order)}|{tuple(seasonal_order)}"
+
+    def get(self, name: str, key: str) -> dict | None:
+        return self.data.get(name, {}).get(key)
+
+    def latest(self, name: str, order, seasonal_order) -> dict | None:
+        """Most recent fit of this series with this order (any hash) - the warm start."""
+        same = [e for e in self.data.get(name, {}).values()
+                if e["order"] == list(order) and e["seasonal_order"] == list(seasonal_order)]
+        return max(same, key=lambda e: e["fitted_at"]) if same else None
+
+    def put(self, entry: dict):
+        entries = self.data.setdefault(entry["series"], {})
+        entries[self.key(entry["hash"], entry["order"], entry["seasonal_order"])] = entry
+        same = [(k, e) for k, e in entries.items()
+                if e["order"] == list(entry["order"]) and e["seasonal_order"] == list(entry["seasonal_order"])]
+        for k, _ in sorted(same, key=lambda kv: kv[1]["fitted_at"])[:-self.keep]:
+            del entries[k]#older hashes of this series/order; other orders keep their own warm starts
+
+    def save(self):
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self.data, indent=1), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+
+def forecast_steps(last: pd.Timestamp, end) -> int:
+    end = pd.Timestamp(end)
+    return max(1, (end.year - last.year) * 12 + (end.month - last.month))
+
+
+def forecast_many(series: dict[str, pd.Series], end="2027-12-01", orders=None,
+                  cache_dir: str | Path = FORECAST_CACHE_DIR, max_workers: int | None = None):
+    """
+    Forecast every series to `end`.\n
+    series: {name: monthly pd.Series (MS freq, no gaps)}; orders: candidate (order, seasonal_order)
+    pairs - the lowest-AIC fit wins (default: the notebook's (1,1,1)x(1,1,1,12)).
+    Returns (metrics DataFrame, {name: forecast Series}); only uncached (series, order) pairs are fitted.
+    """
+    orders = orders or [(ORDER, SEASONAL_ORDER)]
+    cache = ForecastCache(cache_dir)
+    series = {n: y.astype("float64") for n, y in series.items() if len(y.dropna()) >= MIN_POINTS}
+    fits, jobs = {}, []
+    for name, y in series.items():
+        h = series_hash(y)
+        for order, seasonal in orders:
+            hit = cache.get(name, cache.key(h, order, seasonal))
+            if hit is not None:
+                fits.setdefault(name, []).append(dict(hit, cached=True))
+            else:
+                jobs.append((name, y, order, seasonal, cache.latest(name, order, seasonal)))
+
+    if jobs:
+        workers = max(1, min(len(jobs), max_workers or os.cpu_count() or 1))
+        if workers == 1:
+            results = [_fit_job(j) for j in jobs]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(_fit_job, jobs))
+        for entry in results:
+            cache.put(entry)
+            fits.setdefault(entry["series"], []).append(dict(entry, cached=False))
+        cache.save()
+
+    rows, forecasts = [], {}
+    for name, y in series.items():
+        best = min(fits[name], key=lambda e: e["aic"])
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            res = _model(y, best["order"], best["seasonal_order"]).filter(np.asarray(best["full_params"]))
+            forecasts[name] = res.get_forecast(steps=forecast_steps(y.index[-1], end)).predicted_mean
+        rows.append({"series": name, "order": tuple(best["order"]), "seasonal_order": tuple(best["seasonal_order"]),
+                     "n_obs": best["n_obs"], "mae": best["mae"], "mape": best["mape"], "aic": best["aic"],
+                     "cached": best["cached"], "warm_start": best["warm_start"]})
+    return pd.DataFrame(rows), forecasts
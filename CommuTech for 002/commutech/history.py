@@ -0,0 +1,223 @@
+'''
+Columnar, time-partitioned store for line status snapshots (replaces data/logs/status_log.csv).
+
+Layout (under data/logs/status_store/):
+    dict.json                 line + status dictionaries (append-only, codes never change)
+    index.json                {partition: {"rows", "min_ts", "max_ts"}} - the source of truth for row counts
+    YYYYMMDD/ts.i8            int64 epoch seconds (UTC)
+    YYYYMMDD/line.u2          uint16 line code
+    YYYYMMDD/severity.i1      int8 TfL statusSeverity (10 = Good Service)
+    YYYYMMDD/status.u2        uint16 status code
+
+Appends write a few bytes to the end of each column file (O(1)); a ranged query only opens the
+day partitions that overlap [t1, t2] and memory-maps their columns.
+'''
+
+import csv
+import json
+import os
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+#repo-root data/logs next to the old CSV (COMMUTECH_STATUS_STORE overrides)
+LOGS_DIR = Path(__file__).resolve().parents[2] / "data" / "logs"
+STORE_DIR = Path(os.getenv("COMMUTECH_STATUS_STORE") or LOGS_DIR / "status_store")
+LEGACY_CSV = LOGS_DIR / "status_log.csv"
+
+COLUMNS = {"ts": ("ts.i8", np.int64), "line": ("line.u2", np.uint16),
+           "severity": ("severity.i1", np.int8), "status": ("status.u2", np.uint16)}
+
+
+def to_epoch(ts) -> int:
+    """ISO string / datetime / epoch number -> int epoch seconds (naive datetimes are treated as UTC)."""
+    if isinstance(ts, (int, float, np.integer, np.floating)):
+        return int(ts)
+    if isinstance(ts, str):
+        ts = datetime.fromisoformat(ts.replace("Z", "+00:00"))
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return int(ts.timestamp())
+
+
+def partition_of(epoch: int) -> str:
+    return datetime.fromtimestamp(epoch, tz=timezone.utc).strftime("%Y%m%d")
+
+
+def _write_json(path: Path, obj):
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(obj, indent=1, sort_keys=True), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+class StatusHistory:
+    def __init__(self, root: str | Path = STORE_DIR, migrate_from: str | Path | None = None):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._dict_path = self.root / "dict.json"
+        self._index_path = self.root / "index.json"
+        d = json.loads(self._dict_path.read_text(encoding="utf-8")) if self._dict_path.exists() else {}
+        self.lines: list[str] = d.get("lines", [])
+        self.statuses: list[str] = d.get("statuses", [])
+        self._line_code = {s: i for i, s in enumerate(self.lines)}
+        self._status_code = {s: i for i, s in enumerate(self.statuses)}
+        self.index: dict[str, dict] = (json.loads(self._index_path.read_text(encoding="utf-8"))
+                                       if self._index_path.exists() else {})
+        if not self.index and migrate_from is not None and Path(migrate_from).exists():
+            self.migrate_csv(migrate_from)
+
+    #dictionary encoding:
+    def _encode(self, value: str, values: list, codes: dict) -> tuple[int, bool]:
+        code = codes.get(value)
+        if code is not None:
+            return code, False
+        code = codes[value] = len(values)
+        values.append(value)
+        return code, True
+
+    def line_code(self, line: str) -> int | None:
+        return self._line_code.get(line)
+
+    #writes:
+    def append(self, rows: list[dict]) -> int:
+        """
+        Append rows shaped like the old CSV: {"ts_utc", "line", "severity", "status"}.\n
+        Returns rows written. Each partition touched gets one write per column file.
+        """
+        if not rows:
+            return 0
+        with self._lock:
+            new_dict = False
+            parts: dict[str, list[tuple]] = {}
+            for r in rows:
+                epoch = to_epoch(r["ts_utc"])
+                lc, n1 = self._encode(str(r["line"]), self.lines, self._line_code)
+                sc, n2 = self._encode(str(r["status"]), self.statuses, self._status_code)
+                new_dict = new_dict or n1 or n2
+                parts.setdefault(partition_of(epoch), []).append((epoch, lc, int(r["severity"]), sc))
+            if new_dict:#dictionary first, so a reader never sees a code it can't decode
+                _write_json(self._dict_path, {"lines": self.lines, "statuses": self.statuses})
+            for part, recs in parts.items():
+                self._append_partition(part, recs)
+            _write_json(self._index_path, self.index)
+        return len(rows)
+
+    def _append_partition(self, part: str, recs: list[tuple]):
+        pdir = self.root / part
+        pdir.mkdir(exist_ok=True)
+        meta = self.index.get(part, {"rows": 0, "min_ts": None, "max_ts": None})
+        cols = list(zip(*recs))
+        for (fname, dtype), values in zip(COLUMNS.values(), cols):
+            path = pdir / fname
+            committed = meta["rows"] * np.dtype(dtype).itemsize
+            if path.exists() and path.stat().st_size > committed:
+                os.truncate(path, committed)#drop a torn write from a crash before the index update
+            with path.open("ab") as f:
+                f.write(np.asarray(values, dtype=dtype).tobytes())
+        ts = cols[0]
+        meta["rows"] += len(recs)
+        meta["min_ts"] = min(ts) if meta["min_ts"] is None else min(meta["min_ts"], min(ts))
+        meta["max_ts"] = max(ts) if meta["max_ts"] is None else max(meta["max_ts"], max(ts))
+        self.index[part] = meta
+
+    def append_snapshot(self, snap):
+        """StatusPoller hook: store the snapshot's worst-status rows."""
+        self.append(snap.rows)
+
+    #reads:
+    def partitions(self, t1=None, t2=None) -> list[str]:
+        """Partitions whose [min_ts, max_ts] overlaps [t1, t2] (the index tells us without opening files)."""
+        t1 = None if t1 is None else to_epoch(t1)
+        t2 = None if t2 is None else to_epoch(t2)
+        out = []
+        for part, meta in sorted(self.index.items()):
+            if not meta["rows"]:
+                continue
+            if t1 is not None and meta["max_ts"] < t1:
+                continue
+            if t2 is not None and meta["min_ts"] > t2:
+                continue
+            out.append(part)
+        return out
+
+    def _read_partition(self, part: str) -> dict[str, np.ndarray]:
+        rows = self.index[part]["rows"]
+        out = {}
+        for name, (fname, dtype) in COLUMNS.items():
+            out[name] = np.memmap(self.root / part / fname, dtype=dtype, mode="r", shape=(rows,))
+        return out
+
+    def query(self, line: str | None = None, t1=None, t2=None) -> dict[str, np.ndarray]:
+        """
+        Rows for `line` (or all lines) with t1 <= ts <= t2 (either bound optional).\n
+        Returns encoded columns: ts (int64 epoch s), line/status codes, severity. Use decode()/to_frame().
+        """
+        t1 = None if t1 is None else to_epoch(t1)
+        t2 = None if t2 is None else to_epoch(t2)
+        lc = None
+        if line is not None:
+            lc = self._line_code.get(line)
+            if lc is None:
+                return {name: np.empty(0, dtype) for name, (_, dtype) in COLUMNS.items()}
+        chunks = {name: [] for name in COLUMNS}
+        for part in self.partitions(t1, t2):
+            cols = self._read_partition(part)
+            mask = np.ones(len(cols["ts"]), dtype=bool)
+            if t1 is not None:
+                mask &= cols["ts"] >= t1
+            if t2 is not None:
+                mask &= cols["ts"] <= t2
+            if lc is not None:
+                mask &= cols["line"] == lc
+            for name in COLUMNS:
+                chunks[name].append(np.asarray(cols[name][mask]))
+        return {name: (np.concatenate(c) if c else np.empty(0, COLUMNS[name][1])) for name, c in chunks.items()}
+
+    def decode(self, cols: dict[str, np.ndarray]) -> dict[str, np.ndarray]:
+        lines = np.array(self.lines or [""], dtype=object)
+        statuses = np.array(self.statuses or [""], dtype=object)
+        return {"ts": cols["ts"], "line": lines[cols["line"]], "severity": cols["severity"],
+                "status": statuses[cols["status"]]}
+
+    def to_frame(self, line: str | None = None, t1=None, t2=None):
+        """pandas DataFrame with the old CSV columns (ts_utc, line, severity, status)."""
+        import pandas as pd
+        cols = self.decode(self.query(line, t1, t2))
+        return pd.DataFrame({
+            "ts_utc": pd.to_datetime(cols["ts"], unit="s", utc=True),
+            "line": cols["line"],
+            "severity": cols["severity"],
+            "status": cols["status"],})
+
+    def __len__(self) -> int:
+        return sum(m["rows"] for m in self.index.values())
+
+    #migration:
+    def migrate_csv(self, csv_path: str | Path, batch: int = 10_000) -> int:
+        """One-shot import of the old status_log.csv (ts_utc,line,severity,status)."""
+        n = 0
+        with Path(csv_path).open(newline="", encoding="utf-8") as f:
+            buf = []
+            for r in csv.DictReader(f):
+                if not r.get("ts_utc"):
+                    continue
+                buf.append(r)
+                if len(buf) >= batch:
+                    n += self.append(buf)
+                    buf = []
+            n += self.append(buf)
+        return n
+
+
+if __name__ == "__main__":
+    import sys
+
+    src = Path(sys.argv[1]) if len(sys.argv) > 1 else LEGACY_CSV
+    store = StatusHistory(STORE_DIR)
+    if store.index:
+        print(f"{STORE_DIR} already has {len(store)} rows - not migrating again.")
+    else:
+        print(f"Migrated {store.migrate_csv(src)} rows from {src} -> {STORE_DIR}")
@@ -0,0 +1,177 @@
+'''
+Incremental, parallel ingest of historical line disruptions (/Line/{id}/Status/{from}/to/{to}).
+
+Replaces the notebook's one-line-at-a-time 90-day loop:
+- per-line windows are fetched concurrently on a bounded worker pool
+- watermarks.json remembers the last day each line was pulled successfully, so a rerun only
+  asks TfL for the days since then (a failed line keeps its old watermark and is retried next run)
+- validityPeriods are flattened once into event rows (line_id, line, from, to, desc, severity)
+  and upserted into events/<line_id>.csv on (line, from, desc), so an event whose end moved
+  since the last pull is updated in place; load_events() reads them back as a DataFrame
+'''
+
+import csv
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Callable
+
+INGEST_DIR = Path(__file__).resolve().parents[2] / "data" / "history" / "disruptions"
+EVENT_FIELDS = ["line_id", "line", "from", "to", "desc", "severity"]
+SYNTH_HOURS = 1#no validity period / no toDate -> 1-hour window, same as the notebook
+
+
+def _parse_ts(s: str | None) -> datetime | None:
+    if not s:
+        return None
+    try:
+        dt = datetime.fromisoformat(s.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+def normalise_events(payload: list, line_id: str, line_name: str | None = None) -> list[dict]:
+    """
+    TfL history payload -> one row per non-Good validity period.\n
+    Same rules as the notebook: skip 'Good Service', synthesize a 1-hour window from `created`
+    when there are no validity periods, and from `fromDate` when `toDate` is missing.
+    """
+    rows = []
+    for it in payload or []:
+        ln = it.get("name") or line_name or line_id
+        created = it.get("created")
+        for st in it.get("lineStatuses") or []:
+            desc = (st.get("statusSeverityDescription") or "").strip()
+            if desc.lower() == "good service":
+                continue
+            sev = st.get("statusSeverity", 10)
+            vps = st.get("validityPeriods") or [{}]
+            for vp in vps:
+                t0 = _parse_ts(vp.get("fromDate") or created)
+                if t0 is None:
+                    continue
+                t1 = _parse_ts(vp.get("toDate")) or t0 + timedelta(hours=SYNTH_HOURS)
+                rows.append({"line_id": line_id, "line": ln, "from": t0.isoformat(), "to": t1.isoformat(),
+                             "desc": desc, "severity": sev})
+    return rows
+
+
+class DisruptionIngest:
+    """
+    fetch: callable(path, params) -> (data, err), e.g. TflClient.get.\n
+    Files live under out_dir: watermarks.json + events/<line_id>.csv.
+    """
+
+    def __init__(self, fetch: Callable, out_dir: str | Path = INGEST_DIR, max_workers: int = 6):
+        self.fetch = fetch
+        self.out_dir = Path(out_dir)
+        self.events_dir = self.out_dir / "events"
+        self.events_dir.mkdir(parents=True, exist_ok=True)
+        self.max_workers = max_workers
+        self._wm_path = self.out_dir / "watermarks.json"
+        self._lock = threading.Lock()
+        self.watermarks: dict[str, str] = (json.loads(self._wm_path.read_text(encoding="utf-8"))
+                                           if self._wm_path.exists() else {})
+
+    def _save_watermarks(self):
+        tmp = self._wm_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self.watermarks, indent=1, sort_keys=True), encoding="utf-8")
+        os.replace(tmp, self._wm_path)
+
+    def window(self, line_id: str, start: date, end: date) -> tuple[date, date] | None:
+        """Days still to fetch for a line: from its watermark (re-pulling that day, it may have been partial) to end."""
+        wm = self.watermarks.get(line_id)
+        if wm:
+            start = max(start, date.fromisoformat(wm))
+        return (start, end) if start <= end else None
+
+    def _append(self, line_id: str, rows: list[dict]) -> int:
+        """
+        Upsert rows keyed on (line, from, desc): the watermark day is re-pulled, and an event still
+        open at the last pull comes back with a later `to`, so a known key gets its to/severity
+        updated instead of a second row. Returns rows added or changed.
+        """
+        path = self.events_dir / f"{line_id}.csv"
+        stored: dict[tuple, dict] = {}
+        if path.exists():
+            with path.open(newline="", encoding="utf-8") as f:
+                stored = {(r["line"], r["from"], r["desc"]): r for r in csv.DictReader(f)}
+        changed, new = set(), {}
+        for r in rows:
+            key = (str(r["line"]), r["from"], r["desc"])
+            old = stored.get(key)
+            if old is None:
+                stored[key] = new[key] = r
+            elif (old["to"], str(old["severity"])) != (r["to"], str(r["severity"])):
+                old.update(to=r["to"], severity=r["severity"])
+                if key not in new:
+                    changed.add(key)
+        if changed:#rewrite with the updated rows
+            tmp = path.with_suffix(".tmp")
+            with tmp.open("w", newline="", encoding="utf-8") as f:
+                w = csv.DictWriter(f, fieldnames=EVENT_FIELDS)
+                w.writeheader()
+                w.writerows(stored.values())
+            os.replace(tmp, path)
+        elif new:
+            new_file = not path.exists()
+            with path.open("a", newline="", encoding="utf-8") as f:
+                w = csv.DictWriter(f, fieldnames=EVENT_FIELDS)
+                if new_file:
+                    w.writeheader()
+                w.writerows(new.values())
+        return len(changed) + len(new)
+
+    def _pull(self, line_id: str, line_name: str | None, start: date, end: date) -> dict:
+        data, err = self.fetch(f"/Line/{line_id}/Status/{start}/to/{end}", {"detail": "true"})
+        if err or not isinstance(data, list):
+            return {"line_id": line_id, "from": str(start), "to": str(end), "new_events": 0,
+                    "error": err or "unexpected payload"}
+        added = self._append(line_id, normalise_events(data, line_id, line_name))
+        with self._lock:
+            self.watermarks[line_id] = end.isoformat()
+            self._save_watermarks()
+        return {"line_id": line_id, "from": str(start), "to": str(end), "new_events": added, "error": None}
+
+    def run(self, lines: dict[str, str] | list[str], days: int = 90, end: date | None = None) -> list[dict]:
+        """
+        Bring every line up to `end` (default today), looking back at most `days`.\n
+        lines: {line_id: name} or [line_id, ...]. Returns one summary dict per line.
+        """
+        if not isinstance(lines, dict):
+            lines = {lid: None for lid in lines}
+        end = end or date.today()
+        start = end - timedelta(days=days)
+        todo, report = [], []
+        for lid, name in lines.items():
+            win = self.window(lid, start, end)
+            if win is None:
+                report.append({"line_id": lid, "from": None, "to": None, "new_events": 0, "error": None})
+            else:
+                todo.append((lid, name, *win))
+        if todo:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(todo)), thread_name_prefix="ingest") as pool:
+                report += list(pool.map(lambda a: self._pull(*a), todo))
+        return report
+
+    def load_events(self, lines: list[str] | None = None, since=None):
+        """All stored events (optionally for some line ids / from a start time) as a pandas DataFrame."""
+        import pandas as pd
+        paths = sorted(self.events_dir.glob("*.csv"))
+        if lines is not None:
+            wanted = set(lines)
+            paths = [p for p in paths if p.stem in wanted]
+        frames = [pd.read_csv(p) for p in paths]
+        if not frames:
+            return pd.DataFrame(columns=EVENT_FIELDS)
+        ev = pd.concat(frames, ignore_index=True)
+        ev["from"] = pd.to_datetime(ev["from"], utc=True, format="ISO8601")
+        ev["to"] = pd.to_datetime(ev["to"], utc=True, format="ISO8601")
+        if since is not None:
+            since = pd.Timestamp(since)
+            ev = ev[ev["to"] >= (since.tz_localize("UTC") if since.tz is None else since)]
+        return ev.reset_index(drop=True)
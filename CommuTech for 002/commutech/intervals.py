@@ -0,0 +1,102 @@
+'''
+Interval -> hour-bin engine for the planned-disruption figures (heatmap, commute risk, hours by line).
+
+All validity windows are binned in one pass: each window adds its partial first/last hour
+directly and its full hours through a difference array, then one cumsum per line gives the
+hours covered in every hour bin of the horizon. Bins are absolute UTC hours labelled with their
+local (day-of-week, hour), so DST is handled once for the whole horizon instead of per event.
+Cost is O(events + lines x horizon hours).
+'''
+
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+LOCAL_TZ = "Europe/London"
+COMMUTE_WINDOWS = [(7, 10), (16, 19)]#local hours [start, end)
+_HOUR = pd.Timedelta(hours=1)
+_EPOCH = pd.Timestamp(0, tz="UTC")
+
+
+def to_local(col, tz: str = LOCAL_TZ) -> pd.Series:
+    """Whole-column version of the notebook's _to_local: naive values are taken as UTC, then converted."""
+    return pd.to_datetime(pd.Series(col), errors="coerce", utc=True).dt.tz_convert(tz)
+
+
+def _epoch_hours(ts: pd.Series) -> np.ndarray:
+    return ((ts - _EPOCH) / _HOUR).to_numpy(dtype=float)
+
+
+class HourBins(NamedTuple):
+    lines: np.ndarray#line labels, row order of `coverage`
+    start: pd.Timestamp#UTC start of bin 0
+    coverage: np.ndarray#(n_lines, n_bins) hours of disruption inside each hour bin
+    dow: np.ndarray#(n_bins,) local day of week, Mon = 0
+    hod: np.ndarray#(n_bins,) local hour of day
+
+    def week_grid(self, per_line: bool = False) -> np.ndarray:
+        """Day-of-week x hour event-hours: (7, 24), or (n_lines, 7, 24) with per_line=True."""
+        grid = np.zeros((len(self.lines), 7 * 24))
+        np.add.at(grid, (slice(None), self.dow * 24 + self.hod), self.coverage)
+        grid = grid.reshape(len(self.lines), 7, 24)
+        return grid if per_line else grid.sum(axis=0)
+
+    def window_hours(self, windows=COMMUTE_WINDOWS, weekdays_only: bool = True) -> np.ndarray:
+        """(n_lines, len(windows)) hours overlapping each local [start, end) hour window."""
+        day_ok = self.dow < 5 if weekdays_only else np.ones(len(self.dow), dtype=bool)
+        out = np.zeros((len(self.lines), len(windows)))
+        for j, (a, b) in enumerate(windows):
+            out[:, j] = self.coverage[:, day_ok & (self.hod >= a) & (self.hod < b)].sum(axis=1)
+        return out
+
+    def line_hours(self) -> np.ndarray:
+        return self.coverage.sum(axis=1)
+
+
+def bin_hours(frm, to, line=None, tz: str = LOCAL_TZ) -> HourBins:
+    """
+    frm/to: array-likes of timestamps (naive = UTC); line: optional labels (one row per line).\n
+    Invalid or empty windows (NaT, to <= from) are dropped, like the notebook's `valid` mask.
+    """
+    frm = pd.to_datetime(pd.Series(frm).reset_index(drop=True), errors="coerce", utc=True)
+    to = pd.to_datetime(pd.Series(to).reset_index(drop=True), errors="coerce", utc=True)
+    labels = pd.Series(["all"] * len(frm) if line is None else list(line))
+    ok = (frm.notna() & to.notna() & (to > frm)).to_numpy()
+    codes, lines = pd.factorize(labels[ok].astype(str), sort=True)
+    if not ok.any():
+        return HourBins(np.array([], dtype=object), pd.Timestamp.now(tz="UTC").floor("h"),
+                        np.zeros((0, 0)), np.zeros(0, dtype=int), np.zeros(0, dtype=int))
+
+    s, e = _epoch_hours(frm[ok]), _epoch_hours(to[ok])
+    origin = np.floor(s.min())
+    s, e = s - origin, e - origin
+    n_bins = int(np.ceil(e.max()))
+    width = n_bins + 1#one spare bin for windows ending exactly on the last boundary
+    lo, hi = np.floor(s).astype(np.int64), np.floor(e).astype(np.int64)
+    base = codes.astype(np.int64) * width
+    size = len(lines) * width
+
+    same = lo == hi
+    part = np.zeros(size)#bincount of an empty selection comes back int64, so accumulate into floats
+    part += np.bincount(base[same] + lo[same], weights=e[same] - s[same], minlength=size)
+    span = ~same
+    part += np.bincount(base[span] + lo[span], weights=lo[span] + 1 - s[span], minlength=size)
+    part += np.bincount(base[span] + hi[span], weights=e[span] - hi[span], minlength=size)
+    #full hours lo+1 .. hi-1 via a difference array
+    diff = np.bincount(base[span] + lo[span] + 1, minlength=size) - np.bincount(base[span] + hi[span], minlength=size)
+    full = np.cumsum(diff.reshape(len(lines), width), axis=1)
+    coverage = (part.reshape(len(lines), width) + full)[:, :n_bins]
+
+    start = _EPOCH + pd.Timedelta(hours=float(origin))
+    local = pd.date_range(start, periods=n_bins, freq="h").tz_convert(tz)
+    return HourBins(np.asarray(lines, dtype=object), start, coverage,
+                    local.dayofweek.to_numpy(), local.hour.to_numpy())
+
+
+def overlap_hours(frm, to, a, b) -> np.ndarray:
+    """Hours each [frm, to) window overlaps the single window [a, b) - vectorised."""
+    s = _epoch_hours(pd.to_datetime(pd.Series(frm), utc=True))
+    e = _epoch_hours(pd.to_datetime(pd.Series(to), utc=True))
+    a, b = _epoch_hours(pd.to_datetime(pd.Series([a, b]), utc=True))
+    return np.clip(np.minimum(e, b) - np.maximum(s, a), 0, None)
@@ -0,0 +1,264 @@
+'''
+Headless journey engine: everything the Journey summary shows, without Streamlit.
+
+JourneyEngine wraps the reference data (stations, route graph, fare matrix) and answers
+one OD pair (journey) or a whole batch (batch) - zones, fares, price band, relevant/direct
+lines and the recommended line. The app renders journey(); the CLI streams batch() over a CSV:
+
+    python -m commutech.journey roster.csv -o report.csv
+'''
+
+import argparse
+import csv
+import sys
+from pathlib import Path
+from typing import Callable, NamedTuple
+
+import numpy as np
+
+from .fares import price_band
+from .refdata import ReferenceData, load_reference
+from .routing import Route, priority_rank
+
+APP_DIR = Path(__file__).resolve().parents[1]#folder with stations.json / lines.json
+
+LINE_NAME = {
+    "B": "Bakerloo",
+    "Ce": "Central",
+    "Ci": "Circle",
+    "D": "District",
+    "H": "Hammersmith & City",
+    "J": "Jubilee",
+    "M": "Metropolitan",
+    "N": "Northern",
+    "P": "Piccadilly",
+    "V": "Victoria",
+    "W": "Waterloo & City",}
+
+#commute-smart recommender logic:
+INTERCHANGE_PRIORITY = [
+    "Jubilee",
+    "Central",
+    "Northern",
+    "Victoria",
+    "Piccadilly",
+    "District",
+    "Circle",
+    "Hammersmith & City",
+    "Metropolitan",
+    "Bakerloo",
+    "Waterloo & City",]
+
+#reference: https://www.google.com/url?sa=t&source=web&rct=j&opi=89978449&url=https://www.london.gov.uk/media/107475/download&ved=2ahUKEwiht77b39ORAxXWTkEAHfKQCDAQFnoECBgQAQ&usg=AOvVaw3RtmOGoB1-GSkm7g0RqnGI
+PEAK_FARE_BY_ZONES_KEY = {#zone 1 ranges
+    "1": 2.90,
+    "12": 3.50,
+    "123": 3.80,
+    "1234": 4.60,
+    "12345": 5.20,
+    "123456": 5.80,
+    "1234567": 6.70,
+    "12345678": 8.20,
+    "123456789": 8.30,
+
+    #outer-zone equivalents (non-zone-1)
+    "2": 2.10, "3": 2.10, "4": 2.10, "5": 2.10, "6": 2.10,
+    "23": 2.30, "34": 2.30, "45": 2.30, "56": 2.30,
+    "234": 3.00, "345": 3.00, "456": 3.00,
+    "2345": 3.20, "3456": 3.20,
+    "23456": 3.60,
+    "234567": 4.90,
+    "2345678": 5.60,
+    "23456789": 5.60,
+    "34567": 4.00,
+    "345678": 4.80,
+    "3456789": 5.00,
+    "4567": 3.20,
+    "45678": 4.00,
+    "456789": 4.10,
+    "567": 2.90,
+    "5678": 3.20,
+    "56789": 3.50,
+    "67": 2.20,
+    "678": 2.90,
+    "6789": 3.00,
+    "7": 2.00,
+    "78": 2.20,
+    "789": 2.30,
+    "89": 2.20,}
+
+BATCH_FIELDS = ["from", "to", "min_fare", "max_fare", "avg_fare", "band", "direct_lines", "recommended_line", "changes"]
+
+
+def format_zones(zones: list[int]) -> str:
+    if not zones:
+        return "Unknown"
+    if len(zones) == 1:
+        return f"Zone {zones[0]}"
+    return f"Zones {zones[0]}/{zones[1]}"
+
+
+def expand_line_codes(codes: list[str]) -> list[str]:
+    return [LINE_NAME.get(c, c) for c in codes]
+
+
+def recommended_lines(route: Route | None) -> list[str]:
+    """Direct journey -> that line; with changes -> the destination line (post 002 rule); no route -> []."""
+    if route is None:
+        return []
+    return [route.lines[0]] if route.changes == 0 else [route.lines[-1]]
+
+
+class Journey(NamedTuple):
+    from_code: str
+    to_code: str
+    from_name: str | None
+    to_name: str | None
+    from_zones: list[int]
+    to_zones: list[int]
+    from_lines: list[str]
+    to_lines: list[str]
+    relevant_lines: list[str]#union
+    direct_lines: list[str]#intersection
+    route: Route | None
+    recommended: list[str]
+    min_fare: float | None
+    max_fare: float | None
+    min_key: str | None
+    max_key: str | None
+    avg_fare: float | None
+    band: str | None
+
+
+class JourneyEngine:
+    def __init__(self, ref: ReferenceData, priority: list[str] = INTERCHANGE_PRIORITY):
+        self.ref = ref
+        self.stations = ref.stations
+        self.route_graph = ref.route_graph
+        self.fare_matrix = ref.fare_matrix
+        self.rank = priority_rank(priority)
+        self.line_name = dict(zip(self.route_graph.line_codes, self.route_graph.lines))#the names the graph was built with
+
+    @classmethod
+    def load(cls, folder: str | Path = APP_DIR, **kwargs) -> "JourneyEngine":
+        return cls(load_reference(folder, LINE_NAME, PEAK_FARE_BY_ZONES_KEY), **kwargs)
+
+    def best_route(self, from_code: str, to_code: str, rank: Callable[[str], float] | None = None) -> Route | None:
+        """Fewest changes first, then lowest summed rank (default INTERCHANGE_PRIORITY order, see reliability.route_rank)."""
+        return self.route_graph.best_route(from_code, to_code, rank=rank or self.rank)
+
+    def journey(self, from_code: str, to_code: str, rank: Callable[[str], float] | None = None) -> Journey:
+        stations = self.stations
+        from_lines = [self.line_name.get(c, c) for c in stations.line_codes(from_code)]
+        to_lines = [self.line_name.get(c, c) for c in stations.line_codes(to_code)]
+        route = self.best_route(from_code, to_code, rank)
+        min_fare, max_fare, min_key, max_key = self.fare_matrix.pair(from_code, to_code)
+        avg_fare = None if min_fare is None else (min_fare + max_fare) / 2#mean of best/worst zone interpretations
+        band = None if avg_fare is None else price_band(avg_fare)
+        return Journey(
+            from_code, to_code, stations.name(from_code), stations.name(to_code),
+            stations.zones(from_code) if from_code in stations else [],
+            stations.zones(to_code) if to_code in stations else [],
+            from_lines, to_lines,
+            sorted(set(from_lines) | set(to_lines)), sorted(set(from_lines) & set(to_lines)),
+            route, recommended_lines(route), min_fare, max_fare, min_key, max_key, avg_fare, band)
+
+    def batch(self, origins, dests) -> dict[str, np.ndarray]:
+        """
+        Vectorised journeys for many OD pairs (fares from the fare matrix; lines/recommendation
+        solved once per distinct pair of station line-sets, then broadcast).\n
+        Returns column arrays keyed like BATCH_FIELDS (NaN fares / None changes = unknown or unreachable).
+        """
+        origins = np.asarray(origins, dtype=str)
+        dests = np.asarray(dests, dtype=str)
+        fares = self.fare_matrix.batch(origins, dests)
+
+        #line-set masks are Python ints (one bit per line, may exceed 64 bits) -> small dense ids
+        masks = self.route_graph.station_mask
+        ids: dict[int, int] = {}
+        mo = np.fromiter((ids.setdefault(masks.get(c, 0), len(ids)) for c in origins), dtype=np.int64, count=len(origins))
+        md = np.fromiter((ids.setdefault(masks.get(c, 0), len(ids)) for c in dests), dtype=np.int64, count=len(dests))
+        mask_of = list(ids)
+        pairs, first, inverse = np.unique(np.stack([mo, md], axis=1), axis=0, return_index=True, return_inverse=True)
+        lines = self.route_graph.lines
+        direct, rec, changes = [], [], []
+        for (a, b), i in zip(pairs, first):
+            shared = mask_of[a] & mask_of[b]
+            direct.append(";".join(sorted(lines[k] for k in range(len(lines)) if shared >> k & 1)))
+            route = self.best_route(origins[i], dests[i])
+            rec.append(";".join(recommended_lines(route)))
+            changes.append(None if route is None else route.changes)
+        inverse = inverse.reshape(-1)
+        return {
+            "from": origins,
+            "to": dests,
+            "min_fare": fares["min"],
+            "max_fare": fares["max"],
+            "avg_fare": fares["avg"],
+            "band": fares["band"],
+            "direct_lines": np.asarray(direct, dtype=object)[inverse],
+            "recommended_line": np.asarray(rec, dtype=object)[inverse],
+            "changes": np.asarray(changes, dtype=object)[inverse],}
+
+
+#CLI:
+def _read_pairs(f, chunk: int):
+    """Yield (origins, dests) chunks from a CSV with from/to (or origin/destination) columns, else the first two."""
+    reader = csv.reader(f)
+    header = next(reader, None)
+    if header is None:
+        return
+    cols = [h.strip().lower() for h in header]
+    named = [("from", "to"), ("origin", "destination"), ("from_code", "to_code")]
+    pos = next(((cols.index(a), cols.index(b)) for a, b in named if a in cols and b in cols), None)
+    rows = []
+    if pos is None:#no recognised header -> it's data
+        pos = (0, 1)
+        if len(header) > 1:
+            rows.append((header[0].strip(), header[1].strip()))
+    for r in reader:
+        if len(r) > max(pos):
+            rows.append((r[pos[0]].strip(), r[pos[1]].strip()))
+        if len(rows) >= chunk:
+            yield [o for o, _ in rows], [d for _, d in rows]
+            rows = []
+    if rows:
+        yield [o for o, _ in rows], [d for _, d in rows]
+
+
+def _fmt(v) -> str:
+    if v is None:
+        return ""
+    if isinstance(v, float):
+        return "" if v != v else f"{v:.2f}"
+    return str(v)
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m commutech.journey",
+                                 description="Batch journey report: OD station codes in, fares/bands/lines out.")
+    ap.add_argument("input", help="CSV of OD pairs (from,to columns) or - for stdin")
+    ap.add_argument("-o", "--output", help="output CSV (default stdout)")
+    ap.add_argument("--data", default=str(APP_DIR), help="folder with stations.json / lines.json")
+    ap.add_argument("--chunk", type=int, default=50_000, help="rows per vectorised batch")
+    args = ap.parse_args(argv)
+
+    engine = JourneyEngine.load(args.data)
+    src = sys.stdin if args.input == "-" else open(args.input, newline="", encoding="utf-8")
+    dst = sys.stdout if not args.output else open(args.output, "w", newline="", encoding="utf-8")
+    try:
+        w = csv.writer(dst)
+        w.writerow(BATCH_FIELDS)
+        for origins, dests in _read_pairs(src, args.chunk):
+            cols = engine.batch(origins, dests)
+            w.writerows(zip(*([_fmt(v) for v in cols[f].tolist()] for f in BATCH_FIELDS)))
+    finally:
+        if src is not sys.stdin:
+            src.close()
+        if dst is not sys.stdout:
+            dst.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,278 @@
+'''
+Concurrent-session load test for the Cockpit.
+
+Each simulated commuter is a Streamlit AppTest session running the real script: pick From/To,
+press Refresh, render arrivals, then refresh again after a think time. All sessions live in one
+process like on a real server (st.cache_resource, the TfL cache and the status poller are shared)
+and talk to a MockTflServer, so outbound TfL traffic is counted at the stand-in.
+
+    python -m commutech.loadtest --sessions 100 --concurrency 20 --refreshes 3 -o load.json
+    python -m commutech.loadtest --fixtures data/fixtures/tfl --latency-ms 80 --error-rate 0.02
+
+The run happens in a scratch copy of the app folder (stations.json/lines.json), so the stop
+index, reference snapshot, status history and reliability/quality caches it builds never touch
+the real ones (it must run in a fresh process, before the app's modules are imported). Without
+--fixtures a small synthetic fixture set is generated. The JSON report has throughput,
+p50/p95/p99 rerun latency per step, outbound requests by endpoint and RSS growth per session.
+'''
+
+import argparse
+import json
+import os
+import random
+import resource
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from .fixtures import FixtureStore, MockTflServer
+from .journey import APP_DIR, LINE_NAME
+from .perf import Histogram
+
+SCRIPT = APP_DIR / "CommuTech - Beta.py"
+STEPS = ("load", "select", "refresh")
+STREAMLIT_VERSIONS = ("1.65",)#major.minor releases _server_runtime's patches were checked against
+#env-configured data paths, redirected into the scratch dir:
+SCRATCH_MODULES = ("commutech.history", "commutech.reliability", "commutech.quality", "commutech.stopindex")
+
+
+def rss_mb() -> float:
+    """Current resident set size (peak RSS where /proc isn't available)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, IndexError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+def synthetic_fixtures(store: FixtureStore, seed: int = 0):
+    """Minimal recorded-looking set: tube status for every line, one stop search, one arrivals board."""
+    rng = random.Random(seed)
+    lines = list(LINE_NAME.values())
+    statuses = []
+    for i, name in enumerate(lines):
+        sev, desc = (10, "Good Service") if i % 3 else ((6, "Severe Delays") if i % 2 else (9, "Minor Delays"))
+        statuses.append({"id": name.lower().replace(" & ", "-").replace(" ", "-"), "name": name,
+                         "lineStatuses": [{"statusSeverity": sev, "statusSeverityDescription": desc,
+                                           "reason": "" if sev == 10 else f"{name}: {desc.lower()} due to a signal failure."}]})
+    store.put("/Line/Mode/tube/Status", None, statuses)
+    store.put("/StopPoint/Search/Epping", {"modes": "tube"},
+              {"matches": [{"id": "940GZZLUEPG", "name": "Epping Underground Station", "modes": ["tube"]}]})
+    now = datetime.now(timezone.utc)
+    board = [{"naptanId": "940GZZLUEPG", "lineName": rng.choice(lines), "platformName": f"Platform {k % 2 + 1}",
+              "destinationName": "Synthetic Terminus", "timeToStation": 30 * k + rng.randint(0, 29),
+              "expectedArrival": (now + timedelta(seconds=30 * k)).isoformat()} for k in range(30)]
+    store.put("/StopPoint/940GZZLUEPG/Arrivals", None, board)
+
+
+def check_streamlit(version: str | None = None):
+    """
+    _server_runtime patches Streamlit internals (Runtime.instance, ScriptCache, BidiComponentManager)
+    that change between releases - refuse to run on a version they weren't checked against.
+    """
+    if version is None:
+        import streamlit
+        version = streamlit.__version__
+    if ".".join(version.split(".")[:2]) not in STREAMLIT_VERSIONS:
+        raise RuntimeError(f"the load test supports Streamlit {', '.join(STREAMLIT_VERSIONS)}.x, found {version}: "
+                           "re-check _server_runtime against this release and add it to STREAMLIT_VERSIONS")
+
+
+def _station_codes() -> list[str]:
+    raw = json.loads((APP_DIR / "stations.json").read_text(encoding="utf-8"))
+    return sorted(raw)
+
+
+def run_session(pair: tuple[str, str], refreshes: int, think_s: float, timeout: float) -> dict:
+    """One commuter: load -> select From/To -> Refresh x refreshes. Returns step timings (ms) and errors."""
+    from streamlit.testing.v1 import AppTest
+
+    timings, errors = [], []
+
+    def step(name, fn):
+        t0 = time.perf_counter()
+        at = fn()
+        timings.append((name, (time.perf_counter() - t0) * 1000))
+        errors.extend(str(e.value)[:200] for e in at.exception)
+        return at
+
+    at = step("load", lambda: AppTest.from_file(str(SCRIPT), default_timeout=timeout).run())
+    if not at.exception:
+        at.sidebar.selectbox[0].select(pair[0])
+        at.sidebar.selectbox[1].select(pair[1])
+        at = step("select", at.run)
+        button = next((b for b in at.button if "Refresh" in (b.label or "")), None)
+        for i in range(refreshes if button is not None else 0):
+            if i:
+                time.sleep(think_s)
+            at = step("refresh", button.click().run)
+            button = next((b for b in at.button if "Refresh" in (b.label or "")), button)
+    return {"pair": pair, "timings": timings, "errors": errors, "app": at}#app kept so its state counts in the RSS reading
+
+
+@contextmanager
+def _server_runtime():
+    """
+    Make concurrent AppTest sessions behave like one server process.\n
+    AppTest installs a fresh mock Runtime singleton (and clears it) and compiles the script into a
+    fresh ScriptCache on every run, which is fine for one test at a time but races when sessions
+    overlap. For the load run every session sees one shared runtime stand-in and one script cache,
+    as they would under `streamlit run`.
+    """
+    from unittest.mock import MagicMock
+
+    from streamlit.components.v2.component_manager import BidiComponentManager
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+    from streamlit.runtime.dataframe_source_manager import DataframeSourceManager
+    from streamlit.runtime.media_file_manager import MediaFileManager
+    from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+    from streamlit.testing.v1 import app_test, local_script_runner
+
+    runtime = MagicMock(spec=Runtime)
+    runtime.media_file_mgr = MediaFileManager(MemoryMediaFileStorage("/mock/media"))
+    runtime.dataframe_source_mgr = DataframeSourceManager()
+    runtime.cache_storage_manager = MemoryCacheStorageManager()
+    components = BidiComponentManager()
+    components.discover_and_register_components(start_file_watching=False)
+    runtime.bidi_component_registry = components
+    script_cache = local_script_runner.ScriptCache()
+
+    saved = (Runtime.__dict__["instance"], Runtime.__dict__["exists"],
+             local_script_runner.ScriptCache, app_test.ScriptCache)
+    Runtime.instance = classmethod(lambda cls: runtime)
+    Runtime.exists = classmethod(lambda cls: True)
+    local_script_runner.ScriptCache = app_test.ScriptCache = lambda: script_cache
+    try:
+        yield
+    finally:
+        Runtime.instance, Runtime.exists, local_script_runner.ScriptCache, app_test.ScriptCache = saved
+
+
+def run_load(sessions: int = 20, concurrency: int = 5, refreshes: int = 2, think_s: float = 0.0,
+             fixtures: str | Path | None = None, latency_ms: float = 0, jitter_ms: float = 0,
+             error_rate: float = 0.0, seed: int = 0, timeout: float = 60, port: int = 0) -> dict:
+    """Run the load test and return the report dict (see module docstring)."""
+    check_streamlit()
+    imported = [m for m in SCRATCH_MODULES if m in sys.modules]
+    if imported:#their cache/store paths are already bound to the real data folders
+        raise RuntimeError(f"run the load test in a fresh process ({', '.join(imported)} already imported)")
+    rng = random.Random(seed)
+    codes = _station_codes()
+    pairs = [tuple(rng.sample(codes, 2)) for _ in range(sessions)]
+
+    work = Path(tempfile.mkdtemp(prefix="commutech-load-"))
+    for name in ("stations.json", "lines.json"):
+        shutil.copy(APP_DIR / name, work / name)
+    store = FixtureStore(fixtures if fixtures else work / "fixtures", "replay")
+    if not fixtures:
+        synthetic_fixtures(store, seed)
+
+    server = MockTflServer(store, port=port, latency_ms=latency_ms, jitter_ms=jitter_ms,
+                           error_rate=error_rate, seed=seed).start()
+    #read at import time by the app's modules, which the warm-up session imports after this
+    env = {"TFL_BASE": server.base_url, "TFL_API_KEY": os.getenv("TFL_API_KEY") or "loadtest",
+           "COMMUTECH_STATUS_STORE": str(work / "status_store"), "COMMUTECH_STATUS_LOG": str(work / "status_log.csv"),
+           "COMMUTECH_RELIABILITY_CACHE": str(work / "cache" / "reliability"),
+           "COMMUTECH_QUALITY_CACHE": str(work / "cache" / "quality"),
+           "COMMUTECH_STOP_INDEX": str(work / "cache" / "stoppoints")}
+    saved = {k: os.environ.get(k) for k in [*env, "TFL_FIXTURES"]}
+    os.environ.update(env)
+    os.environ.pop("TFL_FIXTURES", None)#the client must go over HTTP to the stand-in
+    cwd = os.getcwd()
+    os.chdir(work)
+    if str(APP_DIR) not in sys.path:
+        sys.path.insert(0, str(APP_DIR))
+
+    try:
+        with _server_runtime():
+            #warm-up session (imports, reference snapshot, poller start) - reported, not counted
+            warmup = run_session(pairs[0], 1, 0.0, timeout)
+            server.reset()
+            rss0 = rss_mb()
+            t0 = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="session") as pool:
+                results = list(pool.map(lambda p: run_session(p, refreshes, think_s, timeout), pairs))
+            wall = time.perf_counter() - t0
+            rss1 = rss_mb()#sessions (and their AppTest state) are still referenced here
+            outbound = server.counters()
+    finally:
+        server.stop()
+        os.chdir(cwd)
+        for k, v in saved.items():
+            if v is None:
+                os.environ.pop(k, None)
+            else:
+                os.environ[k] = v
+        shutil.rmtree(work, ignore_errors=True)
+
+    hist = {name: Histogram(10**6) for name in (*STEPS, "all")}
+    for r in results:
+        for name, ms in r["timings"]:
+            hist[name].add(ms)
+            hist["all"].add(ms)
+    reruns = hist["all"].count
+    errors = [e for r in (warmup, *results) for e in r["errors"]]
+    return {
+        "generated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "config": {"sessions": sessions, "concurrency": concurrency, "refreshes": refreshes, "think_s": think_s,
+                   "fixtures": str(fixtures) if fixtures else "synthetic", "latency_ms": latency_ms,
+                   "jitter_ms": jitter_ms, "error_rate": error_rate, "seed": seed, "cpu_count": os.cpu_count()},
+        "warmup_ms": {name: round(ms, 3) for name, ms in warmup["timings"]},
+        "wall_s": round(wall, 3),
+        "throughput": {"reruns": reruns, "reruns_per_s": round(reruns / wall, 3) if wall else None,
+                       "sessions_per_s": round(sessions / wall, 3) if wall else None},
+        "latency_ms": {name: h.summary() for name, h in hist.items()},
+        "outbound": {"requests": outbound["requests"], "per_session": round(outbound["requests"] / max(1, sessions), 3),
+                     "fallbacks": outbound["fallbacks"], "misses": outbound["misses"],
+                     "injected_errors": outbound["injected_errors"], "by_endpoint": outbound["endpoints"]},
+        "memory": {"rss_start_mb": round(rss0, 1), "rss_end_mb": round(rss1, 1),
+                   "per_session_kb": round((rss1 - rss0) * 1024 / max(1, sessions), 1)},
+        "errors": {"count": len(errors), "sample": errors[:5]},}
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m commutech.loadtest", description="Concurrent Cockpit sessions against a mock TfL.")
+    ap.add_argument("--sessions", type=int, default=20)
+    ap.add_argument("--concurrency", type=int, default=5, help="sessions running at once")
+    ap.add_argument("--refreshes", type=int, default=2, help="Refresh clicks per session")
+    ap.add_argument("--think-s", type=float, default=0.0, help="pause between refreshes")
+    ap.add_argument("--fixtures", help="recorded fixture folder (default: synthetic fixtures)")
+    ap.add_argument("--latency-ms", type=float, default=0)
+    ap.add_argument("--jitter-ms", type=float, default=0)
+    ap.add_argument("--error-rate", type=float, default=0.0)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--timeout", type=float, default=60, help="per-rerun timeout (s)")
+    ap.add_argument("-o", "--output", help="write the JSON report here (default stdout)")
+    args = ap.parse_args(argv)
+    from streamlit import config
+    from streamlit.logger import set_log_level
+    config.get_config_options()#parse now, or the first session's parse resets the level
+    set_log_level("error")#bare-mode/deprecation chatter from every session
+
+    try:
+        report = run_load(args.sessions, args.concurrency, args.refreshes, args.think_s, args.fixtures,
+                          args.latency_ms, args.jitter_ms, args.error_rate, args.seed, args.timeout)
+    except RuntimeError as e:#unsupported Streamlit / not a fresh process
+        print(f"loadtest: {e}", file=sys.stderr)
+        return 2
+    text = json.dumps(report, indent=1)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+        lat = report["latency_ms"]["all"]
+        print(f"{report['throughput']['reruns']} reruns in {report['wall_s']} s · p50 {lat['p50_ms']} ms · "
+              f"p95 {lat['p95_ms']} ms · p99 {lat['p99_ms']} ms · {report['outbound']['requests']} TfL requests · "
+              f"{report['errors']['count']} errors -> {args.output}")
+    else:
+        print(text)
+    return 1 if report["errors"]["count"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
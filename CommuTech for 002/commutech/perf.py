@@ -0,0 +1,151 @@
+'''
+Lightweight timing instrumentation for the app.
+
+- named sections (JSON load, data quality, Cockpit render, ...) via section() or RerunTimer.lap()
+- every outbound TfL call (endpoint template, status, bytes, latency) via record_call()
+- rolling p50/p95/p99 per name over the last `window` samples, exportable as CSV
+One PerfRecorder per process (st.cache_resource), so the numbers cover all sessions.
+'''
+
+import csv
+import io
+import math
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+#collapse ids so /StopPoint/940GZZLUEPP/Arrivals and /StopPoint/940GZZLUOXC/Arrivals share a histogram
+_ID_PATTERNS = [
+    (re.compile(r"^/StopPoint/Search/[^/?]+"), "/StopPoint/Search/{name}"),
+    (re.compile(r"^/StopPoint/[^/?]+/Arrivals"), "/StopPoint/{ids}/Arrivals"),
+    (re.compile(r"^/Line/[^/?]+/Status/[^/?]+/to/[^/?]+"), "/Line/{id}/Status/{from}/to/{to}"),]
+
+
+def endpoint_template(path: str) -> str:
+    for rx, template in _ID_PATTERNS:
+        if rx.match(path):
+            return template
+    return path
+
+
+def percentile(sorted_vals: list[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted list (q in 0..100)."""
+    if not sorted_vals:
+        return float("nan")
+    k = max(0, min(len(sorted_vals) - 1, math.ceil(q / 100 * len(sorted_vals)) - 1))
+    return sorted_vals[k]
+
+
+class Histogram:
+    """Rolling window of samples (ms) + lifetime count/total."""
+    __slots__ = ("samples", "count", "total")
+
+    def __init__(self, window: int):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+
+    def add(self, ms: float):
+        self.samples.append(ms)
+        self.count += 1
+        self.total += ms
+
+    def summary(self) -> dict:
+        vals = sorted(self.samples)
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total / self.count, 3) if self.count else float("nan"),
+            "p50_ms": round(percentile(vals, 50), 3),
+            "p95_ms": round(percentile(vals, 95), 3),
+            "p99_ms": round(percentile(vals, 99), 3),
+            "max_ms": round(vals[-1], 3) if vals else float("nan"),}
+
+
+class PerfRecorder:
+    def __init__(self, window: int = 1000, recent_calls: int = 200):
+        self.window = window
+        self._lock = threading.Lock()
+        self._hist: dict[tuple[str, str], Histogram] = {}#(kind, name) -> histogram
+        self._bytes: dict[str, int] = {}
+        self._status: dict[str, dict] = {}
+        self.calls = deque(maxlen=recent_calls)#most recent outbound calls, newest last
+
+    def record(self, name: str, ms: float, kind: str = "section"):
+        with self._lock:
+            h = self._hist.get((kind, name))
+            if h is None:
+                h = self._hist[(kind, name)] = Histogram(self.window)
+            h.add(ms)
+
+    @contextmanager
+    def section(self, name: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, (time.perf_counter() - t0) * 1000)
+
+    def record_call(self, path: str, status: int | str, nbytes: int, ms: float):
+        endpoint = endpoint_template(path)
+        self.record(endpoint, ms, kind="tfl")
+        with self._lock:
+            self._bytes[endpoint] = self._bytes.get(endpoint, 0) + nbytes
+            codes = self._status.setdefault(endpoint, {})
+            codes[str(status)] = codes.get(str(status), 0) + 1
+            self.calls.append({"time": time.strftime("%H:%M:%S"), "endpoint": endpoint, "status": status,
+                               "bytes": nbytes, "latency_ms": round(ms, 3)})
+
+    def rerun(self) -> "RerunTimer":
+        return RerunTimer(self)
+
+    def summary(self) -> list[dict]:
+        """One row per (kind, name) with rolling percentiles; TfL rows also get bytes + status counts."""
+        with self._lock:
+            items = list(self._hist.items())
+            nbytes = dict(self._bytes)
+            status = {k: dict(v) for k, v in self._status.items()}
+        rows = []
+        for (kind, name), h in sorted(items):
+            row = {"kind": kind, "name": name, **h.summary()}
+            if kind == "tfl":
+                row["bytes"] = nbytes.get(name, 0)
+                row["statuses"] = " ".join(f"{c}:{n}" for c, n in sorted(status.get(name, {}).items()))
+            rows.append(row)
+        return rows
+
+    def to_csv(self) -> str:
+        rows = self.summary()
+        fields = ["kind", "name", "count", "mean_ms", "p50_ms", "p95_ms", "p99_ms", "max_ms", "bytes", "statuses"]
+        buf = io.StringIO()
+        w = csv.DictWriter(buf, fieldnames=fields, extrasaction="ignore")
+        w.writeheader()
+        w.writerows(rows)
+        return buf.getvalue()
+
+    def reset(self):
+        with self._lock:
+            self._hist.clear()
+            self._bytes.clear()
+            self._status.clear()
+            self.calls.clear()
+
+
+class RerunTimer:
+    """
+    Splits one script rerun into consecutive named sections without re-indenting the script:\n
+    timer.lap("name") records time since the previous lap; done() records the whole rerun.
+    """
+
+    def __init__(self, recorder: PerfRecorder):
+        self.recorder = recorder
+        self.t0 = self.last = time.perf_counter()
+
+    def lap(self, name: str):
+        now = time.perf_counter()
+        self.recorder.record(name, (now - self.last) * 1000)
+        self.last = now
+
+    def done(self, name: str = "rerun total"):
+        self.recorder.record(name, (time.perf_counter() - self.t0) * 1000)
@@ -0,0 +1,130 @@
+'''
+Background Tube status poller - one per server process.
+
+Fetches /Line/Mode/tube/Status on a fixed cadence, publishes the latest snapshot for every
+session to read (no per-user network I/O) and hands each snapshot to its sinks - normally
+the columnar StatusHistory store (commutech.history). The old CSV writer is kept for exports.
+'''
+
+import csv
+import os
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, NamedTuple
+
+from .status import GOOD_SERVICE, SEVERITY_DESCRIPTIONS, status_weight
+
+STATUS_PATH = "/Line/Mode/tube/Status"
+#repo-root data/logs, the file the notebook used to write (COMMUTECH_STATUS_LOG overrides)
+STATUS_LOG = Path(os.getenv("COMMUTECH_STATUS_LOG")
+                  or Path(__file__).resolve().parents[2] / "data" / "logs" / "status_log.csv")
+LOG_FIELDS = ["ts_utc", "line", "severity", "status"]
+_DESCRIPTION_CODES = {d.lower(): c for c, d in SEVERITY_DESCRIPTIONS.items()}
+
+
+class StatusSnapshot(NamedTuple):
+    payload: list#raw TfL line objects (what the Cockpit already renders)
+    rows: list[dict]#one worst-status row per line
+    ts_utc: datetime
+
+
+def worst_status_rows(payload: list, ts_utc: str) -> list[dict]:
+    """
+    One row per line: its worst status by SEVERITY_WEIGHTS (first wins on ties), Good Service if none.\n
+    severity is the TfL code (inferred from the description when missing, -1 if unknown) - 0 is
+    Special Service, not "missing".
+    """
+    rows = []
+    for ln in payload or []:
+        sev, desc, worst = GOOD_SERVICE, "Good Service", -1
+        for s in (ln.get("lineStatuses") or []):
+            w = status_weight(s)
+            if w > worst:
+                worst = w
+                d = (s.get("statusSeverityDescription") or "").strip()
+                code = s.get("statusSeverity")
+                if type(code) is not int:
+                    code = _DESCRIPTION_CODES.get(d.lower(), -1)
+                sev, desc = code, d or SEVERITY_DESCRIPTIONS.get(code, "Good Service")
+        rows.append({"ts_utc": ts_utc, "line": ln.get("name"), "severity": sev, "status": desc})
+    return rows
+
+
+def append_status_log(rows: list[dict], path: Path = STATUS_LOG):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    new_file = not path.exists()
+    with path.open("a", newline="", encoding="utf-8") as f:
+        w = csv.DictWriter(f, fieldnames=LOG_FIELDS)
+        if new_file:
+            w.writeheader()
+        w.writerows(rows)
+
+
+class StatusPoller:
+    """
+    Daemon thread polling status every `interval` seconds.\n
+    fetch: callable(path) -> (data, err) that always goes to the network, normally the shared
+    cache's refresh() - a forced fetch that writes through, so sessions read what was polled.
+    (The plain cached get would hand back a stale-while-revalidate payload one interval old.)
+    log_path: legacy CSV sink (off by default - status history lives in commutech.history now).
+    on_snapshot: optional hooks called with each new StatusSnapshot (e.g. StatusHistory.append_snapshot).
+    """
+
+    def __init__(self, fetch: Callable, interval: float = 60, log_path: Path | None = None,
+                 on_snapshot: list[Callable] | None = None):
+        self.fetch = fetch
+        self.interval = interval
+        self.log_path = log_path
+        self.on_snapshot = list(on_snapshot or [])
+        self._latest: StatusSnapshot | None = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self.last_error: str | None = None
+        self.polls = 0
+
+    def poll_once(self) -> StatusSnapshot | None:
+        data, err = self.fetch(STATUS_PATH)
+        fetched = datetime.now(timezone.utc)#forced fetch: the payload is as of now
+        self.polls += 1
+        if err or not isinstance(data, list):
+            self.last_error = err or "unexpected payload"
+            return None
+        snap = StatusSnapshot(data, worst_status_rows(data, fetched.isoformat()), fetched)
+        with self._lock:
+            self._latest = snap
+        self.last_error = None
+        if self.log_path is not None:
+            try:
+                append_status_log(snap.rows, self.log_path)
+            except OSError as e:
+                self.last_error = f"log write failed: {e}"
+        for hook in self.on_snapshot:
+            try:
+                hook(snap)
+            except Exception as e:
+                self.last_error = f"{getattr(hook, '__name__', 'hook')} failed: {e}"
+        return snap
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.poll_once()
+            except Exception as e:#never let the thread die
+                self.last_error = str(e)
+            self._stop.wait(self.interval)
+
+    def start(self) -> "StatusPoller":
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="tfl-status-poller", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def latest(self) -> StatusSnapshot | None:
+        with self._lock:
+            return self._latest
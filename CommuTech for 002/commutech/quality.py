@@ -0,0 +1,171 @@
+'''
+Reference-data integrity checks behind the sidebar data-quality badge and "Basic data checks".
+
+QualityIndex validates every station/lines entry in one pass (missing from lines.json, missing
+from stations.json, unknown line codes, zones outside 1-9) and keeps each entry's validated
+content next to the verdicts of the entries that failed. load_quality() pickles the index under
+data/cache/quality/ keyed on the reference fingerprint (stations.json + lines.json bytes), so an unchanged checkout reuses the
+verdict as-is and an edited one re-validates only the entries whose zones/line codes changed.
+'''
+
+import os
+import pickle
+from pathlib import Path
+from typing import NamedTuple
+
+from .journey import LINE_NAME
+
+QUALITY_DIR = Path(os.getenv("COMMUTECH_QUALITY_CACHE", Path(__file__).resolve().parents[2] / "data" / "cache" / "quality"))
+QUALITY_FILE = "quality.pkl"
+QUALITY_VERSION = 1
+ZONE_RANGE = (1, 9)
+
+
+class EntryCheck(NamedTuple):
+    missing_lines: bool
+    missing_station: bool
+    unknown_codes: tuple[str, ...]
+    bad_zones: tuple[int, ...]
+
+
+def check_entry(zones: tuple | None, codes: tuple | None, known_codes: frozenset) -> EntryCheck | None:
+    """Verdict for one code (zones/codes None = absent from stations.json/lines.json); None = clean."""
+    lo, hi = ZONE_RANGE
+    if zones is not None and codes is not None and known_codes.issuperset(codes) \
+            and lo <= min(zones, default=lo) and max(zones, default=hi) <= hi:
+        return None
+    return EntryCheck(
+        codes is None, zones is None,
+        tuple(c for c in codes or () if c not in known_codes),
+        tuple(z for z in zones or () if z < lo or z > hi))
+
+
+def _sample(items: list[str]) -> str:
+    return f"{', '.join(items[:5])}{'...' if len(items) > 5 else ''}"
+
+
+class QualityIndex:
+    """
+    All reference checks from one pass over stations + lines_raw.\n
+    keys holds each code's (zones, line codes) as validated, problems only the entries that failed.
+    previous: an earlier index for the same known_codes - entries whose key is unchanged keep
+    their verdict instead of being re-checked (`revalidated` counts the rest).
+    """
+    __slots__ = ("version", "fingerprint", "known_codes", "keys", "problems", "n_stations", "n_lines",
+                 "missing_lines", "missing_stations", "unknown_codes", "out_of_range", "revalidated")
+
+    def __init__(self, stations, lines_raw: dict, known_codes=LINE_NAME, fingerprint: str = "",
+                 previous: "QualityIndex | None" = None):
+        known = frozenset(known_codes)
+        if previous is not None and previous.known_codes == known:
+            prev_keys, prev_problems = previous.keys, previous.problems
+        else:
+            prev_keys, prev_problems = {}, {}
+        if hasattr(stations, "zone_items"):
+            zone_items = stations.zone_items()
+        else:
+            zone_items = ((c, tuple(meta.get("zones", []))) for c, meta in stations.items())
+        lines_get = lines_raw.get
+
+        keys, problems = {}, {}
+        revalidated = 0
+        for code, zones in zone_items:
+            codes = lines_get(code)
+            key = keys[code] = (zones, None if codes is None else tuple(codes))
+            if prev_keys.get(code) == key:
+                e = prev_problems.get(code)
+            else:
+                e = check_entry(*key, known)
+                revalidated += 1
+            if e is not None:
+                problems[code] = e
+        for code, codes in lines_raw.items():#lines.json entries without a station
+            if code in keys:
+                continue
+            key = keys[code] = (None, tuple(codes))
+            if prev_keys.get(code) == key:
+                e = prev_problems[code]
+            else:
+                e = check_entry(*key, known)
+                revalidated += 1
+            problems[code] = e
+
+        unknown: set[str] = set()
+        missing_lines, missing_stations, out_of_range = [], [], []
+        for code, e in problems.items():#stations.json order, then lines-only codes
+            if e.missing_lines:
+                missing_lines.append(code)
+            if e.missing_station:
+                missing_stations.append(code)
+            unknown.update(e.unknown_codes)
+            out_of_range.extend((code, z) for z in e.bad_zones)
+
+        self.version = QUALITY_VERSION
+        self.fingerprint = fingerprint
+        self.known_codes = known
+        self.keys = keys
+        self.problems = problems
+        self.n_stations = len(stations)
+        self.n_lines = len(lines_raw)
+        self.missing_lines = sorted(missing_lines)
+        self.missing_stations = sorted(missing_stations)
+        self.unknown_codes = sorted(unknown)
+        self.out_of_range = out_of_range
+        self.revalidated = revalidated
+
+    @property
+    def issues(self) -> list[str]:
+        issues = []
+        if self.missing_lines:
+            issues.append(f"{len(self.missing_lines)} station codes missing from lines.json (e.g., {_sample(self.missing_lines)})")
+        if self.unknown_codes:
+            issues.append(f"Unknown line codes detected: {', '.join(self.unknown_codes)}")
+        if self.out_of_range:
+            issues.append(f"Zone values out of expected range (1–9): {_sample([f'{sid}:{z}' for sid, z in self.out_of_range])}")
+        return issues
+
+    @property
+    def status(self) -> str:
+        return "WARN" if self.missing_lines or self.unknown_codes or self.out_of_range else "OK"
+
+
+def compute_data_quality(stations: dict, lines_raw: dict, known_codes=LINE_NAME):
+    """
+    stations: StationStore (or {code: {"zones": [...]}}); known_codes: recognised line codes.\n
+    Returns: (status, details)\n
+      status: "OK" or "WARN"\n
+      details: list[str] of issues\n
+    """
+    q = QualityIndex(stations, lines_raw, known_codes)
+    return q.status, q.issues
+
+
+def load_quality(ref, known_codes=LINE_NAME, cache_dir: str | Path | None = QUALITY_DIR) -> QualityIndex:
+    """
+    The QualityIndex for ReferenceData ref: the cached one when ref.fingerprint matches, else
+    rebuilt on top of it (only changed entries re-checked) and cached again.
+    """
+    path = Path(cache_dir) / QUALITY_FILE if cache_dir else None
+    previous = None
+    if path is not None and path.exists():
+        try:
+            with path.open("rb") as f:
+                previous = pickle.load(f)
+            if not isinstance(previous, QualityIndex) or previous.version != QUALITY_VERSION:
+                previous = None
+        except Exception:
+            previous = None#stale/corrupt cache -> full check
+    known = frozenset(known_codes)
+    if previous is not None and previous.fingerprint == ref.fingerprint and previous.known_codes == known:
+        return previous
+    q = QualityIndex(ref.stations, ref.lines_raw, known, ref.fingerprint, previous)
+    if path is not None:
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(".tmp")
+            with tmp.open("wb") as f:
+                pickle.dump(q, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, path)
+        except OSError:
+            pass#read-only checkout: keep the in-memory verdict
+    return q
@@ -0,0 +1,160 @@
+'''
+Reference data (stations.json + lines.json) and everything derived from it, built once.
+
+StationStore is a compact __slots__/array-backed replacement for the per-rerun `stations`
+dict, sorted dropdown codes and labels. load_reference() bundles it with
+the route graph and fare matrix and keeps a pickled snapshot next to the JSON files, keyed on
+a fingerprint of their bytes, so a cold start skips JSON parsing and all precomputation.
+'''
+
+import hashlib
+import json
+import os
+import pickle
+from array import array
+from pathlib import Path
+from typing import NamedTuple
+
+from .fares import FareMatrix
+from .routing import RouteGraph
+
+SNAPSHOT_FILE = "refdata.snapshot.pkl"
+SNAPSHOT_VERSION = 3#bump when StationStore/RouteGraph/FareMatrix layout changes
+
+
+def parse_station_value(v: str):
+    parts = [p.strip() for p in v.split("|") if p.strip()]
+    name = parts[0]
+    zones = [int(z) for z in parts[1:]]#1 or 2 ints
+    return name, sorted(set(zones))
+
+
+def format_station_label(code: str, name: str) -> str:
+    return f"{name} ({code})"
+
+
+class StationStore:
+    """
+    Parsed stations, column-wise.\n
+    zones are kept as two short arrays (lo/hi; equal for single-zone stations, -1 = unknown).
+    """
+    __slots__ = ("codes", "_pos", "_names", "_zone_lo", "_zone_hi", "_lines",
+                 "sorted_codes", "labels")
+
+    def __init__(self, stations_raw: dict[str, str], lines_raw: dict[str, list[str]]):
+        self.codes = tuple(stations_raw)
+        self._pos = {c: i for i, c in enumerate(self.codes)}
+        names, lo, hi = [], array("h"), array("h")
+        for v in stations_raw.values():
+            name, zones = parse_station_value(v)
+            names.append(name)
+            lo.append(zones[0] if zones else -1)
+            hi.append(zones[-1] if zones else -1)
+        self._names = tuple(names)
+        self._zone_lo, self._zone_hi = lo, hi
+        self._lines = tuple(tuple(lines_raw.get(c, ())) for c in self.codes)
+
+        #dropdown order + labels (were rebuilt on every rerun); integrity checks live in quality.QualityIndex
+        self.sorted_codes = sorted(self.codes, key=lambda c: self._names[self._pos[c]].lower())
+        self.labels = {c: format_station_label(c, self.name(c)) for c in self.sorted_codes}
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def __contains__(self, code) -> bool:
+        return code in self._pos
+
+    def __iter__(self):
+        return iter(self.codes)
+
+    def keys(self):
+        return self.codes
+
+    def name(self, code: str, default: str | None = None) -> str | None:
+        i = self._pos.get(code)
+        return default if i is None else self._names[i]
+
+    def zones(self, code: str) -> list[int]:
+        i = self._pos[code]
+        lo, hi = self._zone_lo[i], self._zone_hi[i]
+        if lo < 0:
+            return []
+        return [lo] if lo == hi else [lo, hi]
+
+    def line_codes(self, code: str) -> tuple[str, ...]:
+        i = self._pos.get(code)
+        return () if i is None else self._lines[i]
+
+    def __getitem__(self, code: str) -> dict:
+        """Dict view for older call sites: {"name": ..., "zones": [...]}."""
+        return {"name": self.name(code), "zones": self.zones(code)}
+
+    def items(self):
+        for c in self.codes:
+            yield c, self[c]
+
+    def zone_items(self):
+        """(code, zones tuple) in stations.json order, straight off the zone arrays."""
+        for c, lo, hi in zip(self.codes, self._zone_lo, self._zone_hi):
+            yield c, () if lo < 0 else (lo,) if lo == hi else (lo, hi)
+
+    def zone_map(self) -> dict[str, list[int]]:
+        return {c: self.zones(c) for c in self.codes}
+
+
+class ReferenceData(NamedTuple):
+    fingerprint: str
+    stations: StationStore
+    lines_raw: dict
+    route_graph: RouteGraph
+    fare_matrix: FareMatrix
+
+
+def fingerprint(paths: list[Path], *extra) -> str:
+    """sha1 over file bytes (+ any extra config, e.g. LINE_NAME / fare table) - changes when the data does."""
+    h = hashlib.sha1(str(SNAPSHOT_VERSION).encode())
+    for p in paths:
+        h.update(Path(p).read_bytes())
+    for e in extra:
+        h.update(repr(sorted(e.items()) if isinstance(e, dict) else e).encode())
+    return h.hexdigest()
+
+
+def build_reference(stations_raw: dict, lines_raw: dict, line_names: dict, fare_table: dict, fp: str = "") -> ReferenceData:
+    store = StationStore(stations_raw, lines_raw)
+    graph = RouteGraph(lines_raw, line_names)
+    graph.precompute()
+    return ReferenceData(fp, store, lines_raw, graph, FareMatrix(fare_table, store.zone_map()))
+
+
+def load_reference(folder: str | Path, line_names: dict, fare_table: dict,
+                   snapshot: str | None = SNAPSHOT_FILE) -> ReferenceData:
+    """
+    Load stations.json/lines.json from folder, via the binary snapshot when it's current.\n
+    Raises FileNotFoundError / json.JSONDecodeError like a plain json load would.
+    """
+    folder = Path(folder)
+    paths = [folder / "stations.json", folder / "lines.json"]
+    fp = fingerprint(paths, line_names, fare_table)
+    snap_path = folder / snapshot if snapshot else None
+    if snap_path is not None and snap_path.exists():
+        try:
+            with snap_path.open("rb") as f:
+                ref = pickle.load(f)
+            if isinstance(ref, ReferenceData) and ref.fingerprint == fp:
+                return ref
+        except Exception:
+            pass#stale/corrupt snapshot -> rebuild below
+    ref = build_reference(
+        json.loads(paths[0].read_text(encoding="utf-8")),
+        json.loads(paths[1].read_text(encoding="utf-8")),
+        line_names, fare_table, fp)
+    if snap_path is not None:
+        try:
+            tmp = snap_path.with_suffix(".tmp")
+            with tmp.open("wb") as f:
+                pickle.dump(ref, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, snap_path)
+        except OSError:
+            pass#read-only deploy: just run without the snapshot
+    return ref
@@ -0,0 +1,208 @@
+'''
+Per-line reliability by hour of week, from the status history.
+
+ReliabilityIndex keeps, for every line x hour-of-week (Mon 00:00 London time = 0 ... Sun 23:00 = 167),
+the number of status samples and their summed severity weight (status.SEVERITY_WEIGHTS, 0 = Good
+Service). `expected[line, hour]` is the smoothed mean weight - the cell's samples pulled toward the
+line's overall mean by PRIOR_SAMPLES, so a thinly sampled hour can't swing the ranking - and is
+refreshed on every update, so a lookup is a dict get and an array read.
+
+Built once from the columnar StatusHistory (vectorised bincount), then fed each new poller
+snapshot via StatusPoller(on_snapshot=[..., index.update_snapshot]). The counts and the newest
+timestamp folded in are pickled under data/cache/reliability/, so a restart only reads the
+history rows newer than that watermark.
+
+route_rank() combines the index with the live line_score into the rank best_route() takes.
+'''
+
+import os
+import pickle
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Callable
+from zoneinfo import ZoneInfo
+
+import numpy as np
+
+from .history import StatusHistory, to_epoch
+from .journey import INTERCHANGE_PRIORITY
+from .status import SEVERITY_WEIGHTS, StatusSummary, severity_weight
+
+RELIABILITY_DIR = Path(os.getenv("COMMUTECH_RELIABILITY_CACHE", Path(__file__).resolve().parents[2] / "data" / "cache" / "reliability"))
+RELIABILITY_FILE = "reliability.pkl"
+INDEX_VERSION = 2#bump when the severity weights change (cached counts are weighted sums)
+TZ_NAME = os.getenv("COMMUTECH_TZ", "Europe/London")#commute hours are local
+HOURS = 168
+PRIOR_SAMPLES = 12.0#pseudo-samples at the line's overall mean per cell
+RELIABILITY_WEIGHT = 1.0#one unit of expected weight vs one point of live line_score
+PRIORITY_TIEBREAK = 1e-3#INTERCHANGE_PRIORITY only decides between otherwise equal lines
+
+
+def hour_of_week(ts=None) -> int:
+    """Hour of week (Mon 00:00 = 0) in TZ_NAME for ts (epoch / ISO / datetime), default now."""
+    tz = ZoneInfo(TZ_NAME)
+    dt = datetime.now(tz) if ts is None else datetime.fromtimestamp(to_epoch(ts), tz)
+    return dt.weekday() * 24 + dt.hour
+
+
+def hours_of_week(epochs: np.ndarray) -> np.ndarray:
+    import pandas as pd
+    t = pd.to_datetime(np.asarray(epochs, dtype=np.int64), unit="s", utc=True).tz_convert(TZ_NAME)
+    return np.asarray(t.dayofweek * 24 + t.hour, dtype=np.int64)
+
+
+def _weight(severity: int, status: str) -> int:
+    w = SEVERITY_WEIGHTS.get(severity)
+    return severity_weight(status) if w is None else w
+
+
+class ReliabilityIndex:
+    """
+    samples/weight: float arrays [line, hour of week]; watermark: newest epoch second folded in.\n
+    Thread-safe for one writer (the poller thread) and any number of readers.
+    """
+
+    def __init__(self, lines: list[str] | None = None, samples=None, weight=None, watermark: int | None = None):
+        self.lines = list(lines or [])
+        self._pos = {ln: i for i, ln in enumerate(self.lines)}
+        shape = (len(self.lines), HOURS)
+        self.samples = np.zeros(shape) if samples is None else np.array(samples, dtype=float)
+        self.weight = np.zeros(shape) if weight is None else np.array(weight, dtype=float)
+        self.watermark = watermark
+        self.updates = 0
+        self._lock = threading.Lock()
+        self._refresh()
+
+    def __getstate__(self):
+        return {"version": INDEX_VERSION, "lines": self.lines, "samples": self.samples,
+                "weight": self.weight, "watermark": self.watermark}
+
+    def __setstate__(self, state):
+        if state.get("version") != INDEX_VERSION:
+            raise ValueError("reliability index version changed")
+        self.__init__(state["lines"], state["samples"], state["weight"], state["watermark"])
+
+    def __len__(self) -> int:
+        return int(self.samples.sum())
+
+    def _refresh(self):
+        """Recompute expected[] (a few hundred cells) - called after every change."""
+        line_n = self.samples.sum(axis=1)
+        line_w = self.weight.sum(axis=1)
+        total_n = line_n.sum()
+        self.default = float(line_w.sum() / total_n) if total_n else 0.0#lines never seen
+        with np.errstate(divide="ignore", invalid="ignore"):
+            prior = np.where(line_n > 0, line_w / line_n, self.default)
+        self.expected = (self.weight + PRIOR_SAMPLES * prior[:, None]) / (self.samples + PRIOR_SAMPLES)
+
+    def _line_ids(self, names) -> np.ndarray:
+        new = [n for n in dict.fromkeys(names) if n not in self._pos]
+        if new:
+            for n in new:
+                self._pos[n] = len(self.lines)
+                self.lines.append(n)
+            pad = np.zeros((len(new), HOURS))
+            self.samples = np.vstack([self.samples, pad])
+            self.weight = np.vstack([self.weight, pad])
+        return np.fromiter((self._pos[n] for n in names), dtype=np.int64, count=len(names))
+
+    def add(self, ts, lines, weights):
+        """Fold in samples: parallel sequences of epoch seconds, line names and severity weights."""
+        ts = np.asarray(ts, dtype=np.int64)
+        if not len(ts):
+            return
+        with self._lock:
+            keep = ts > self.watermark if self.watermark is not None else np.ones(len(ts), dtype=bool)
+            if not keep.any():
+                return#already counted (e.g. caught up from the history)
+            ts = ts[keep]
+            li = self._line_ids([n for n, k in zip(lines, keep) if k])
+            cell = li * HOURS + hours_of_week(ts)
+            size = len(self.lines) * HOURS
+            self.samples += np.bincount(cell, minlength=size).reshape(-1, HOURS)
+            self.weight += np.bincount(cell, weights=np.asarray(weights, dtype=float)[keep], minlength=size).reshape(-1, HOURS)
+            self.watermark = int(ts.max())
+            self.updates += 1
+            self._refresh()
+
+    def add_rows(self, rows: list[dict]):
+        """Rows shaped like the status history: {"ts_utc", "line", "severity", "status"}."""
+        self.add([to_epoch(r["ts_utc"]) for r in rows], [str(r["line"]) for r in rows],
+                 [_weight(int(r["severity"]), str(r["status"])) for r in rows])
+
+    def catch_up(self, history: StatusHistory) -> int:
+        """Fold in every history row newer than the watermark (all of them on first build). Returns rows read."""
+        t1 = None if self.watermark is None else self.watermark + 1
+        cols = history.query(t1=t1)
+        if not len(cols["ts"]):
+            return 0
+        lines = np.array(history.lines, dtype=object)[cols["line"]]
+        #weight per (severity, status) pair, not per row
+        pairs, inverse = np.unique(np.stack([cols["severity"].astype(np.int64), cols["status"].astype(np.int64)], axis=1),
+                                   axis=0, return_inverse=True)
+        table = np.array([_weight(int(s), history.statuses[int(c)]) for s, c in pairs], dtype=float)
+        self.add(cols["ts"], lines.tolist(), table[inverse.reshape(-1)])
+        return len(cols["ts"])
+
+    def update_snapshot(self, snap, cache_dir: str | Path | None = RELIABILITY_DIR):
+        """StatusPoller hook: fold in the snapshot's worst-status rows and persist."""
+        self.add_rows(snap.rows)
+        if cache_dir:
+            self.save(cache_dir)
+
+    def save(self, cache_dir: str | Path = RELIABILITY_DIR):
+        path = Path(cache_dir) / RELIABILITY_FILE
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(".tmp")
+            with self._lock, tmp.open("wb") as f:
+                pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, path)
+        except OSError:
+            pass#read-only checkout: the in-memory index still works
+
+    #lookups (O(1)):
+    def expected_weight(self, line: str, how: int | None = None) -> float:
+        """Smoothed mean severity weight for line at hour-of-week how (default now); 0 = always Good Service."""
+        i = self._pos.get(line)
+        if i is None:
+            return self.default
+        return float(self.expected[i, hour_of_week() if how is None else how])
+
+
+def load_reliability(history: StatusHistory, cache_dir: str | Path | None = RELIABILITY_DIR) -> ReliabilityIndex:
+    """The cached index caught up with the history (built from scratch when there's no usable cache)."""
+    index = None
+    path = Path(cache_dir) / RELIABILITY_FILE if cache_dir else None
+    if path is not None and path.exists():
+        try:
+            with path.open("rb") as f:
+                index = pickle.load(f)
+            if not isinstance(index, ReliabilityIndex):
+                index = None
+        except Exception:
+            index = None#stale/corrupt cache -> rebuild from the history
+    index = index or ReliabilityIndex()
+    if index.catch_up(history) and cache_dir:
+        index.save(cache_dir)
+    return index
+
+
+def route_rank(index: ReliabilityIndex | None, summary: StatusSummary | None = None,
+               priority: list[str] = INTERCHANGE_PRIORITY, how: int | None = None) -> Callable[[str], float]:
+    """
+    rank(line) for RouteGraph.best_route: live line_score (summary) + RELIABILITY_WEIGHT x the
+    line's expected weight at this hour of week, INTERCHANGE_PRIORITY order breaking ties.\n
+    Lower = preferred. Built once per rerun; each call is a couple of dict gets.
+    """
+    live = dict(zip(summary.names, summary.scores)) if summary is not None else {}
+    hist = {}
+    if index is not None and index.lines:
+        col = index.expected[:, hour_of_week() if how is None else how]
+        hist = dict(zip(index.lines, col.tolist()))
+    default = index.default if index is not None else 0.0
+    pos = {name: i for i, name in enumerate(priority)}
+    n = len(pos)
+    return lambda name: (live.get(name, 0) + RELIABILITY_WEIGHT * hist.get(name, default)
+                         + PRIORITY_TIEBREAK * pos.get(name, n))
@@ -0,0 +1,155 @@
+'''
+Route engine: fewest-interchange search over the station/line graph.
+
+lines.json only tells us which lines call at a station (no stop order), so the graph is
+station <-> line. A route is a sequence of lines; consecutive lines meet at an interchange
+station. Ranking = fewest changes first, then a caller supplied line preference.
+'''
+
+from collections import deque
+from typing import Callable, NamedTuple
+
+
+class Route(NamedTuple):
+    lines: tuple[str, ...]   #line names in travel order
+    via: tuple[str, ...]     #interchange station codes (len = changes)
+    changes: int
+
+
+def _bits(mask: int) -> list[int]:
+    out = []
+    i = 0
+    while mask:
+        if mask & 1:
+            out.append(i)
+        mask >>= 1
+        i += 1
+    return out
+
+
+class RouteGraph:
+    """
+    Compact station/line graph built once per process.\n
+    Stations are stored as a line bitmask, lines as an adjacency bitmask, and the
+    line->line hop distances are precomputed, so a query is a couple of table lookups.
+    """
+
+    def __init__(self, station_lines: dict[str, list[str]], line_names: dict[str, str] | None = None):
+        line_names = line_names or {}
+        codes = sorted({c for cs in station_lines.values() for c in cs})
+        idx = {c: i for i, c in enumerate(codes)}
+        self.line_codes = codes
+        self.lines = [line_names.get(c, c) for c in codes]
+        self.station_mask: dict[str, int] = {}
+        for sid, cs in station_lines.items():
+            m = 0
+            for c in cs:
+                m |= 1 << idx[c]
+            self.station_mask[sid] = m
+
+        #line adjacency + interchange stations per (line a, line b)
+        n = len(codes)
+        self.adj = [0] * n
+        transfer: dict[tuple[int, int], list[str]] = {}
+        for sid, m in self.station_mask.items():
+            ls = _bits(m)
+            for a in ls:
+                for b in ls:
+                    if a != b:
+                        self.adj[a] |= 1 << b
+                        transfer.setdefault((a, b), []).append(sid)
+        #best interchange first: most lines (bigger hub), then code for stability
+        self.transfer = {
+            k: tuple(sorted(v, key=lambda s: (-bin(self.station_mask[s]).count("1"), s)))
+            for k, v in transfer.items()}
+
+        #all-pairs line hop distances (tiny graph, BFS from every line)
+        self.dist = [self._bfs(a) for a in range(n)]
+        self._table: dict[tuple[int, int], tuple[Route, ...]] = {}
+
+    def _bfs(self, start: int) -> list[int]:
+        dist = [-1] * len(self.adj)
+        dist[start] = 0
+        q = deque([start])
+        while q:
+            a = q.popleft()
+            for b in _bits(self.adj[a]):
+                if dist[b] < 0:
+                    dist[b] = dist[a] + 1
+                    q.append(b)
+        return dist
+
+    def _line_paths(self, a: int, b: int) -> list[list[int]]:
+        """All shortest line sequences a -> b."""
+        if a == b:
+            return [[a]]
+        out = []
+        for x in _bits(self.adj[a]):
+            if self.dist[x][b] == self.dist[a][b] - 1:
+                out.extend([a] + p for p in self._line_paths(x, b))
+        return out
+
+    def _solve(self, mo: int, md: int) -> tuple[Route, ...]:
+        if not mo or not md:
+            return ()
+        shared = mo & md
+        if shared:
+            return tuple(Route((self.lines[i],), (), 0) for i in _bits(shared))
+        pairs = [(a, b) for a in _bits(mo) for b in _bits(md) if self.dist[a][b] > 0]
+        if not pairs:
+            return ()
+        best = min(self.dist[a][b] for a, b in pairs)
+        seen = set()
+        routes = []
+        for a, b in pairs:
+            if self.dist[a][b] != best:
+                continue
+            for p in self._line_paths(a, b):
+                key = tuple(p)
+                if key in seen:
+                    continue
+                seen.add(key)
+                via = tuple(self.transfer[(p[i], p[i + 1])][0] for i in range(len(p) - 1))
+                routes.append(Route(tuple(self.lines[i] for i in p), via, best))
+        return tuple(routes)
+
+    def routes(self, from_code: str, to_code: str) -> tuple[Route, ...]:
+        """All fewest-change routes between two station codes (empty if unknown/unreachable)."""
+        key = (self.station_mask.get(from_code, 0), self.station_mask.get(to_code, 0))
+        hit = self._table.get(key)
+        if hit is None:
+            hit = self._table[key] = self._solve(*key)
+        return hit
+
+    def best_route(self, from_code: str, to_code: str,
+                   rank: Callable[[str], float] | None = None) -> Route | None:
+        """
+        Fewest changes, then lowest summed line rank (lower = preferred).\n
+        With no rank, lines are preferred in graph order so the answer is stable.
+        """
+        candidates = self.routes(from_code, to_code)
+        if not candidates:
+            return None
+        if rank is None:
+            pos = {name: i for i, name in enumerate(self.lines)}
+            rank = lambda name: pos.get(name, len(pos))
+        return min(candidates, key=lambda r: (r.changes, sum(rank(l) for l in r.lines), r.lines))
+
+    def precompute(self) -> int:
+        """
+        Fill the interchange table for every pair of distinct station line-sets.\n
+        Stations sharing a line-set share answers, so this is far smaller than all OD pairs.
+        Returns number of table entries.
+        """
+        masks = sorted(set(self.station_mask.values()))
+        for mo in masks:
+            for md in masks:
+                if (mo, md) not in self._table:
+                    self._table[(mo, md)] = self._solve(mo, md)
+        return len(self._table)
+
+
+def priority_rank(priority: list[str]) -> Callable[[str], int]:
+    """Turn an ordered preference list (e.g. INTERCHANGE_PRIORITY) into a rank function."""
+    pos = {name: i for i, name in enumerate(priority)}
+    return lambda name: pos.get(name, len(pos))
@@ -0,0 +1,50 @@
+'''
+Single-flight: concurrent calls for the same key share one in-flight execution.
+When 50 sessions hit Refresh at 08:00, one GET goes out and all 50 get its result.
+'''
+
+import threading
+
+
+class _Call:
+    __slots__ = ("done", "result", "waiters")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: dict = {}
+        self.coalesced = 0#calls that piggy-backed on someone else's request
+
+    def do(self, key, fn):
+        """Run fn() once per key at a time; concurrent callers with the same key wait and share the result."""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self.coalesced += 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                leader = True
+        if not leader:
+            call.done.wait()
+            return call.result
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.result = (None, str(e))
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+        return call.result
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
@@ -0,0 +1,160 @@
+'''
+Line status scoring for the Cockpit (Network Pulse ordering, relevant-line ranking).
+Higher score = worse line.
+
+TfL status entries carry a numeric statusSeverity (0-20, see /Line/Meta/Severity), so the weight
+is a lookup in the explicit SEVERITY_WEIGHTS table; the description heuristic is only the
+fallback for entries without a known code. summarise_status() scores a whole /Line/Mode/tube/Status payload in one
+pass and returns everything the Cockpit and the data checks show (scores, best/worst,
+good/disrupted counts).
+'''
+
+from typing import NamedTuple
+
+GOOD_SERVICE = 10
+
+#statusSeverity -> description (TfL /Line/Meta/Severity, tube)
+SEVERITY_DESCRIPTIONS = {
+    0: "Special Service",
+    1: "Closed",
+    2: "Suspended",
+    3: "Part Suspended",
+    4: "Planned Closure",
+    5: "Part Closure",
+    6: "Severe Delays",
+    7: "Reduced Service",
+    8: "Bus Service",
+    9: "Minor Delays",
+    10: "Good Service",
+    11: "Part Closed",
+    12: "Exit Only",
+    13: "No Step Free Access",
+    14: "Change of frequency",
+    15: "Diverted",
+    16: "Not Running",
+    17: "Issues Reported",
+    18: "No Issues",
+    19: "Information",
+    20: "Service Closed",}
+
+
+def severity_weight(desc: str) -> int:
+    """Lower is better. Rough weighting (Phase 2 heuristic) - fallback for entries without a known code."""
+    if not desc:
+        return 1
+    d = desc.lower()
+    if "good" in d:
+        return 0
+    if "minor" in d:
+        return 2
+    if "part" in d or "reduced" in d:
+        return 4
+    if "severe" in d:
+        return 6
+    if "suspended" in d or "closed" in d:
+        return 8
+    return 3#fallback
+
+
+#statusSeverity -> weight on the severity_weight scale (0 good, 2 minor, 4 partial, 6 severe, 8 no service).
+#Written out per code: the description heuristic misses closures/no-service wording and "No Issues".
+SEVERITY_WEIGHTS = {
+    0: 4,#Special Service
+    1: 8,#Closed
+    2: 8,#Suspended
+    3: 4,#Part Suspended
+    4: 8,#Planned Closure
+    5: 4,#Part Closure
+    6: 6,#Severe Delays
+    7: 4,#Reduced Service
+    8: 8,#Bus Service (replacement buses - no trains)
+    9: 2,#Minor Delays
+    10: 0,#Good Service
+    11: 4,#Part Closed
+    12: 2,#Exit Only
+    13: 1,#No Step Free Access
+    14: 2,#Change of frequency
+    15: 4,#Diverted
+    16: 8,#Not Running
+    17: 2,#Issues Reported
+    18: 0,#No Issues
+    19: 1,#Information
+    20: 8,}#Service Closed
+
+
+def status_weight(status: dict) -> int:
+    """Weight of one lineStatuses entry: code lookup, description heuristic as the fallback."""
+    code = status.get("statusSeverity")
+    w = SEVERITY_WEIGHTS.get(code) if type(code) is int else None
+    return severity_weight(status.get("statusSeverityDescription", "")) if w is None else w
+
+
+def is_good_service(status: dict | None) -> bool:
+    if not status:
+        return False
+    code = status.get("statusSeverity")
+    if type(code) is int and code in SEVERITY_DESCRIPTIONS:
+        return code == GOOD_SERVICE
+    return "Good Service" in (status.get("statusSeverityDescription") or "")
+
+
+def line_score(line_obj: dict) -> int:
+    """
+    Combined score = worst status weight + number of disruption messages.
+    Higher score => worse line.
+    """
+    statuses = line_obj.get("lineStatuses") or []
+    if not statuses:
+        return 1
+    msg_count = sum(1 for s in statuses if (s.get("reason") or "").strip())
+    return max(status_weight(s) for s in statuses) + msg_count
+
+
+class StatusSummary(NamedTuple):
+    names: list[str]#payload order
+    descs: list[str]#first status description per line ("" if none)
+    scores: list[int]#line_score per line
+    order: list[int]#indices best -> worst (stable: payload order breaks ties)
+    good: int#lines whose (first) status is Good Service
+    disrupted: int
+
+    def ranked(self, idx) -> list[tuple[int, str, str]]:
+        return [(self.scores[i], self.names[i], self.descs[i]) for i in idx]
+
+    def best(self, k: int = 3) -> list[tuple[int, str, str]]:
+        return self.ranked(self.order[:k])
+
+    def worst(self, k: int = 3) -> list[tuple[int, str, str]]:
+        return self.ranked(self.order[::-1][:k])
+
+    def by_name(self) -> dict[str, tuple[int, str]]:
+        return {n: (s, d) for n, s, d in zip(self.names, self.scores, self.descs)}
+
+
+def summarise_status(payload: list | None) -> StatusSummary:
+    """Score every line of a status payload in one pass (same scores as line_score)."""
+    weights = SEVERITY_WEIGHTS
+    names, descs, scores = [], [], []
+    good = 0
+    for ln in payload or []:
+        statuses = ln.get("lineStatuses") or []
+        names.append(ln.get("name", "Unknown"))
+        descs.append((statuses[0].get("statusSeverityDescription") if statuses else "") or "")
+        if not statuses:
+            scores.append(1)
+            continue
+        worst, msgs = -1, 0
+        for st in statuses:
+            code = st.get("statusSeverity")
+            w = weights.get(code) if type(code) is int else None
+            if w is None:
+                w = severity_weight(st.get("statusSeverityDescription", ""))
+            if w > worst:
+                worst = w
+            if st.get("reason") and st["reason"].strip():
+                msgs += 1
+        scores.append(worst + msgs)
+        if is_good_service(statuses[0]):
+            good += 1
+    order = sorted(range(len(scores)), key=scores.__getitem__)#stable: payload order breaks ties
+    return StatusSummary(names, descs, scores, order, good, len(scores) - good)
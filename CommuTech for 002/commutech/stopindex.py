@@ -0,0 +1,134 @@
+'''
+Local station code -> TfL StopPoint (NaPTAN) id index.
+
+stations.json already names every station, so resolving "Epping" through /StopPoint/Search on
+every refresh is a wasted round trip (and matches[0] is sometimes a bus stop or the wrong
+Edgware Road). The index is keyed on the CRS-style codes in stations.json, stored as
+data/cache/stoppoints/stoppoints.json (COMMUTECH_STOP_INDEX overrides the folder), loaded at
+startup and only extended on a miss.
+
+Build it up front with:  python -m commutech.stopindex  (needs TFL_API_KEY)
+'''
+
+import json
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Callable
+
+STOP_INDEX_DIR = Path(os.getenv("COMMUTECH_STOP_INDEX", Path(__file__).resolve().parents[2] / "data" / "cache" / "stoppoints"))
+INDEX_FILE = "stoppoints.json"
+
+
+def normalise_name(name: str) -> str:
+    """'Edgware Road (Bakerloo)' / 'Edgware Road (Bakerloo) Underground Station' -> 'edgware road bakerloo'."""
+    s = (name or "").lower().replace("&", " and ")
+    s = re.sub(r"\b(underground|dlr|rail)?\s*station\b", " ", s)
+    s = re.sub(r"[^a-z0-9]+", " ", s)
+    return re.sub(r"\s+", " ", s).strip()
+
+
+def pick_match(station_name: str, matches: list[dict]) -> dict | None:
+    """
+    Choose the best StopPoint search match for a station name.\n
+    Prefer tube stops, then exact normalised-name equality, then name prefix, then TfL's order.
+    """
+    if not matches:
+        return None
+    target = normalise_name(station_name)
+    base = normalise_name(re.sub(r"\(.*?\)", "", station_name))
+
+    def score(item):
+        i, m = item
+        modes = m.get("modes") or []
+        name = normalise_name(m.get("name", ""))
+        return (
+            0 if ("tube" in modes or not modes) else 1,
+            0 if name in (target, base) else (1 if name.startswith(base) else 2),
+            i,)
+    return min(enumerate(matches), key=score)[1]
+
+
+class StopPointIndex:
+    """Thread-safe, persisted {station code: {"id": naptan id, "name": matched name}}."""
+
+    def __init__(self, path: str | Path = STOP_INDEX_DIR / INDEX_FILE):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._ids: dict[str, dict] = {}
+        self.misses = 0
+        if self.path.exists():
+            try:
+                self._ids = json.loads(self.path.read_text(encoding="utf-8"))
+            except (OSError, json.JSONDecodeError):
+                self._ids = {}#corrupt index -> rebuild lazily
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def get(self, code: str) -> str | None:
+        entry = self._ids.get(code)
+        return entry["id"] if entry else None
+
+    def add(self, code: str, stop_id: str, name: str = "", save: bool = True):
+        with self._lock:
+            self._ids[code] = {"id": stop_id, "name": name}
+            if save:
+                self._save()
+
+    def _save(self):
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(".tmp")
+            tmp.write_text(json.dumps(self._ids, indent=2, sort_keys=True), encoding="utf-8")
+            os.replace(tmp, self.path)
+        except OSError:
+            pass#read-only checkout: the in-memory index still works
+
+    def resolve_from_search(self, code: str, station_name: str, search: dict | None) -> str | None:
+        """Record the best match from a /StopPoint/Search payload and return its id."""
+        matches = (search.get("matches") if isinstance(search, dict) else []) or []
+        best = pick_match(station_name, matches)
+        if not best or not best.get("id"):
+            return None
+        self.add(code, best["id"], best.get("name", ""))
+        return best["id"]
+
+    def resolve(self, code: str, station_name: str, search_fn: Callable):
+        """
+        Index hit -> (id, None) with no network. Miss -> one search via search_fn(name) -> (id, err).\n
+        search_fn follows the (data, err) convention (e.g. stoppoint_search).
+        """
+        stop_id = self.get(code)
+        if stop_id:
+            return stop_id, None
+        self.misses += 1
+        search, err = search_fn(station_name)
+        if err:
+            return None, err
+        stop_id = self.resolve_from_search(code, station_name, search)
+        return stop_id, (None if stop_id else f"No StopPoint match for {station_name}")
+
+    def build(self, stations: dict[str, str], search_fn: Callable) -> list[str]:
+        """Resolve every station code not yet indexed (stations: code -> name). Returns codes that failed."""
+        failed = []
+        for code, name in stations.items():
+            if self.get(code):
+                continue
+            search, err = search_fn(name)
+            if err or not self.resolve_from_search(code, name, search):
+                failed.append(code)
+        return failed
+
+
+if __name__ == "__main__":
+    from .tfl_client import TflClient
+
+    here = Path(__file__).resolve().parents[1]
+    raw = json.loads((here / "stations.json").read_text(encoding="utf-8"))
+    names = {code: v.split("|")[0].strip() for code, v in raw.items()}
+    client = TflClient()
+    index = StopPointIndex()
+    failed = index.build(names, lambda n: client.get(f"/StopPoint/Search/{n}", {"modes": "tube"}))
+    print(f"Indexed {len(index)} stations -> {index.path}" + (f"; unresolved: {', '.join(failed)}" if failed else ""))
@@ -0,0 +1,107 @@
+'''
+Shared HTTP client for the TfL Unified API.
+
+One requests.Session per process: keep-alive connection pool, gzip negotiated,
+bounded retries with exponential backoff (honours Retry-After on 429), and a small
+thread pool so one refresh can fan several GETs out at once.
+Every call keeps the app's (data, err) return convention from tfl_get.
+'''
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from .fixtures import FixtureStore
+
+TFL_BASE = "https://api.tfl.gov.uk"
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+def default_key() -> str | None:
+    return os.getenv("TFL_API_KEY")
+
+
+class TflClient:
+    """Pooled, retrying GET client. Safe to share across Streamlit sessions/threads."""
+
+    def __init__(self, base_url: str | None = None, key_fn: Callable[[], str | None] = default_key,
+                 timeout: float = 15, retries: int = 3, backoff: float = 0.3,
+                 pool_size: int = 16, max_workers: int = 8, require_key: bool = True, recorder=None,
+                 fixtures: FixtureStore | None = None):
+        #TFL_BASE env override lets the app/notebook point at a local stub server
+        self.base_url = (base_url or os.getenv("TFL_BASE") or TFL_BASE).rstrip("/")
+        self.key_fn = key_fn
+        self.timeout = timeout
+        self.require_key = require_key
+        self.recorder = recorder#optional PerfRecorder: endpoint/status/bytes/latency per call
+        self.fixtures = fixtures if fixtures is not None else FixtureStore.from_env()#TFL_FIXTURES=record|replay
+
+        retry = Retry(
+            total=retries,
+            connect=retries,
+            read=retries,
+            status=retries,
+            backoff_factor=backoff,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=frozenset({"GET"}),
+            respect_retry_after_header=True,
+            raise_on_status=False,)
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({"Accept": "application/json", "Accept-Encoding": "gzip, deflate"})
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tfl")
+
+    def get(self, path: str, params: dict | None = None):
+        """GET base_url + path with app_key added. Returns (json, None) or (None, error str)."""
+        if self.fixtures is not None and self.fixtures.mode == "replay":
+            return self.fixtures.get(path, params)#offline: no key, no network
+        key = self.key_fn()
+        if not key and self.require_key:
+            return None, "Missing API key"
+        params = dict(params or {})#never mutate the caller's dict
+        if key:
+            params["app_key"] = key
+        t0 = time.perf_counter()
+        try:
+            r = self.session.get(f"{self.base_url}{path}", params=params, timeout=self.timeout)
+        except Exception as e:#connection/timeout, retries exhausted
+            self._record(path, "ERR", 0, t0)
+            return None, str(e)
+        self._record(path, r.status_code, len(r.content), t0)#exactly once per call
+        if r.status_code != 200:
+            return None, f"HTTP {r.status_code}: {r.text[:200]}"
+        try:
+            data = r.json()
+        except Exception as e:
+            return None, str(e)
+        if self.fixtures is not None:
+            try:
+                self.fixtures.put(path, params, data)
+            except OSError:
+                pass#fixture dir not writable: still a good response, just not recorded
+        return data, None
+
+    def _record(self, path: str, status, nbytes: int, t0: float):
+        if self.recorder is not None:
+            self.recorder.record_call(path, status, nbytes, (time.perf_counter() - t0) * 1000)
+
+    def get_many(self, calls: list[tuple[str, dict | None]]) -> list[tuple]:
+        """
+        Issue several GETs concurrently.\n
+        calls: [(path, params), ...] -> [(data, err), ...] in the same order.
+        """
+        if len(calls) <= 1:
+            return [self.get(p, q) for p, q in calls]
+        futures = [self._pool.submit(self.get, p, q) for p, q in calls]
+        return [f.result() for f in futures]
+
+    def close(self):
+        self._pool.shutdown(wait=False)
+        self.session.close()
@@ -0,0 +1,299 @@
+'''
+Content-hashed Parquet cache for the notebook's Excel ingest.
+
+An .xlsx is a zip with one XML part per sheet, so each sheet gets its own digest (its XML +
+sharedStrings + styles) without opening the workbook in openpyxl. A cleaned sheet is stored as
+data/cache/workbooks/<key>.parquet (+ .json metadata) where key = digest + sheet name + cleaner
+name + version (cleaners may read the sheet name, e.g. the year); only sheets whose key isn't
+cached are parsed, in parallel worker processes.
+
+The per-sheet cleaners (clean_station_sheet, tube_performance_sheet, perf_sheet_series) are the
+bodies of the notebook's clean_station_workbook / clean_tube_performance / build_perf_minimal
+loops, moved here so worker processes can import them.
+Bump CLEANER_VERSION when a cleaner's output changes.
+'''
+
+import hashlib
+import importlib.util
+import json
+import os
+import posixpath
+import re
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable
+from xml.etree import ElementTree
+
+import numpy as np
+import pandas as pd
+
+CACHE_DIR = Path(__file__).resolve().parents[2] / "data" / "cache" / "workbooks"
+CLEANER_VERSION = 2
+_PARQUET = any(importlib.util.find_spec(m) for m in ("pyarrow", "fastparquet"))
+_NS = {"m": "http://schemas.openxmlformats.org/spreadsheetml/2006/main",
+       "r": "http://schemas.openxmlformats.org/officeDocument/2006/relationships",
+       "rel": "http://schemas.openxmlformats.org/package/2006/relationships"}
+_SHARED_PARTS = ("xl/sharedStrings.xml", "xl/styles.xml")#every sheet's values/number formats depend on these
+
+
+def sheet_digests(xlsx_path: str | Path) -> dict[str, str]:
+    """{sheet name: sha1} in workbook order. Non-zip workbooks (.xls) fall back to one whole-file hash."""
+    path = Path(xlsx_path)
+    try:
+        with zipfile.ZipFile(path) as z:
+            names = set(z.namelist())
+            shared = hashlib.sha1()
+            for part in _SHARED_PARTS:
+                if part in names:
+                    shared.update(z.read(part))
+            rels = ElementTree.fromstring(z.read("xl/_rels/workbook.xml.rels"))
+            targets = {r.get("Id"): r.get("Target") for r in rels.findall("rel:Relationship", _NS)}
+            book = ElementTree.fromstring(z.read("xl/workbook.xml"))
+            out = {}
+            for sh in book.findall("m:sheets/m:sheet", _NS):
+                target = targets.get(sh.get(f"{{{_NS['r']}}}id"), "")
+                part = target.lstrip("/") if target.startswith("/") else posixpath.normpath(posixpath.join("xl", target))
+                h = shared.copy()
+                h.update(z.read(part) if part in names else b"")
+                out[sh.get("name")] = h.hexdigest()
+            return out
+    except (zipfile.BadZipFile, KeyError):
+        digest = hashlib.sha1(path.read_bytes()).hexdigest()
+        return {s: digest for s in pd.ExcelFile(path).sheet_names}
+
+
+def _cache_key(digest: str, sheet: str, cleaner: Callable, version: int, header) -> str:
+    tag = f"{digest}|{sheet}|{cleaner.__module__}.{cleaner.__qualname__}|v{version}|h{header}"
+    return hashlib.sha1(tag.encode()).hexdigest()
+
+
+def _parse_sheet(xlsx_path: str, sheet: str, header, cleaner: Callable):
+    """Worker: read one sheet and clean it -> (DataFrame | None, meta)."""
+    raw = pd.read_excel(xlsx_path, sheet_name=sheet, header=header)
+    return cleaner(raw, sheet)
+
+
+def _store(base: Path, df: pd.DataFrame | None, meta: dict):
+    meta = dict(meta, empty=df is None)
+    if df is not None:
+        if _PARQUET:
+            df.to_parquet(base.with_suffix(".parquet"), index=False)
+        else:
+            df.to_pickle(base.with_suffix(".pkl"))
+    tmp = base.with_suffix(".tmp")
+    tmp.write_text(json.dumps(meta, default=str), encoding="utf-8")
+    os.replace(tmp, base.with_suffix(".json"))#written last: the json marks the entry complete
+
+
+def _load(base: Path):
+    meta_path = base.with_suffix(".json")
+    if not meta_path.exists():
+        return None
+    meta = json.loads(meta_path.read_text(encoding="utf-8"))
+    if meta.pop("empty"):
+        return None, meta
+    for suffix, reader in ((".parquet", pd.read_parquet), (".pkl", pd.read_pickle)):
+        p = base.with_suffix(suffix)
+        if p.exists() and (suffix != ".parquet" or _PARQUET):
+            return reader(p), meta
+    return None
+
+
+def load_sheets(xlsx_path: str | Path, cleaner: Callable, sheets: Callable[[str], bool] | None = None,
+                header=None, version: int = CLEANER_VERSION, cache_dir: str | Path = CACHE_DIR,
+                max_workers: int | None = None) -> dict[str, tuple]:
+    """
+    Cleaned sheets of a workbook, in workbook order: {sheet: (DataFrame | None, meta)}.\n
+    cleaner(raw_df, sheet_name) -> (DataFrame | None, meta dict) must be importable (module level).
+    sheets: optional name filter. Unchanged sheets come straight from the cache; the rest are
+    parsed in a process pool and cached. meta["cached"] says which was which.
+    """
+    cache_dir = Path(cache_dir)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    digests = {s: d for s, d in sheet_digests(xlsx_path).items() if sheets is None or sheets(s)}
+    out, todo = {}, []
+    for s, d in digests.items():
+        base = cache_dir / _cache_key(d, s, cleaner, version, header)
+        hit = _load(base)
+        if hit is None:
+            todo.append((s, base))
+        else:
+            out[s] = (hit[0], dict(hit[1], cached=True))
+    if todo:
+        workers = max(1, min(len(todo), max_workers or os.cpu_count() or 1))
+        if workers == 1:#no pool to pay for: open the workbook once
+            with pd.ExcelFile(xlsx_path) as xl:
+                results = [cleaner(xl.parse(s, header=header), s) for s, _ in todo]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = [pool.submit(_parse_sheet, str(xlsx_path), s, header, cleaner) for s, _ in todo]
+                results = [f.result() for f in futures]
+        for (s, base), (df, meta) in zip(todo, results):
+            _store(base, df, meta)
+            out[s] = (df, dict(meta, cached=False))
+    return {s: out[s] for s in digests}
+
+
+#cleaners:
+def is_entry_exit_sheet(name: str) -> bool:
+    return "entry" in name.lower() and "exit" in name.lower()
+
+
+def clean_station_sheet(raw: pd.DataFrame, sheet: str):
+    """One "Entry & Exit" sheet (read with header=None) -> year, station, annual_entries_exits, daily_avg_passengers."""
+    raw = raw.dropna(how="all").dropna(axis=1, how="all")
+    if raw.empty:
+        return None, {}
+
+    df = raw.copy()
+    df.columns = [f"col{i}" for i in range(df.shape[1])]#assume first column holds station names
+    for c in df.columns[1:]:
+        df[c] = pd.to_numeric(df[c], errors="coerce")#coerce non first columns to numeric
+
+    num_cols = [c for c in df.columns[1:] if np.issubdtype(df[c].dtype, np.number)]
+    if not num_cols:
+        return None, {}
+    q90 = {c: df[c].quantile(0.90) for c in num_cols}
+    total_col = max(q90, key=lambda k: (q90[k] if pd.notna(q90[k]) else -np.inf))#choose total as numeric column with highest 90th %
+
+    out = pd.DataFrame({
+        "station": df["col0"].astype(str).str.strip().str.title(),
+        "annual_entries_exits": df[total_col]})
+    out = out.replace({"": np.nan, "nan": np.nan})
+    out = out[~out["station"].str.contains(r"^total\b|^counts\b|^grand\b", case=False, na=False)]
+    out = out.dropna(subset=["station", "annual_entries_exits"])#drop junk
+
+    if out["annual_entries_exits"].max(skipna=True) < 100_000:
+        out["annual_entries_exits"] = out["annual_entries_exits"] * 1_000_000#millions to absolute
+    out["daily_avg_passengers"] = out["annual_entries_exits"] / 365.0#daily average
+
+    m = re.search(r"(20\d{2})", sheet)
+    out["year"] = int(m.group(1)) if m else np.nan
+    return out[["year", "station", "annual_entries_exits", "daily_avg_passengers"]].reset_index(drop=True), {"total_col": total_col}
+
+
+def tube_performance_sheet(raw: pd.DataFrame, sheet: str):
+    """
+    One performance sheet (read with header=0) -> line, date, metric rows, or None if unusable.\n
+    Metric = the first EJT/LCH column, else the numeric column with the largest variance.
+    """
+    df = raw.dropna(how="all").dropna(axis=1, how="all")
+    if df.shape[1] < 2:
+        return None, {}
+
+    cols_norm = [re.sub(r"\s+", " ", str(c).strip().lower()) for c in df.columns]
+    cmap = {cn: c for cn, c in zip(cols_norm, df.columns)}#normalize headers
+
+    line_col = None
+    for key in ["line", "line name", "route"]:
+        hit = [cmap[k] for k in list(cmap) if key in k]
+        if hit:
+            line_col = hit[0]
+            break
+    if line_col is None:
+        obj = df.select_dtypes(exclude=[np.number]).columns
+        if len(obj) == 0:
+            return None, {}
+        line_col = obj[0]#line column?
+
+    date_series = None
+    for key in ["period start", "start date", "date"]:
+        hit = [cmap[k] for k in list(cmap) if key in k]
+        if hit:
+            date_series = pd.to_datetime(df[hit[0]], errors="coerce")
+            break
+    if date_series is None and ("year" in cmap and "month" in cmap):
+        y = pd.to_numeric(df[cmap["year"]], errors="coerce")
+        m = pd.to_numeric(df[cmap["month"]], errors="coerce")
+        date_series = pd.to_datetime(dict(year=y, month=m, day=1), errors="coerce")#date column?
+
+    metric_col = None
+    for key in ["excess journey time", "ejt", "lost customer hours", "lch"]:
+        hit = [cmap[k] for k in list(cmap) if key in k]
+        if hit:
+            metric_col = hit[0]
+            break
+    if metric_col is None:
+        num = df.select_dtypes(include=[np.number]).columns
+        if len(num) == 0:
+            return None, {}
+        var = pd.Series({c: pd.to_numeric(df[c], errors="coerce").var(skipna=True) for c in num})
+        metric_col = var.sort_values(ascending=False).index[0]#metric column?
+
+    tidy = pd.DataFrame({
+        "line": df[line_col].astype(str).str.replace(" line", "", case=False).str.title().str.strip(),
+        "metric": pd.to_numeric(df[metric_col], errors="coerce")})
+    if date_series is not None:
+        tidy["date"] = pd.to_datetime(date_series, errors="coerce").dt.to_period("M").dt.to_timestamp()
+    else:
+        tidy["date"] = pd.NaT
+
+    tidy = tidy.dropna(subset=["line"]).drop_duplicates()
+    meta = {"metric_col": str(metric_col), "line_col": str(line_col)}
+    return tidy[["line", "date", "metric"]].reset_index(drop=True), meta
+
+
+def perf_sheet_series(raw: pd.DataFrame, sheet: str):
+    """
+    One performance sheet (read with header=0) -> tidy line, date, metric (monthly), or None if unusable.\n
+    Metric = numeric column with the largest variance (skipping year/month/period keys).
+    """
+    df = raw.dropna(how="all").dropna(axis=1, how="all")
+    if df.shape[1] < 2:
+        return None, {}
+    #normalise headers/ simple lookups
+    cols_norm = [re.sub(r"\s+", " ", str(c).strip().lower()) for c in df.columns]
+    cmap = {cn: c for cn, c in zip(cols_norm, df.columns)}
+
+    num_cols = df.select_dtypes(include=[np.number]).columns.tolist()
+    if not num_cols:
+        #coerce everything except first text-like col
+        for c in df.columns[1:]:
+            df[c] = pd.to_numeric(df[c], errors="coerce")
+        num_cols = df.select_dtypes(include=[np.number]).columns.tolist()
+    if not num_cols:
+        return None, {}
+
+    skip = {cmap[k] for k in cmap if k in {"year", "month", "period"}} & set(df.columns)
+    cand = [c for c in num_cols if c not in skip] or num_cols
+    var = pd.Series({c: pd.to_numeric(df[c], errors="coerce").var(skipna=True) for c in cand})
+    metric_col = var.sort_values(ascending=False).index[0]
+
+    line_col = None
+    for key in ["line", "line name", "route"]:
+        hit = [cmap[k] for k in cmap if key in k]
+        if hit:
+            line_col = hit[0]
+            break
+
+    date_s = None
+    for key in ["period start", "start date", "date"]:
+        hit = [cmap[k] for k in cmap if key in k]
+        if hit:
+            try:
+                date_s = pd.to_datetime(df[hit[0]], errors="coerce")
+            except Exception:
+                date_s = None
+            break
+    if date_s is None and "year" in cmap and "month" in cmap:
+        y = pd.to_numeric(df[cmap["year"]], errors="coerce")
+        m = pd.to_numeric(df[cmap["month"]], errors="coerce")
+        date_s = pd.to_datetime(dict(year=y, month=m, day=1), errors="coerce")
+
+    tidy = pd.DataFrame({
+        "line": (df[line_col].astype(str) if line_col else "Network"),
+        "metric": pd.to_numeric(df[metric_col], errors="coerce")})
+    if date_s is not None:
+        tidy["date"] = pd.to_datetime(date_s, errors="coerce")
+    else:
+        tidy["date"] = pd.date_range("2010-01-01", periods=len(tidy), freq="MS")#synthetic monthly index
+
+    tidy = (tidy.replace({"": np.nan, "nan": np.nan}).dropna(subset=["metric"])
+            .assign(line=lambda d: d["line"].astype(str).str.replace(" line", "", case=False).str.title().str.strip()))
+    tidy["date"] = pd.to_datetime(tidy["date"], errors="coerce").dt.to_period("M").dt.to_timestamp()
+    if tidy.empty:
+        return None, {}
+    meta = {"metric_col": str(metric_col), "line_col": None if line_col is None else str(line_col),
+            "date_mode": "real-date" if date_s is not None else "synthetic-date"}
+    return tidy.reset_index(drop=True), meta
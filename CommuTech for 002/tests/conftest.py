@@ -0,0 +1,6 @@
+import sys
+from pathlib import Path
+
+APP_DIR = Path(__file__).resolve().parents[1]#folder with the commutech package
+if str(APP_DIR) not in sys.path:
+    sys.path.insert(0, str(APP_DIR))
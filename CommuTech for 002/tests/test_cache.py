@@ -0,0 +1,91 @@
+'''
+ResponseCache: TTL expiry, stale-while-revalidate, stale-if-error and LRU eviction.
+'''
+
+import threading
+import time
+
+from commutech.cache import ResponseCache
+
+FRESH, STALE = 0.1, 0.3
+
+
+class Client:
+    """Fake TflClient: payload "<path>#<n>" for the n-th GET; fail=True returns an error instead."""
+
+    def __init__(self):
+        self.calls = 0
+        self.fail = False
+        self._lock = threading.Lock()
+
+    def get(self, path, params=None):
+        with self._lock:
+            self.calls += 1
+            n = self.calls
+        return (None, "HTTP 503") if self.fail else (f"{path}#{n}", None)
+
+
+def cache(client, **kw) -> ResponseCache:
+    return ResponseCache(client, ttls=[(r"^/", FRESH, STALE)], **kw)
+
+
+def wait_for(cond, timeout=2.0):
+    end = time.monotonic() + timeout
+    while not cond():
+        assert time.monotonic() < end, "timed out"
+        time.sleep(0.005)
+
+
+def test_fresh_hit_then_expiry_refetches():
+    client = Client()
+    c = cache(client)
+    assert c.get("/a") == ("/a#1", None)
+    assert c.get("/a") == ("/a#1", None) and client.calls == 1
+    assert c.is_fresh("/a")
+    time.sleep(FRESH + STALE + 0.02)#past the stale window: a plain miss
+    assert c.get("/a") == ("/a#2", None) and client.calls == 2
+    assert c.info()["hits"] == 1 and c.info()["misses"] == 2
+
+
+def test_stale_is_served_and_revalidated_in_background():
+    client = Client()
+    c = cache(client)
+    c.get("/a")
+    time.sleep(FRESH + 0.02)
+    assert not c.is_fresh("/a")
+    assert c.get("/a") == ("/a#1", None)#served stale, immediately
+    wait_for(lambda: c.is_fresh("/a"))
+    assert c.get("/a") == ("/a#2", None) and client.calls == 2
+    assert c.info()["stale_hits"] == 1
+
+
+def test_failed_refetch_serves_last_good_payload():
+    client = Client()
+    c = cache(client)
+    c.get("/a")
+    time.sleep(FRESH + STALE + 0.02)
+    client.fail = True
+    assert c.get("/a") == ("/a#1", None)
+    assert c.info()["errors_masked"] == 1
+    assert c.get("/b") == (None, "HTTP 503")#nothing to fall back on
+    assert c.refresh("/a") == (None, "HTTP 503")#the poller's forced fetch never masks errors
+
+
+def test_lru_eviction_keeps_recently_used():
+    client = Client()
+    c = cache(client, max_entries=2)
+    c.get("/a"), c.get("/b")
+    c.get("/a")#touch: /b is now least recently used
+    c.get("/c")
+    assert c.fetched_at("/b") is None
+    assert c.fetched_at("/a") is not None and c.fetched_at("/c") is not None
+    assert c.info()["evictions"] == 1 and c.info()["size"] == 2
+
+
+def test_per_endpoint_ttls_and_params_key():
+    c = ResponseCache(Client())
+    assert c.ttl_for("/Line/Mode/tube/Status") == (30, 120)
+    assert c.ttl_for("/StopPoint/940GZZLUEPG/Arrivals") == (15, 30)
+    assert c.ttl_for("/Journey/JourneyResults/a/to/b") == (c.default_ttl, c.default_stale)
+    c.get("/x", {"a": 1, "app_key": "secret"})
+    assert c.get("/x", {"a": "1"}) == ("/x#1", None)#params order/type and app_key don't split entries
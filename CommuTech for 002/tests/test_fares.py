@@ -0,0 +1,41 @@
+'''
+FareMatrix must price exactly like the per-pair dict lookup (fare_range_for_station_pair).
+'''
+
+import random
+
+import numpy as np
+import pytest
+
+from commutech.bench import real_network, synthetic_network
+from commutech.fares import MAX_ZONE, FareMatrix, fare_range_for_station_pair
+from commutech.journey import PEAK_FARE_BY_ZONES_KEY
+from commutech.refdata import parse_station_value
+
+
+def station_zones(net) -> dict[str, list[int]]:
+    return {c: parse_station_value(v)[1] for c, v in net.stations_raw.items()}
+
+
+def test_out_of_range_zone_is_unknown_not_clipped():
+    fm = FareMatrix(PEAK_FARE_BY_ZONES_KEY, {"A": [1], "B": [MAX_ZONE + 1], "C": [2, MAX_ZONE + 1], "D": [2]})
+    assert fm.pair("A", "B") == (None, None, None, None)
+    assert fm.pair("A", "C") == fare_range_for_station_pair([1], [2, MAX_ZONE + 1], PEAK_FARE_BY_ZONES_KEY)
+    assert fm.pair("C", "D") == fare_range_for_station_pair([2, MAX_ZONE + 1], [2], PEAK_FARE_BY_ZONES_KEY)
+
+
+@pytest.mark.parametrize("make", [real_network, lambda: synthetic_network(10)], ids=["x1", "x10"])
+def test_matrix_matches_dict_lookup(make):
+    zones = station_zones(make())
+    fm = FareMatrix(PEAK_FARE_BY_ZONES_KEY, zones)
+    codes = list(zones)
+    rng = random.Random(0)
+    pairs = [(rng.choice(codes), rng.choice(codes)) for _ in range(3000)]
+    pairs += [(a, b) for a in codes if max(zones[a], default=1) > MAX_ZONE or min(zones[a], default=1) < 1
+              for b in codes[:50]]#every out-of-range station against a spread of others
+    for o, d in pairs:
+        assert fm.pair(o, d) == fare_range_for_station_pair(zones[o], zones[d], PEAK_FARE_BY_ZONES_KEY), (o, d)
+
+    batch = fm.batch([o for o, _ in pairs], [d for _, d in pairs])
+    expect = np.array([np.nan if r[0] is None else r[0] for r in (fm.pair(o, d) for o, d in pairs)])
+    np.testing.assert_array_equal(batch["min"], expect)
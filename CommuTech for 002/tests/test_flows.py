@@ -0,0 +1,40 @@
+'''
+FlowCube.build keeps missing figures as NaN instead of counting them as 0.
+'''
+
+import numpy as np
+import pandas as pd
+
+from commutech.flows import FlowCube
+
+
+def cube() -> FlowCube:
+    flow = pd.DataFrame({
+        "station": ["bank", "Bank", "Epping", "Epping", "Oval"],
+        "year": [2022, 2022, 2022, 2023, 2023],
+        "annual_entries_exits": [100.0, 50.0, np.nan, 40.0, "n/a"],
+        "daily_avg_passengers": [1.0, np.nan, 2.0, np.nan, 3.0],
+    })
+    ref = pd.DataFrame({"station": ["Bank", "Epping", "Oval"], "line": ["Central/Northern", "Central", "Northern"]})
+    return FlowCube.build(flow, ref)
+
+
+def test_missing_measures_stay_nan():
+    c = cube()
+    a = pd.DataFrame(c.values[0], index=c.years, columns=c.stations)
+    assert a.loc[2022, "Bank"] == 150.0#duplicates summed, NaN skipped
+    assert np.isnan(a.loc[2022, "Epping"])
+    assert np.isnan(a.loc[2023, "Oval"])
+    d = pd.DataFrame(c.values[1], index=c.years, columns=c.stations)
+    assert d.loc[2022, "Bank"] == 1.0
+    assert np.isnan(d.loc[2023, "Epping"])
+
+
+def test_line_totals_skip_nan_and_rank_puts_it_last():
+    c = cube()
+    totals = c.line_totals_frame()
+    assert totals.loc[2022, "Central"] == 150.0
+    assert totals.loc[2023, "Northern"] == 0.0
+    top = c.top_stations(2023)
+    assert top["station"].tolist() == ["Epping"]
+    assert len(c.to_frame()) == 4#every station-year with at least one figure
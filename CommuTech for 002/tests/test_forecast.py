@@ -0,0 +1,29 @@
+'''
+ForecastCache keeps the newest `keep` fits per series and order.
+'''
+
+from commutech.forecast import ForecastCache
+
+
+def entry(series: str, n: int, order=(1, 1, 1)) -> dict:
+    return {"series": series, "hash": f"h{n}", "order": list(order), "seasonal_order": [1, 1, 1, 12],
+            "fitted_at": f"2026-10-{n:02d}T00:00:00+00:00"}
+
+
+def test_put_trims_each_series_to_keep(tmp_path):
+    cache = ForecastCache(tmp_path, keep=2)
+    for n in range(1, 6):
+        cache.put(entry("central", n))
+    cache.put(entry("district", 1))
+    assert sorted(e["hash"] for e in cache.data["central"].values()) == ["h4", "h5"]
+    assert len(cache.data["district"]) == 1
+
+
+def test_put_keeps_a_warm_start_per_order(tmp_path):
+    cache = ForecastCache(tmp_path, keep=1)
+    cache.put(entry("central", 1, order=(0, 1, 1)))
+    for n in range(2, 5):
+        cache.put(entry("central", n))
+    assert cache.latest("central", (0, 1, 1), (1, 1, 1, 12))["hash"] == "h1"
+    assert cache.latest("central", (1, 1, 1), (1, 1, 1, 12))["hash"] == "h4"
+    assert len(cache.data["central"]) == 2
@@ -0,0 +1,74 @@
+'''
+StatusHistory: appends survive a reopen, torn trailing writes are dropped, the legacy CSV migrates once.
+'''
+
+import csv
+
+import numpy as np
+
+from commutech.history import COLUMNS, StatusHistory
+
+DAY = 86_400
+T0 = 1_790_000_000#2026-09-21 UTC
+
+
+def rows(*spec):
+    return [{"ts_utc": ts, "line": ln, "severity": sev, "status": st} for ts, ln, sev, st in spec]
+
+
+SAMPLE = rows((T0, "Central", 10, "Good Service"), (T0 + 60, "Jubilee", 9, "Minor Delays"),
+              (T0 + DAY, "Central", 6, "Severe Delays"), (T0 + DAY + 60, "Jubilee", 10, "Good Service"))
+
+
+def test_append_reopen_query_round_trip(tmp_path):
+    assert StatusHistory(tmp_path).append(SAMPLE) == 4
+
+    h = StatusHistory(tmp_path)
+    assert len(h) == 4 and len(h.partitions()) == 2
+    cols = h.decode(h.query())
+    assert cols["ts"].tolist() == [r["ts_utc"] for r in SAMPLE]
+    assert cols["line"].tolist() == [r["line"] for r in SAMPLE]
+    assert cols["severity"].tolist() == [r["severity"] for r in SAMPLE]
+    assert cols["status"].tolist() == [r["status"] for r in SAMPLE]
+
+    central = h.decode(h.query("Central", t1=T0 + 1))
+    assert central["ts"].tolist() == [T0 + DAY] and central["status"].tolist() == ["Severe Delays"]
+    assert h.partitions(t2=T0 + 60) == [h.partitions()[0]]
+    assert len(h.query("Victoria")["ts"]) == 0
+
+
+def test_torn_trailing_row_is_ignored_then_truncated(tmp_path):
+    h = StatusHistory(tmp_path)
+    h.append(SAMPLE[:2])
+    part = h.partitions()[0]
+    for fname, dtype in COLUMNS.values():#a crash after the column writes, before index.json
+        with (tmp_path / part / fname).open("ab") as f:
+            f.write(np.zeros(1, dtype).tobytes()[: max(1, np.dtype(dtype).itemsize // 2)])
+
+    h = StatusHistory(tmp_path)
+    assert h.query()["ts"].tolist() == [T0, T0 + 60]
+    h.append(rows((T0 + 120, "Central", 9, "Minor Delays")))
+
+    h = StatusHistory(tmp_path)
+    cols = h.decode(h.query())
+    assert cols["ts"].tolist() == [T0, T0 + 60, T0 + 120]
+    assert cols["status"].tolist() == ["Good Service", "Minor Delays", "Minor Delays"]
+    for fname, dtype in COLUMNS.values():
+        assert (tmp_path / part / fname).stat().st_size == 3 * np.dtype(dtype).itemsize
+
+
+def test_legacy_csv_migrates_once(tmp_path):
+    legacy = tmp_path / "status_log.csv"
+    with legacy.open("w", newline="", encoding="utf-8") as f:
+        w = csv.DictWriter(f, fieldnames=["ts_utc", "line", "severity", "status"])
+        w.writeheader()
+        w.writerows(rows(("2026-10-01T07:00:00+00:00", "Central", 10, "Good Service"),
+                         ("", "Central", 10, "Good Service"),#blank timestamp -> skipped
+                         ("2026-10-01T07:05:00Z", "Jubilee", 9, "Minor Delays")))
+
+    h = StatusHistory(tmp_path / "store", migrate_from=legacy)
+    assert len(h) == 2
+    frame = h.to_frame()
+    assert frame["line"].tolist() == ["Central", "Jubilee"]
+    assert str(frame["ts_utc"].iloc[1]) == "2026-10-01 07:05:00+00:00"
+    assert len(StatusHistory(tmp_path / "store", migrate_from=legacy)) == 2#not migrated again
@@ -0,0 +1,37 @@
+'''
+DisruptionIngest upserts events on (line, from, desc) across re-pulls of the watermark day.
+'''
+
+from datetime import date
+
+from commutech.ingest import DisruptionIngest
+
+
+def status(frm: str, to: str, desc: str = "Part Closure", sev: int = 5) -> list:
+    return [{"name": "Central", "lineStatuses": [{"statusSeverityDescription": desc, "statusSeverity": sev,
+                                                  "validityPeriods": [{"fromDate": frm, "toDate": to}]}]}]
+
+
+def test_extended_event_is_updated_not_duplicated(tmp_path):
+    payloads = iter([status("2026-10-01T06:00:00Z", "2026-10-01T09:00:00Z"),
+                     status("2026-10-01T06:00:00Z", "2026-10-01T12:00:00Z"),
+                     status("2026-10-01T06:00:00Z", "2026-10-01T12:00:00Z")])
+    ing = DisruptionIngest(lambda path, params: (next(payloads), None), tmp_path)
+
+    assert ing.run(["central"], days=1, end=date(2026, 10, 1))[0]["new_events"] == 1
+    assert ing.run(["central"], days=1, end=date(2026, 10, 1))[0]["new_events"] == 1#`to` moved
+    assert ing.run(["central"], days=1, end=date(2026, 10, 1))[0]["new_events"] == 0
+
+    ev = ing.load_events()
+    assert len(ev) == 1
+    assert ev["to"].iloc[0].hour == 12
+
+
+def test_distinct_events_are_kept(tmp_path):
+    payload = status("2026-10-01T06:00:00Z", "2026-10-01T09:00:00Z") + \
+        status("2026-10-01T10:00:00Z", "2026-10-01T11:00:00Z") + \
+        status("2026-10-01T06:00:00Z", "2026-10-01T09:00:00Z", desc="Minor Delays", sev=9)
+    ing = DisruptionIngest(lambda path, params: (payload, None), tmp_path)
+    assert ing.run(["central"], days=1, end=date(2026, 10, 1))[0]["new_events"] == 3
+    assert ing.run(["central"], days=1, end=date(2026, 10, 1))[0]["new_events"] == 0
+    assert len(ing.load_events()) == 3
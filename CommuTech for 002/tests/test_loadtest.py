@@ -0,0 +1,17 @@
+'''
+The load test only runs on Streamlit releases its runtime patches were checked against.
+'''
+
+import pytest
+
+from commutech.loadtest import STREAMLIT_VERSIONS, check_streamlit
+
+
+def test_supported_release_passes():
+    check_streamlit(f"{STREAMLIT_VERSIONS[-1]}.3")
+
+
+@pytest.mark.parametrize("version", ["1.40.0", "2.0.0", "1.6"])
+def test_other_release_fails_clearly(version):
+    with pytest.raises(RuntimeError, match="STREAMLIT_VERSIONS"):
+        check_streamlit(version)
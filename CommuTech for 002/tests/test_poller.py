@@ -0,0 +1,63 @@
+'''
+StatusPoller + worst_status_rows: forced fetches through the shared cache, worst status by weight.
+'''
+
+import time
+
+from commutech.cache import ResponseCache
+from commutech.poller import StatusPoller, worst_status_rows
+
+
+def line(name, *statuses):
+    return {"name": name, "lineStatuses": [{"statusSeverity": c, "statusSeverityDescription": d} for c, d in statuses]}
+
+
+def test_special_service_is_not_good_service():
+    (row,) = worst_status_rows([line("Central", (0, "Special Service"))], "t")
+    assert (row["severity"], row["status"]) == (0, "Special Service")
+
+
+def test_worst_status_ranked_by_weight_not_code():
+    #Minor Delays (9) vs Not Running (16): the higher code is the worse status
+    (row,) = worst_status_rows([line("Central", (9, "Minor Delays"), (16, "Not Running"))], "t")
+    assert (row["severity"], row["status"]) == (16, "Not Running")
+
+
+def test_missing_code_falls_back_to_description():
+    (row,) = worst_status_rows([{"name": "Central", "lineStatuses": [{"statusSeverityDescription": "Severe Delays"}]}], "t")
+    assert (row["severity"], row["status"]) == (6, "Severe Delays")
+    (row,) = worst_status_rows([line("Central")], "t")
+    assert (row["severity"], row["status"]) == (10, "Good Service")
+
+
+class Counter:
+    """Fake TflClient: every GET returns a new payload tagged with its sequence number."""
+
+    def __init__(self):
+        self.n = 0
+
+    def get(self, path, params=None):
+        self.n += 1
+        return [line(f"L{self.n}", (10, "Good Service"))], None
+
+
+def test_poller_forces_a_fetch_and_writes_through():
+    client = Counter()
+    cache = ResponseCache(client, ttls=[(".*", 0.05, 60)])#everything stale almost at once
+    poller = StatusPoller(cache.refresh)
+    first = poller.poll_once()
+    time.sleep(0.1)
+    second = poller.poll_once()
+    assert client.n == 2
+    assert second.payload[0]["name"] == "L2"#not the stale L1 a cached get would serve
+    assert second.ts_utc > first.ts_utc
+    assert cache.get("/Line/Mode/tube/Status")[0] is second.payload#sessions read what was polled
+
+
+def test_poller_publishes_nothing_on_error():
+    class Failing:
+        def get(self, path, params=None):
+            return None, "HTTP 503"
+    poller = StatusPoller(ResponseCache(Failing()).refresh)
+    assert poller.poll_once() is None
+    assert poller.latest() is None and poller.last_error == "HTTP 503"
@@ -0,0 +1,68 @@
+'''
+QualityIndex: an incremental re-check (previous=) matches a full check; load_quality caches on disk.
+'''
+
+from types import SimpleNamespace
+
+from commutech.quality import QUALITY_FILE, QualityIndex, load_quality
+
+KNOWN = {"C": "Central", "J": "Jubilee", "N": "Northern"}
+
+
+def network(n: int = 50):
+    stations = {f"S{i:02d}": {"zones": [1 + i % 9]} for i in range(n)}
+    lines_raw = {f"S{i:02d}": ["C", "J"][: 1 + i % 2] for i in range(n)}
+    return stations, lines_raw
+
+
+def edit(stations, lines_raw):
+    stations, lines_raw = dict(stations), dict(lines_raw)
+    stations["S03"] = {"zones": [4, 11]}#zone out of range
+    lines_raw["S07"] = ["C", "X"]#unknown code
+    del lines_raw["S10"]#missing from lines.json
+    lines_raw["ZZ"] = ["N"]#lines.json entry without a station
+    return stations, lines_raw
+
+
+def verdict(q: QualityIndex):
+    return q.status, q.issues, q.missing_lines, q.missing_stations, q.unknown_codes, q.out_of_range
+
+
+def test_incremental_recheck_matches_full_check():
+    stations, lines_raw = network()
+    base = QualityIndex(stations, lines_raw, KNOWN)
+    assert base.status == "OK" and base.revalidated == 50
+
+    edited = edit(stations, lines_raw)
+    full = QualityIndex(*edited, KNOWN)
+    incremental = QualityIndex(*edited, KNOWN, previous=base)
+    assert verdict(incremental) == verdict(full)
+    assert full.status == "WARN"
+    assert incremental.revalidated == 4#S03, S07, S10, ZZ
+
+    again = QualityIndex(*edited, KNOWN, previous=incremental)
+    assert again.revalidated == 0 and verdict(again) == verdict(full)
+
+
+def test_changed_known_codes_recheck_everything():
+    stations, lines_raw = network()
+    base = QualityIndex(stations, lines_raw, KNOWN)
+    q = QualityIndex(stations, lines_raw, {"C": "Central"}, previous=base)
+    assert q.revalidated == 50 and q.unknown_codes == ["J"]
+
+
+def test_load_quality_reuses_and_rebuilds_the_pickle(tmp_path):
+    stations, lines_raw = network()
+    ref = SimpleNamespace(fingerprint="a", stations=stations, lines_raw=lines_raw)
+    first = load_quality(ref, KNOWN, tmp_path)
+    assert first.revalidated == 50 and (tmp_path / QUALITY_FILE).exists()
+
+    assert load_quality(ref, KNOWN, tmp_path).revalidated == 50#same fingerprint: the stored verdict as-is
+
+    new_stations, new_lines = edit(stations, lines_raw)
+    edited = SimpleNamespace(fingerprint="b", stations=new_stations, lines_raw=new_lines)
+    q = load_quality(edited, KNOWN, tmp_path)
+    assert q.revalidated == 4 and verdict(q) == verdict(QualityIndex(edited.stations, edited.lines_raw, KNOWN))
+
+    (tmp_path / QUALITY_FILE).write_bytes(b"not a pickle")
+    assert load_quality(edited, KNOWN, tmp_path).revalidated == 51#corrupt cache -> full check (50 stations + ZZ)
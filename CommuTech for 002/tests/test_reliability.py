@@ -0,0 +1,68 @@
+'''
+ReliabilityIndex: history catch-up and live snapshots never count a row twice; the pickle resumes at its watermark.
+'''
+
+import pytest
+
+from commutech.history import StatusHistory
+from commutech.reliability import RELIABILITY_FILE, ReliabilityIndex, hour_of_week, load_reliability
+
+T0 = 1_790_000_000
+HOUR = 3600
+
+
+def rows(t, central="Good Service", jubilee="Good Service"):
+    sev = {"Good Service": 10, "Minor Delays": 9, "Severe Delays": 6}
+    return [{"ts_utc": t, "line": "Central", "severity": sev[central], "status": central},
+            {"ts_utc": t, "line": "Jubilee", "severity": sev[jubilee], "status": jubilee}]
+
+
+@pytest.fixture
+def history(tmp_path):
+    h = StatusHistory(tmp_path / "store")
+    for k in range(6):
+        h.append(rows(T0 + k * 300, central="Severe Delays" if k % 2 else "Good Service"))
+    return h
+
+
+def test_snapshot_at_the_watermark_is_not_counted_again(history):
+    index = ReliabilityIndex()
+    assert index.catch_up(history) == 12
+    assert index.watermark == T0 + 5 * 300 and len(index) == 12
+
+    index.add_rows(rows(T0 + 5 * 300, central="Severe Delays"))#the poller's copy of the newest history rows
+    assert len(index) == 12 and index.updates == 1
+
+    index.add_rows(rows(T0 + 5 * 300 - 1) + rows(T0 + 6 * 300))#older rows dropped, newer ones counted
+    assert len(index) == 14 and index.watermark == T0 + 6 * 300
+    assert index.catch_up(history) == 0
+
+
+def test_reload_resumes_from_the_watermark(history, tmp_path):
+    cache = tmp_path / "cache"
+    first = load_reliability(history, cache)
+    assert len(first) == 12 and (cache / RELIABILITY_FILE).exists()
+
+    history.append(rows(T0 + 6 * 300, jubilee="Minor Delays"))
+    again = load_reliability(history, cache)
+    assert len(again) == 14 and again.updates == 1#only the two new rows were read
+    fresh = ReliabilityIndex()
+    fresh.catch_up(history)
+    assert (again.weight == fresh.weight[[fresh.lines.index(n) for n in again.lines]]).all()
+
+
+def test_index_from_an_older_version_is_rebuilt(history, tmp_path, monkeypatch):
+    cache = tmp_path / "cache"
+    stale = ReliabilityIndex(["Central"], watermark=T0 + 10**6)#would hide every history row if reused
+    with monkeypatch.context() as m:
+        m.setattr("commutech.reliability.INDEX_VERSION", 1)
+        stale.save(cache)
+    assert len(load_reliability(history, cache)) == 12
+
+
+def test_expected_weight_tracks_the_bad_hour(history):
+    index = ReliabilityIndex()
+    index.catch_up(history)
+    how = hour_of_week(T0)
+    assert index.expected_weight("Central", how) > index.expected_weight("Jubilee", how) == 0
+    assert index.expected_weight("Victoria", how) == pytest.approx(index.default)
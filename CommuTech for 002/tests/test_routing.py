@@ -0,0 +1,69 @@
+'''
+RouteGraph.best_route: fewest changes first, then the caller's line rank.
+'''
+
+import pytest
+
+from commutech.routing import Route, RouteGraph, priority_rank
+
+NAMES = {"C": "Central", "J": "Jubilee", "N": "Northern", "V": "Victoria", "W": "Waterloo & City"}
+STATIONS = {
+    "A": ["C"],
+    "B": ["C", "J"],
+    "H": ["C", "J", "W"],#bigger hub than B, so the preferred C<->J interchange
+    "D": ["J"],
+    "E": ["J", "N"],
+    "K": ["C", "N"],
+    "F": ["N"],
+    "M": ["W"],
+    "G": ["V"],#no interchange with anything
+}
+
+
+@pytest.fixture
+def graph():
+    return RouteGraph(STATIONS, NAMES)
+
+
+def test_direct(graph):
+    assert graph.best_route("A", "K") == Route(("Central",), (), 0)
+
+
+def test_one_change_uses_the_biggest_interchange(graph):
+    assert graph.best_route("A", "D") == Route(("Central", "Jubilee"), ("H",), 1)
+
+
+def test_two_changes(graph):
+    r = graph.best_route("M", "F")
+    assert r.changes == 2 and r.lines[0] == "Waterloo & City" and r.lines[-1] == "Northern"
+    assert r == Route(("Waterloo & City", "Central", "Northern"), ("H", "K"), 2)
+    assert graph.best_route("D", "F") == Route(("Jubilee", "Northern"), ("E",), 1)
+
+
+def test_unreachable(graph):
+    assert graph.best_route("A", "G") is None
+    assert graph.best_route("A", "Z") is None#unknown code
+    assert graph.routes("G", "A") == ()
+
+
+def test_rank_breaks_ties_between_equal_change_routes(graph):
+    #A -> E: Central then Jubilee (via H) or Central then Northern (via K), both one change
+    assert {r.lines for r in graph.routes("A", "E")} == {("Central", "Jubilee"), ("Central", "Northern")}
+    assert graph.best_route("A", "E").lines == ("Central", "Jubilee")#graph order by default
+    assert graph.best_route("A", "E", priority_rank(["Northern", "Central"])).lines == ("Central", "Northern")
+    #shared lines: the lowest-ranked line wins the direct ride
+    assert graph.best_route("B", "H").lines == ("Central",)
+    assert graph.best_route("B", "H", lambda name: {"Jubilee": 0}.get(name, 5)).lines == ("Jubilee",)
+
+
+def test_fewer_changes_beat_a_better_rank(graph):
+    rank = lambda name: 0 if name == "Waterloo & City" else 100
+    assert graph.best_route("A", "K", rank) == Route(("Central",), (), 0)
+
+
+def test_precompute_matches_lazy_answers():
+    lazy, eager = RouteGraph(STATIONS, NAMES), RouteGraph(STATIONS, NAMES)
+    eager.precompute()
+    for o in STATIONS:
+        for d in STATIONS:
+            assert eager.routes(o, d) == lazy.routes(o, d)
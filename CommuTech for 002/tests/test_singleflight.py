@@ -0,0 +1,90 @@
+'''
+SingleFlight + ResponseCache: concurrent identical requests share one GET; the budget caps the rest.
+'''
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from commutech.budget import TokenBucket
+from commutech.cache import ResponseCache
+from commutech.singleflight import SingleFlight
+
+N = 8
+
+
+def wait_for(cond, timeout=2.0):
+    end = time.monotonic() + timeout
+    while not cond():
+        assert time.monotonic() < end, "timed out"
+        time.sleep(0.005)
+
+
+class Gated:
+    """fn/client whose calls block until release(); counts how many actually ran."""
+
+    def __init__(self):
+        self.calls = 0
+        self.gate = threading.Event()
+
+    def __call__(self):
+        self.calls += 1
+        self.gate.wait(2)
+        return "payload", None
+
+    def get(self, path, params=None):
+        return self()
+
+
+def test_concurrent_callers_share_one_execution():
+    flight, fn = SingleFlight(), Gated()
+    with ThreadPoolExecutor(N) as pool:
+        futures = [pool.submit(flight.do, "k", fn) for _ in range(N)]
+        wait_for(lambda: flight.coalesced == N - 1)
+        assert flight.in_flight() == 1
+        fn.gate.set()
+        results = [f.result() for f in futures]
+    assert fn.calls == 1 and results == [("payload", None)] * N
+    assert flight.in_flight() == 0
+
+
+def test_distinct_keys_and_later_calls_run_again():
+    flight = SingleFlight()
+    calls = []
+    assert flight.do("a", lambda: calls.append("a") or 1) == 1
+    assert flight.do("b", lambda: calls.append("b") or 2) == 2
+    assert flight.do("a", lambda: calls.append("a") or 3) == 3#not in flight any more
+    assert calls == ["a", "b", "a"] and flight.coalesced == 0
+
+
+def test_exception_is_shared_as_an_error():
+    def boom():
+        raise ConnectionError("reset")
+    assert SingleFlight().do("k", boom) == (None, "reset")
+
+
+def test_cache_misses_coalesce_onto_one_get():
+    client = Gated()
+    c = ResponseCache(client)
+    with ThreadPoolExecutor(N) as pool:
+        futures = [pool.submit(c.get, "/Line/Mode/tube/Status") for _ in range(N)]
+        wait_for(lambda: c.flight.coalesced == N - 1)
+        client.gate.set()
+        results = [f.result() for f in futures]
+    assert client.calls == 1 and results == [("payload", None)] * N
+    assert c.info()["coalesced"] == N - 1 and c.info()["misses"] == N
+    assert c.get("/Line/Mode/tube/Status") == ("payload", None) and client.calls == 1
+
+
+def test_budget_denies_requests_and_serves_last_good_when_low():
+    client = Gated()
+    client.gate.set()
+    budget = TokenBucket(per_minute=0.001, burst=2, reserve=0.6)#2 tokens, "low" below 1.2, ~no refill
+    c = ResponseCache(client, ttls=[(r"^/", 0, 0)], budget=budget)
+    assert c.get("/a") == ("payload", None)#1 token left -> low
+    assert c.budget_low()
+    time.sleep(0.01)#/a expired (ttl 0): the miss has a fallback, so no request is spent on it
+    assert c.get("/a") == ("payload", None) and c.info()["budget_saves"] == 1
+    assert c.get("/b") == ("payload", None)#no fallback: spends the last token
+    assert c.get("/c") == (None, "TfL request budget exhausted - try again shortly")
+    assert client.calls == 2 and budget.denied == 1
@@ -0,0 +1,136 @@
+'''
+TflClient against the local mock TfL server (commutech.fixtures.MockTflServer).
+'''
+
+import time
+
+import pytest
+
+from commutech.fixtures import FixtureStore, MockTflServer
+from commutech.tfl_client import TflClient
+
+STATUS = "/Line/Mode/tube/Status"
+BODY = [{"id": "central", "name": "Central", "lineStatuses": [{"statusSeverity": 10}]}]
+
+
+class Calls:
+    """Stand-in PerfRecorder: keeps every record_call."""
+
+    def __init__(self):
+        self.calls = []
+
+    def record_call(self, endpoint, status, nbytes, ms):
+        self.calls.append((endpoint, status))
+
+
+@pytest.fixture
+def store(tmp_path):
+    s = FixtureStore(tmp_path / "fixtures", "record")
+    s.put(STATUS, None, BODY)
+    return s
+
+
+@pytest.fixture
+def server(store):
+    with MockTflServer(store, port=0) as srv:
+        yield srv
+
+
+def script(server, plan):
+    """Make the server answer the next requests per plan ([fail?, ...]), then succeed."""
+    steps = iter(plan)
+    server._plan = lambda: (0.0, next(steps, False))
+
+
+def client_for(server, **kwargs) -> TflClient:
+    kwargs.setdefault("key_fn", lambda: "test-key")
+    return TflClient(base_url=server.base_url, fixtures=None, **kwargs)
+
+
+def test_get_ok_records_one_call(server):
+    rec = Calls()
+    client = client_for(server, recorder=rec)
+    assert client.get(STATUS) == (BODY, None)
+    assert rec.calls == [(STATUS, 200)]
+    assert server.counters()["served"] == 1
+
+
+def test_missing_key_never_hits_the_server(server):
+    client = client_for(server, key_fn=lambda: None)
+    assert client.get(STATUS) == (None, "Missing API key")
+    assert server.counters()["requests"] == 0
+
+
+def test_retries_5xx_then_succeeds(server):
+    script(server, [True, True])
+    rec = Calls()
+    client = client_for(server, retries=3, backoff=0.01, recorder=rec)
+    assert client.get(STATUS) == (BODY, None)
+    assert server.counters()["requests"] == 3
+    assert rec.calls == [(STATUS, 200)]#retries happen inside one call
+
+
+def test_retries_exhausted_returns_last_error_with_backoff(server):
+    server.config["error_rate"] = 1.0
+    client = client_for(server, retries=2, backoff=0.1)
+    t0 = time.perf_counter()
+    data, err = client.get(STATUS)
+    elapsed = time.perf_counter() - t0
+    assert data is None and err.startswith("HTTP 503")
+    assert server.counters()["requests"] == 3#first try + 2 retries
+    assert elapsed >= 0.2#urllib3 backoff: 0, then backoff * 2
+
+
+def test_429_honours_retry_after(server):
+    server.config["error_status"] = 429
+    script(server, [True])
+    client = client_for(server, retries=2, backoff=0)
+    t0 = time.perf_counter()
+    assert client.get(STATUS) == (BODY, None)
+    assert time.perf_counter() - t0 >= 1.0#mock sends Retry-After: 1
+    assert server.counters()["requests"] == 2
+
+
+def test_connection_error_records_one_err():
+    rec = Calls()
+    client = TflClient(base_url="http://127.0.0.1:9", key_fn=lambda: "k", retries=0, timeout=2,
+                       recorder=rec, fixtures=None)
+    data, err = client.get(STATUS)
+    assert data is None and err
+    assert rec.calls == [(STATUS, "ERR")]
+
+
+def test_invalid_json_records_one_call(server):
+    server.respond = lambda target: (200, b"<html>not json</html>", {})
+    rec = Calls()
+    data, err = client_for(server, recorder=rec).get(STATUS)
+    assert data is None and err
+    assert rec.calls == [(STATUS, 200)]
+
+
+def test_replay_mode_needs_no_key_or_network(store, tmp_path):
+    replay = FixtureStore(store.root, "replay")
+    client = TflClient(base_url="http://127.0.0.1:9", key_fn=lambda: None, fixtures=replay)
+    assert client.get(STATUS) == (BODY, None)
+    data, err = client.get("/Line/Mode/dlr/Status")
+    assert data is None and err.startswith("No fixture")
+    assert replay.stats == {"recorded": 0, "replayed": 1, "misses": 1}
+
+
+def test_record_mode_writes_fixtures(server, tmp_path):
+    rec_store = FixtureStore(tmp_path / "recorded", "record")
+    client = TflClient(base_url=server.base_url, key_fn=lambda: "k", fixtures=rec_store)
+    assert client.get(STATUS) == (BODY, None)
+    assert FixtureStore(rec_store.root, "replay").get(STATUS) == (BODY, None)
+
+
+def test_fixture_write_error_still_returns_the_payload(server, tmp_path, monkeypatch):
+    rec_store = FixtureStore(tmp_path / "recorded", "record")
+
+    def disk_full(*args, **kwargs):
+        raise OSError(28, "No space left on device")
+    monkeypatch.setattr(rec_store, "put", disk_full)
+    rec = Calls()
+    client = TflClient(base_url=server.base_url, key_fn=lambda: "k", fixtures=rec_store, recorder=rec)
+    assert client.get(STATUS) == (BODY, None)
+    assert rec.calls == [(STATUS, 200)]
@@ -0,0 +1,43 @@
+'''
+load_sheets caches per sheet: identical sheets under different names must not share an entry.
+'''
+
+import pandas as pd
+import pytest
+
+from commutech.workbooks import clean_station_sheet, load_sheets, sheet_digests
+
+pytest.importorskip("openpyxl")
+
+
+def station_workbook(path, sheets):
+    rows = pd.DataFrame({"station": ["Bank", "Epping"], "total": [150_000.0, 250_000.0]})
+    with pd.ExcelWriter(path) as w:
+        for name in sheets:
+            rows.to_excel(w, sheet_name=name, index=False, header=False)
+    return path
+
+
+def years(result) -> dict[str, int]:
+    return {s: int(df["year"].iloc[0]) for s, (df, _) in result.items()}
+
+
+def test_identical_sheets_keep_their_own_year(tmp_path):
+    xlsx = station_workbook(tmp_path / "flows.xlsx", ["2019 Entry & Exit", "2020 Entry & Exit"])
+    digests = sheet_digests(xlsx)
+    assert len(set(digests.values())) == 1#same bytes -> same digest, so the key needs the name
+
+    cold = load_sheets(xlsx, clean_station_sheet, header=None, cache_dir=tmp_path / "cache", max_workers=1)
+    warm = load_sheets(xlsx, clean_station_sheet, header=None, cache_dir=tmp_path / "cache", max_workers=1)
+    assert years(cold) == years(warm) == {"2019 Entry & Exit": 2019, "2020 Entry & Exit": 2020}
+    assert all(m["cached"] for _, m in warm.values())
+
+
+def test_renamed_sheet_is_reparsed(tmp_path):
+    cache = tmp_path / "cache"
+    load_sheets(station_workbook(tmp_path / "a.xlsx", ["2019 Entry & Exit"]), clean_station_sheet,
+                header=None, cache_dir=cache, max_workers=1)
+    out = load_sheets(station_workbook(tmp_path / "b.xlsx", ["2021 Entry & Exit"]), clean_station_sheet,
+                      header=None, cache_dir=cache, max_workers=1)
+    assert years(out) == {"2021 Entry & Exit": 2021}
+    assert not out["2021 Entry & Exit"][1]["cached"]